@@ -19,6 +19,12 @@ from agno.db.sqlite import SqliteDb
 
 from .Tools.CompanyValuationDB import *
 from .Tools.Calculations import *
+from .Tools.Sensitivity import calculate_dcf_sensitivity
+from .Tools.ValuationSession import what_if_valuation
+from .Tools.ImpliedParameters import solve_implied_parameters
+from .Tools.CostOfCapital import estimate_wacc
+from .Tools.PeerIndex import find_peers
+from .Tools.ValuationHistory import valuation_history
 
 
 from dotenv import load_dotenv
@@ -36,7 +42,7 @@ agent = Agent(
     enable_agentic_memory=True, 
     tools=[
         # get_companies, get_financial_statements, get_market_data, get_transactions, get_discount_rates, get_industry_multiples, 
-        calculate_book_value, estimate_liquidation_value, calculate_market_cap, calculate_comparable_multiples, calculate_dcf, calculate_earnings_multiple,GoogleSearchTools(), 
+        calculate_book_value, estimate_liquidation_value, calculate_market_cap, calculate_comparable_multiples, calculate_dcf, calculate_earnings_multiple, calculate_dcf_sensitivity, triangulate_valuation, what_if_valuation, solve_implied_parameters, estimate_wacc, find_peers, valuation_history, GoogleSearchTools(), 
     ExaTools(), FileTools(),YFinanceTools(), VisualizationTools()],
     description="You are a financial data specialist that helps analyze financial information for stocks and cryptocurrencies.",
     instructions=dedent("""
@@ -111,10 +117,14 @@ agent = Agent(
         **Tools Used:**
         - Discounted Cash Flow (DCF) Tool  
         - Earnings/Revenue Multiples Tool  
+        - DCF Sensitivity Tool (`calculate_dcf_sensitivity`)  
 
         **Steps:**
         1. Forecast the company’s **Free Cash Flows (FCFs)** for 5 years.  
         2. Calculate **WACC** and **Terminal Value**:  
+           Estimate WACC with `estimate_wacc` (CAPM beta vs. the market index, Blume-adjusted by default) —
+           pass the company and its peers in one call — and give the company's `wacc` to `calculate_dcf`
+           instead of relying on the 10% default.
         \[
         TV = \frac{FCF_n \times (1 + g)}{WACC - g}
         \]
@@ -124,6 +134,8 @@ agent = Agent(
         \]
         4. Complement DCF with **Earnings or Revenue Multiples** if applicable.  
         5. Return the intrinsic valuation range and interpret sensitivity to growth/WACC assumptions.
+           Use a single `calculate_dcf_sensitivity` call for the full WACC × terminal growth × FCF growth grid
+           (do not call `calculate_dcf` once per cell) and render its Markdown tables; cells marked n/a have WACC ≤ g.
 
         ---
 
@@ -135,7 +147,18 @@ agent = Agent(
         - Scenario adjustments (High Growth / Moderate / Recession)
         - Explain **how the macro scenario affects valuation assumptions** (discount rate, growth rate, risk premium).
         - Summarize **valuation triangulation**, showing how the three methods compare.
-        - Provide a list of **5–10 similar companies** using the ExaTools semantic search. For each peer, include a one-line rationale and a source link.
+          For a full report, call `triangulate_valuation` once: it runs all six methods on a single data fetch
+          and returns each method, the per-approach values and the triangulated average.
+        - For follow-up what-if questions ("what if WACC is 9%?"), call `what_if_valuation` with the changed inputs;
+          it reuses the loaded data and only recomputes the affected results.
+        - To find the WACC, growth or multiple implied by market prices (reverse DCF), call `solve_implied_parameters`
+          once for the whole peer set instead of trying values with repeated `calculate_dcf` calls.
+        - For trends across periods (YoY/QoQ), call `valuation_history` once for the company (or all peers) instead of
+          calling the calculators per period; it returns a long table with the change versus the previous period.
+        - Provide a list of **5–10 similar companies** with a single `find_peers` call (nearest neighbours by sector, region,
+          size, margins, growth and leverage in the database). Report each peer's distance and multiples, and the peer-median
+          multiples and implied value it returns. Fall back to the ExaTools semantic search only when `find_peers` reports the
+          company is not in the database; then include a one-line rationale and a source link per peer.
 
         ---
 
@@ -200,13 +223,16 @@ agent = Agent(
 
         ---
 
-        ## 🔎 Similar Companies (via ExaTools)
-        List 5–10 closest peers identified via semantic search:
-        - {{peer_1_name}} — {{peer_1_reason}} — {{peer_1_url}}
-        - {{peer_2_name}} — {{peer_2_reason}} — {{peer_2_url}}
-        - {{peer_3_name}} — {{peer_3_reason}} — {{peer_3_url}}
-        - {{peer_4_name}} — {{peer_4_reason}} — {{peer_4_url}}
-        - {{peer_5_name}} — {{peer_5_reason}} — {{peer_5_url}}
+        ## 🔎 Similar Companies (via find_peers)
+        List 5–10 closest peers from the peer index:
+        | Peer | Sector | Distance | EV/EBITDA | P/E | EV/Sales |
+        |------|--------|----------|-----------|-----|----------|
+        | {{peer_1_name}} | {{peer_1_sector}} | {{peer_1_distance}} | {{peer_1_ev_ebitda}} | {{peer_1_pe}} | {{peer_1_ev_sales}} |
+        | {{peer_2_name}} | {{peer_2_sector}} | {{peer_2_distance}} | {{peer_2_ev_ebitda}} | {{peer_2_pe}} | {{peer_2_ev_sales}} |
+        | {{peer_3_name}} | {{peer_3_sector}} | {{peer_3_distance}} | {{peer_3_ev_ebitda}} | {{peer_3_pe}} | {{peer_3_ev_sales}} |
+        | Peer median | | | {{peer_ev_ebitda}} | {{peer_pe}} | {{peer_ev_sales}} |
+
+        Implied value at peer medians: ${{peer_implied_value}}
 
         ---
 
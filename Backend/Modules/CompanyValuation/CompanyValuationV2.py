@@ -10,7 +10,10 @@ from agno.tools.calculator import CalculatorTools
 from agno.tools.googlesearch import GoogleSearchTools
 from dotenv import load_dotenv
 from agno.team import Team
-from .Tools.CompanyValuationDB import get_companiesV2, get_income_statements, get_balance_sheets, get_valuation_metrics
+from .Tools.TableQuery import query_companies, query_income_statements, query_balance_sheets, query_valuation_metrics
+from .Tools.ValuationHistory import valuation_history
+from .Tools.FinancialRatios import compute_financial_ratios
+from .Tools.CompanyPanel import get_company_panel
 import os
 load_dotenv()
 
@@ -23,7 +26,7 @@ class FinancialAnalysisAgents:
         return Agent(
             name="Income Statement Analyst",
             model= xAI(id="grok-3-mini", api_key=self.xai_api_key),
-            tools=[ CalculatorTools(),get_companiesV2, get_income_statements, get_balance_sheets, get_valuation_metrics],
+            tools=[ CalculatorTools(),query_companies, query_income_statements, query_balance_sheets, query_valuation_metrics, valuation_history, compute_financial_ratios, get_company_panel],
             instructions="""You are a financial analyst specializing in income statement analysis. Your role is to:
             
 1. Analyze revenue growth trends and calculate growth rates
@@ -35,8 +38,13 @@ class FinancialAnalysisAgents:
 4. Identify trends in profitability and operational efficiency
 5. Provide insights on revenue quality and cost structure
 
+Load a company's data with `get_company_panel(companies=[...])` (profile, income statement, balance sheet and
+valuation metrics joined per period) rather than fetching whole tables.
+
 When analyzing:
-- Calculate quarter-over-quarter and year-over-year changes
+- Get margins, growth rates and returns for all periods with one `compute_financial_ratios(companies=[...], groups=["income"])` call;
+  use the calculator only for figures it does not cover
+- Calculate quarter-over-quarter and year-over-year changes (use `valuation_history` for valuation trends across all periods in one call)
 - Benchmark performance against industry standards
 - Identify strengths and weaknesses in profitability
 - Focus on sustainable growth patterns""",
@@ -48,7 +56,7 @@ When analyzing:
         return Agent(
             name="Balance Sheet Analyst",
             model= xAI(id="grok-3-mini", api_key=self.xai_api_key),
-            tools=[CalculatorTools(),get_companiesV2, get_income_statements, get_balance_sheets, get_valuation_metrics],
+            tools=[CalculatorTools(),query_companies, query_income_statements, query_balance_sheets, query_valuation_metrics, compute_financial_ratios, get_company_panel],
             instructions="""You are a financial analyst specializing in balance sheet analysis. Your role is to:
 
 1. Analyze capital structure:
@@ -66,6 +74,12 @@ When analyzing:
 4. Analyze asset quality and composition
 5. Assess solvency and financial stability
 
+Load the company's data with `get_company_panel(companies=[...])`, which joins its profile and statements per period,
+instead of fetching whole tables.
+
+Compute all of these ratios for every period with one `compute_financial_ratios(companies=[...], groups=["balance"])` call
+instead of one calculator operation per ratio; use the calculator only for figures it does not cover.
+
 Key focus areas:
 - Debt management and leverage
 - Liquidity risk assessment
@@ -79,7 +93,7 @@ Key focus areas:
         return Agent(
             name="Valuation Analyst",
             model= xAI(id="grok-3-mini", api_key=self.xai_api_key),
-            tools=[YFinanceTools(), CalculatorTools(),GoogleSearchTools(),ExaTools(), get_companiesV2, get_income_statements, get_balance_sheets, get_valuation_metrics],
+            tools=[YFinanceTools(), CalculatorTools(),GoogleSearchTools(),ExaTools(), query_companies, query_income_statements, query_balance_sheets, query_valuation_metrics, valuation_history, get_company_panel],
             instructions="""You are a valuation expert specializing in multiples analysis. Your role is to:
 
 1. Calculate Enterprise Value (EV):
@@ -93,10 +107,12 @@ Key focus areas:
 
 3. Perform comparable company analysis:
    - Identify relevant peer group
+   - Load the target and its peers with one `get_company_panel(companies=[...])` call rather than whole tables
    - Calculate industry average multiples
    - Apply multiples to target company metrics
 
 4. Provide valuation ranges and sensitivity analysis
+5. Show how the valuation moved over time with one `valuation_history` call (all periods, book value, multiples and DCF)
 
 Valuation Framework:
 - Select appropriate multiples based on industry
@@ -0,0 +1,214 @@
+"""
+Shared, rate-limit-aware Airtable client.
+
+Airtable allows 5 requests per second per base and answers bursts with 429s
+(followed by a 30 second penalty). Every agent run used to create its own
+`Api` at import time and fire requests unthrottled. This module provides:
+
+- `get_api`: a lazily created, process-wide `Api` per token whose session keeps
+  connections alive and is safe to share across threads.
+- `TokenBucket` / `rate_limiter`: one token bucket per base, shared by every
+  request the process sends to that base.
+- `ThrottledAdapter`: a `requests` transport adapter that waits for a token
+  before each request and retries 429/5xx responses with jittered
+  exponential backoff (honouring `Retry-After`).
+- `get_client_metrics`: counters for requests, throttled waits and retries.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from pyairtable import Api
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINT_URL = "https://api.airtable.com"
+REQUESTS_PER_SECOND = float(os.getenv("AIRTABLE_REQUESTS_PER_SECOND", "5"))
+MAX_RETRIES = int(os.getenv("AIRTABLE_MAX_RETRIES", "5"))
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 30.0  # seconds
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+_BASE_ID_PATTERN = re.compile(r"/v0/(app[^/?]+)")
+
+
+# -------------------------------
+# Metrics
+# -------------------------------
+
+class ClientMetrics:
+    """Thread-safe counters describing traffic to Airtable."""
+
+    _COUNTERS = (
+        "requests",
+        "throttled_waits",
+        "throttled_seconds",
+        "retries",
+        "rate_limited_responses",
+        "server_error_responses",
+        "failed_requests",
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values: Dict[str, float] = {name: 0 for name in self._COUNTERS}
+
+    def add(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[name] += amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+metrics = ClientMetrics()
+
+
+def get_client_metrics() -> Dict[str, float]:
+    """Return a snapshot of the Airtable client counters."""
+    return metrics.snapshot()
+
+
+# -------------------------------
+# Rate limiting
+# -------------------------------
+
+class TokenBucket:
+    """Classic token bucket; `acquire` blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Block until a token is available; return the time spent waiting."""
+        wait = self.reserve()
+        if wait > 0:
+            metrics.add("throttled_waits")
+            metrics.add("throttled_seconds", wait)
+            time.sleep(wait)
+        return wait
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def rate_limiter(base_id: str) -> TokenBucket:
+    """Return the process-wide token bucket for `base_id`."""
+    with _buckets_lock:
+        bucket = _buckets.get(base_id)
+        if bucket is None:
+            bucket = _buckets[base_id] = TokenBucket(REQUESTS_PER_SECOND)
+        return bucket
+
+
+def _base_id_from_url(url: str) -> str:
+    match = _BASE_ID_PATTERN.search(url or "")
+    return match.group(1) if match else ""
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than `Retry-After`."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+# -------------------------------
+# Transport
+# -------------------------------
+
+class ThrottledAdapter(HTTPAdapter):
+    """HTTP adapter that rate limits per base and retries 429/5xx responses."""
+
+    def __init__(self, max_retries_on_status: int = MAX_RETRIES, **kwargs: Any):
+        kwargs.setdefault("pool_connections", 4)
+        kwargs.setdefault("pool_maxsize", 16)
+        super().__init__(**kwargs)
+        self.max_retries_on_status = max_retries_on_status
+
+    def send(self, request, **kwargs):  # type: ignore[override]
+        bucket = rate_limiter(_base_id_from_url(request.url))
+        attempt = 0
+        while True:
+            bucket.acquire()
+            metrics.add("requests")
+            response = super().send(request, **kwargs)
+            status = response.status_code
+            if status not in RETRY_STATUS_CODES:
+                return response
+
+            metrics.add("rate_limited_responses" if status == 429 else "server_error_responses")
+            if attempt >= self.max_retries_on_status:
+                metrics.add("failed_requests")
+                return response
+
+            delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            logger.warning("Airtable returned %s; retrying in %.2fs (attempt %d)", status, delay, attempt + 1)
+            metrics.add("retries")
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+# -------------------------------
+# Lazy API
+# -------------------------------
+
+_apis: Dict[Tuple[str, str], Api] = {}
+_apis_lock = threading.Lock()
+
+
+def get_api(token: Optional[str], endpoint_url: Optional[str] = None) -> Api:
+    """Return the shared `Api` for `token`, creating it on first use.
+
+    Raises RuntimeError when no token is configured, so a missing credential
+    surfaces as a clear tool error instead of an opaque 401.
+    """
+    if not token:
+        raise RuntimeError("AIRTABLE_API_KEY is not set; cannot reach Airtable.")
+    endpoint = endpoint_url or DEFAULT_ENDPOINT_URL
+    key = (token, endpoint)
+    with _apis_lock:
+        api = _apis.get(key)
+        if api is None:
+            # Retries are handled by ThrottledAdapter, which also rate limits.
+            api = Api(token, retry_strategy=False, endpoint_url=endpoint)
+            adapter = ThrottledAdapter()
+            api.session.mount("https://", adapter)
+            api.session.mount("http://", adapter)
+            _apis[key] = api
+        return api
@@ -0,0 +1,486 @@
+"""
+Vectorized batch valuation over many companies.
+
+Columnar counterparts of the six tools in `Calculations.py`. Each function
+takes a pandas DataFrame or a mapping of column name -> array (one row per
+company/period) and returns columnar results with a per-row `<method>_success`
+flag. Formulas, field aliases, defaults and confidence heuristics are the same
+as the scalar tools, so row i of a batch result equals calling the scalar tool
+on record i with the same multiples.
+
+Missing values are NaN. Results are returned as a DataFrame when the input is
+a DataFrame, otherwise as a dict of NumPy arrays.
+
+    columns = records_to_columns(get_financial_statements())
+    results = batch_valuate(columns)
+"""
+
+from __future__ import annotations
+
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .Calculations import (
+    DEFAULT_FCF_GROWTH,
+    DEFAULT_LIQUIDATION_DISCOUNTS,
+    DEFAULT_TERMINAL_GROWTH,
+    DEFAULT_WACC,
+    COMPARABLE_MULTIPLE_SOURCES,
+    DEFAULT_COMPARABLE_MULTIPLES,
+    DEFAULT_EARNINGS_MULTIPLES,
+    EARNINGS_MULTIPLE_SOURCES,
+    LIQUIDATION_CANDIDATE_KEYS,
+    _multiples_index,
+    _segment_medians,
+    _segment_stats,
+)
+from .MultiplesIndex import SIZE_BUCKETS
+from .RecordStore import FinancialRecord, StatementIndex, normalize_fields, normalize_key
+
+ColumnarInput = Union["pandas.DataFrame", Mapping[str, Any]]  # noqa: F821
+ColumnarResult = Union["pandas.DataFrame", Dict[str, np.ndarray]]  # noqa: F821
+
+BATCH_METHODS = (
+    "book_value",
+    "liquidation_value",
+    "market_cap",
+    "comparable_multiples",
+    "dcf",
+    "earnings_multiple",
+)
+
+_PASSTHROUGH = ("company", "period")
+
+
+# -------------------------------
+# Helpers
+# -------------------------------
+
+_NUMERIC_TYPES = frozenset((type(None), bool, int, float))
+
+
+def records_to_columns(records: Iterable[Any]) -> Dict[str, np.ndarray]:
+    """Turn Airtable-like records (or `FinancialRecord`s) into columns (lowercased field names).
+
+    Purely numeric fields become float arrays with NaN for missing values;
+    other fields stay object arrays, where non-numeric values count as missing
+    in the batch functions (like `_get_number`).
+    """
+    rows = [rec.fields if isinstance(rec, FinancialRecord) else normalize_fields(rec) for rec in records]
+    names: Dict[str, None] = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    columns: Dict[str, np.ndarray] = {}
+    for name in names:
+        values = list(map(dict.get, rows, repeat(name)))
+        types = set(map(type, values))
+        if types <= _NUMERIC_TYPES or all(t is type(None) or issubclass(t, (int, float)) for t in types):
+            # None converts to NaN
+            columns[name] = np.array(values, dtype=float)
+        else:
+            columns[name] = np.array(values, dtype=object)
+    return columns
+
+
+def index_columns(index: StatementIndex) -> Dict[str, np.ndarray]:
+    """`records_to_columns(index.financial)`, built once per index.
+
+    Select rows with `{name: column[positions] for name, column in ...}`.
+    """
+    if index.columns is None:
+        index.columns = records_to_columns(index.financial)
+    return index.columns
+
+
+def _prepare(data: ColumnarInput) -> Tuple[Dict[str, np.ndarray], int, Any]:
+    """Normalize input to lowercased columns; returns (columns, n_rows, frame_index)."""
+    if hasattr(data, "columns") and hasattr(data, "index"):
+        columns = {str(name).lower(): data[name].to_numpy() for name in data.columns}
+        return columns, len(data.index), data.index
+    columns = {str(name).lower(): np.asarray(values) for name, values in data.items()}
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    return columns, n_rows, None
+
+
+def _numeric(values: np.ndarray) -> np.ndarray:
+    if values.dtype.kind in "fiub":
+        return values.astype(float, copy=False)
+    return np.array(
+        [float(v) if isinstance(v, (int, float)) else np.nan for v in values],
+        dtype=float,
+    )
+
+
+def _pick(columns: Mapping[str, np.ndarray], n_rows: int, *aliases: str, default: float = np.nan) -> np.ndarray:
+    """First non-missing value across `aliases` per row (vectorized `_get_number`)."""
+    result = np.full(n_rows, np.nan)
+    for alias in aliases:
+        if alias in columns:
+            values = _numeric(columns[alias])
+            result = np.where(np.isnan(result), values, result)
+    if not np.isnan(default):
+        result = np.where(np.isnan(result), default, result)
+    return result
+
+
+def _broadcast(value: Any, n_rows: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=float), (n_rows,)).astype(float)
+
+
+def _finish(result: Dict[str, np.ndarray], columns: Mapping[str, np.ndarray], index: Any) -> ColumnarResult:
+    passthrough = {name: columns[name] for name in _PASSTHROUGH if name in columns}
+    out = {**passthrough, **result}
+    if index is None:
+        return out
+    import pandas as pd
+
+    return pd.DataFrame(out, index=index)
+
+
+# -------------------------------
+# Asset-based
+# -------------------------------
+
+def batch_book_value(data: ColumnarInput) -> ColumnarResult:
+    """Book Value = Total Assets − Total Liabilities, per row."""
+    columns, n_rows, index = _prepare(data)
+    total_assets = _pick(columns, n_rows, "total_assets", "assets", default=0.0)
+    total_liabilities = _pick(columns, n_rows, "total_liabilities", "liabilities", default=0.0)
+    return _finish({
+        "book_value": total_assets - total_liabilities,
+        "book_value_success": np.ones(n_rows, dtype=bool),
+        # Inputs come from statement records, as when the scalar tool reads a record
+        "book_value_confidence": np.full(n_rows, 0.75),
+    }, columns, index)
+
+
+def batch_liquidation_value(data: ColumnarInput, discounts: Optional[Mapping[str, float]] = None) -> ColumnarResult:
+    """Σ(asset category × liquidation discount) − liabilities, per row.
+
+    Rows without any category fall back to a blanket 0.70 discount on total
+    assets, as in `estimate_liquidation_value`.
+    """
+    columns, n_rows, index = _prepare(data)
+    discounts_map = {str(k).lower(): float(v) for k, v in (discounts or DEFAULT_LIQUIDATION_DISCOUNTS).items()}
+    candidate_keys = set(discounts_map) | LIQUIDATION_CANDIDATE_KEYS
+
+    discounted = np.zeros(n_rows)
+    categories_present = np.zeros(n_rows, dtype=int)
+    for key in sorted(candidate_keys - {"assets", "total_assets"}):
+        if key not in columns:
+            continue
+        values = _numeric(columns[key])
+        present = ~np.isnan(values)
+        discounted += np.where(present, values * discounts_map.get(key, 0.50), 0.0)
+        categories_present += present
+
+    total_assets = _pick(columns, n_rows, "total_assets", "assets")
+    blanket = (categories_present == 0) & ~np.isnan(total_assets)
+    blanket_discount = discounts_map.get("total_assets", 0.70)
+    discounted = np.where(blanket, total_assets * blanket_discount, discounted)
+
+    total_liabilities = _pick(columns, n_rows, "total_liabilities", "liabilities", default=0.0)
+    has_breakdown = categories_present > 0
+    return _finish({
+        "discounted_asset_value": discounted,
+        "liquidation_value": discounted - total_liabilities,
+        "liquidation_value_success": np.ones(n_rows, dtype=bool),
+        "liquidation_value_confidence": np.where(has_breakdown, 0.85, 0.65),
+    }, columns, index)
+
+
+# -------------------------------
+# Market-based
+# -------------------------------
+
+def batch_market_cap(data: ColumnarInput) -> ColumnarResult:
+    """Market Cap = Share Price × Shares Outstanding; fails rows with non-positive inputs."""
+    columns, n_rows, index = _prepare(data)
+    share_price = _pick(columns, n_rows, "share_price", "price", default=0.0)
+    shares_outstanding = _pick(columns, n_rows, "shares_outstanding", "shares", default=0.0)
+    success = (share_price > 0) & (shares_outstanding > 0)
+    return _finish({
+        "market_cap": np.where(success, share_price * shares_outstanding, np.nan),
+        "market_cap_success": success,
+        "market_cap_confidence": np.where(success, 0.75, np.nan),
+    }, columns, index)
+
+
+def _apply_multiples(
+    metrics: Dict[str, np.ndarray],
+    multiples: Dict[str, np.ndarray],
+    prefix: str,
+) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """Value = metric × multiple where metric > 0 and the multiple is set; average per row.
+
+    Returns (result columns, success mask, number of valuations per row).
+    """
+    total = np.zeros(len(next(iter(metrics.values()))))
+    count = np.zeros_like(total)
+    result: Dict[str, np.ndarray] = {}
+    for name, metric in metrics.items():
+        multiple = multiples[name]
+        valid = (metric > 0) & (multiple != 0) & ~np.isnan(multiple)
+        value = np.where(valid, metric * multiple, np.nan)
+        result[f"{prefix}_{name}"] = value
+        total += np.where(valid, value, 0.0)
+        count += valid
+    success = count > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result[f"{prefix}_average"] = np.where(success, total / count, np.nan)
+    result[f"{prefix}_count"] = count.astype(int)
+    return result, success, count
+
+
+def _normalized_label(value: Any) -> str:
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    return normalize_key(value)
+
+
+def _factorize(values: np.ndarray, n_rows: int) -> Tuple[np.ndarray, List[Any]]:
+    """(codes, distinct values) via a dict built and probed at C speed; lists/dicts are keyed by str()."""
+    # One list of objects, so NaN entries are found again by identity
+    values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+    try:
+        distinct = list(dict.fromkeys(values))
+    except TypeError:
+        values = [str(v) if isinstance(v, (list, dict, set)) else v for v in values]
+        distinct = list(dict.fromkeys(values))
+    position = {value: i for i, value in enumerate(distinct)}
+    return np.fromiter(map(position.__getitem__, values), dtype=np.intp, count=n_rows), distinct
+
+
+def _label_codes(columns: Mapping[str, np.ndarray], n_rows: int, *names: str) -> Tuple[np.ndarray, List[str]]:
+    """Factorized `normalize_key` labels: (per-row codes, labels); code 0 is "" (missing).
+
+    The first of `names` with a non-empty label wins per row. Only the
+    distinct raw values are normalized.
+    """
+    vocabulary: Dict[str, int] = {"": 0}
+    codes = np.zeros(n_rows, dtype=np.intp)
+    for name in names:
+        if name not in columns:
+            continue
+        raw_codes, raw_values = _factorize(columns[name], n_rows)
+        mapping = np.array(
+            [vocabulary.setdefault(_normalized_label(value), len(vocabulary)) for value in raw_values],
+            dtype=np.intp,
+        )
+        codes = np.where(codes == 0, mapping[raw_codes], codes)
+    return codes, list(vocabulary)
+
+
+def _size_buckets(market_cap: np.ndarray) -> np.ndarray:
+    """Vectorized `size_bucket` ("" where the market cap is unknown or not positive)."""
+    names = np.array([name for name, _ in SIZE_BUCKETS], dtype=object)
+    uppers = np.array([upper for _, upper in SIZE_BUCKETS[:-1]])
+    valid = market_cap > 0
+    buckets = names[np.searchsorted(uppers, np.where(valid, market_cap, 0.0), side="right")]
+    return np.where(valid, buckets, "")
+
+
+def _segment_multiples(
+    columns: Mapping[str, np.ndarray],
+    n_rows: int,
+    sources: Mapping[str, str],
+    defaults: Mapping[str, float],
+) -> Dict[str, np.ndarray]:
+    """Per-row segment median multiples; one index lookup per distinct segment."""
+    if not n_rows:
+        return {name: np.empty(0) for name in sources}
+    share_price = _pick(columns, n_rows, "share_price", "price")
+    shares_outstanding = _pick(columns, n_rows, "shares_outstanding", "shares")
+    derived = {"size_from_market_cap": _size_buckets(share_price * shares_outstanding)}
+    industry, industries = _label_codes(columns, n_rows, "industry", "sector")
+    region, regions = _label_codes(columns, n_rows, "region")
+    bucket, buckets = _label_codes({**columns, **derived}, n_rows, "size_bucket", "size", "size_from_market_cap")
+
+    # One integer key per (industry, region, size bucket); resolve each distinct key once
+    keys = (industry * len(regions) + region) * len(buckets) + bucket
+    segments, inverse = np.unique(keys, return_inverse=True)
+    multiples_index = _multiples_index()
+    resolved = np.empty((len(segments), len(sources)))
+    for i, key in enumerate(segments):
+        rest, b = divmod(int(key), len(buckets))
+        ind, reg = divmod(rest, len(regions))
+        segment = (industries[ind], regions[reg], buckets[b])
+        stats = {} if multiples_index is None else _segment_stats(segment, multiples_index)
+        resolved[i] = list(_segment_medians(stats, sources, defaults).values())
+    per_row = resolved[inverse.reshape(-1)]
+    return {name: per_row[:, i] for i, name in enumerate(sources)}
+
+
+def batch_comparable_multiples(
+    data: ColumnarInput,
+    industry_multiples: Optional[Mapping[str, Any]] = None,
+) -> ColumnarResult:
+    """EV/EBITDA, P/E and EV/Sales valuations per row.
+
+    `industry_multiples` values may be scalars or per-row arrays; when omitted
+    each row gets its segment medians (industry, region and size bucket
+    columns), like `calculate_comparable_multiples`.
+    """
+    columns, n_rows, index = _prepare(data)
+    if industry_multiples is None:
+        multiples = _segment_multiples(columns, n_rows, COMPARABLE_MULTIPLE_SOURCES, DEFAULT_COMPARABLE_MULTIPLES)
+    else:
+        multiples = {name: _broadcast(industry_multiples.get(name, 0.0), n_rows) for name in ("ev_ebitda", "pe", "ev_sales")}
+    metrics = {
+        "ev_ebitda": _pick(columns, n_rows, "ebitda", "operating_income", default=0.0),
+        "pe": _pick(columns, n_rows, "net_income", "net_profit", default=0.0),
+        "ev_sales": _pick(columns, n_rows, "revenue", "total_revenue", default=0.0),
+    }
+    result, success, count = _apply_multiples(metrics, multiples, "comparable")
+    result["comparable_multiples_success"] = success
+    result["comparable_multiples_confidence"] = np.where(success, np.where(count >= 2, 0.8, 0.6), np.nan)
+    return _finish(result, columns, index)
+
+
+def batch_earnings_multiple(
+    data: ColumnarInput,
+    industry_multiples: Optional[Mapping[str, Any]] = None,
+) -> ColumnarResult:
+    """EBITDA and revenue multiple valuations per row (see `calculate_earnings_multiple`)."""
+    columns, n_rows, index = _prepare(data)
+    if industry_multiples is None:
+        multiples = _segment_multiples(columns, n_rows, EARNINGS_MULTIPLE_SOURCES, DEFAULT_EARNINGS_MULTIPLES)
+    else:
+        multiples = {name: _broadcast(industry_multiples.get(name, 0.0), n_rows) for name in ("ebitda", "revenue")}
+    metrics = {
+        "ebitda": _pick(columns, n_rows, "ebitda", "operating_income", default=0.0),
+        "revenue": _pick(columns, n_rows, "revenue", "total_revenue", default=0.0),
+    }
+    result, success, count = _apply_multiples(metrics, multiples, "earnings")
+    result["earnings_multiple_success"] = success
+    result["earnings_multiple_confidence"] = np.where(success, np.where(count >= 2, 0.8, 0.6), np.nan)
+    return _finish(result, columns, index)
+
+
+# -------------------------------
+# Earning-based
+# -------------------------------
+
+def project_free_cash_flows(
+    columns: Mapping[str, np.ndarray],
+    n_rows: int,
+    forecast_years: int = 5,
+    growth: Any = DEFAULT_FCF_GROWTH,
+) -> np.ndarray:
+    """(n_rows, forecast_years) FCF projection from each row's base FCF.
+
+    Base FCF is `free_cash_flow`/`fcf`, or operating cash flow − capex when that
+    is zero; year t (0-based) is base × (1 + growth)^t.
+    """
+    fcf = _pick(columns, n_rows, "free_cash_flow", "fcf", default=0.0)
+    ocf = _pick(columns, n_rows, "operating_cash_flow", "ocf", default=0.0)
+    capex = _pick(columns, n_rows, "capital_expenditures", "capex", default=0.0)
+    fcf = np.where(fcf == 0, ocf - capex, fcf)
+    exponents = np.arange(forecast_years, dtype=float)
+    return fcf[:, None] * (1.0 + _broadcast(growth, n_rows)[:, None]) ** exponents[None, :]
+
+
+def dcf_values(
+    flows: np.ndarray,
+    wacc: np.ndarray,
+    terminal_growth_rate: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Vectorized `calculate_dcf` formula over broadcastable arrays.
+
+    `flows` has the forecast years on its last axis; `wacc` and
+    `terminal_growth_rate` broadcast against the remaining axes.
+    """
+    forecast_years = flows.shape[-1]
+    periods = np.arange(1, forecast_years + 1, dtype=float)
+    discount = (1.0 + wacc[..., None]) ** periods
+    pv_cash_flows = (flows / discount).sum(axis=-1)
+    spread = wacc - terminal_growth_rate
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terminal_value = np.where(spread != 0, flows[..., -1] * (1.0 + terminal_growth_rate) / spread, np.nan)
+    pv_terminal_value = terminal_value / (1.0 + wacc) ** forecast_years
+    return {
+        "dcf_value": pv_cash_flows + pv_terminal_value,
+        "terminal_value": terminal_value,
+        "pv_cash_flows": pv_cash_flows,
+        "pv_terminal_value": pv_terminal_value,
+    }
+
+
+def batch_dcf(
+    data: ColumnarInput,
+    free_cash_flows: Optional[Any] = None,
+    wacc: Optional[Any] = None,
+    terminal_growth_rate: Optional[Any] = None,
+    forecast_years: int = 5,
+) -> ColumnarResult:
+    """DCF per row: Σ FCF_t/(1+WACC)^t + TV/(1+WACC)^n, TV = FCF_n(1+g)/(WACC−g).
+
+    `free_cash_flows` may be an (n_rows, k) array of explicit flows (shorter
+    rows are extended at 5% growth, as in the scalar tool); otherwise flows are
+    projected from each row. `wacc`/`terminal_growth_rate` accept scalars or
+    per-row arrays; WACC defaults to each row's `wacc`/`discount_rate` or 10%.
+    Rows where WACC equals g cannot be valued and are flagged unsuccessful.
+    """
+    columns, n_rows, index = _prepare(data)
+    if free_cash_flows is None:
+        flows = project_free_cash_flows(columns, n_rows, forecast_years)
+    else:
+        flows = np.atleast_2d(np.asarray(free_cash_flows, dtype=float))
+        flows = np.broadcast_to(flows, (n_rows, flows.shape[-1])) if flows.shape[0] == 1 else flows
+        if flows.shape[1] < forecast_years:
+            extra = np.arange(1, forecast_years - flows.shape[1] + 1, dtype=float)
+            extension = flows[:, -1:] * (1.0 + DEFAULT_FCF_GROWTH) ** extra[None, :]
+            flows = np.concatenate([flows, extension], axis=1)
+        flows = flows[:, :forecast_years]
+
+    wacc_values = _pick(columns, n_rows, "wacc", "discount_rate", default=DEFAULT_WACC) if wacc is None else _broadcast(wacc, n_rows)
+    growth_values = _broadcast(DEFAULT_TERMINAL_GROWTH if terminal_growth_rate is None else terminal_growth_rate, n_rows)
+
+    values = dcf_values(flows, wacc_values, growth_values)
+    success = np.isfinite(values["dcf_value"])
+    return _finish({
+        **values,
+        "dcf_wacc": wacc_values,
+        "dcf_terminal_growth_rate": growth_values,
+        "dcf_success": success,
+        "dcf_confidence": np.where(success, np.where(wacc_values > growth_values, 0.8, 0.4), np.nan),
+    }, columns, index)
+
+
+# -------------------------------
+# All methods
+# -------------------------------
+
+def batch_valuate(
+    data: ColumnarInput,
+    methods: Optional[Sequence[str]] = None,
+    comparable_multiples: Optional[Mapping[str, Any]] = None,
+    earnings_multiples: Optional[Mapping[str, Any]] = None,
+    discounts: Optional[Mapping[str, float]] = None,
+    wacc: Optional[Any] = None,
+    terminal_growth_rate: Optional[Any] = None,
+    forecast_years: int = 5,
+) -> ColumnarResult:
+    """Run every (or the selected) batch method and merge the result columns."""
+    columns, n_rows, index = _prepare(data)
+    selected = list(methods or BATCH_METHODS)
+    unknown = set(selected) - set(BATCH_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown batch methods: {sorted(unknown)}. Available: {list(BATCH_METHODS)}")
+
+    runners = {
+        "book_value": lambda: batch_book_value(columns),
+        "liquidation_value": lambda: batch_liquidation_value(columns, discounts=discounts),
+        "market_cap": lambda: batch_market_cap(columns),
+        "comparable_multiples": lambda: batch_comparable_multiples(columns, comparable_multiples),
+        "dcf": lambda: batch_dcf(columns, wacc=wacc, terminal_growth_rate=terminal_growth_rate, forecast_years=forecast_years),
+        "earnings_multiple": lambda: batch_earnings_multiple(columns, earnings_multiples),
+    }
+    merged: Dict[str, np.ndarray] = {}
+    for method in selected:
+        merged.update(runners[method]())
+    for name in _PASSTHROUGH:
+        merged.pop(name, None)
+    return _finish(merged, columns, index)
@@ -0,0 +1,496 @@
+"""
+Benchmark suite for the valuation calculators and the data layer.
+
+Groups:
+- calculators: each `Calculations.py` tool, from explicit inputs and from a
+  statement record (memoization disabled, so every call computes)
+- batch: each `BatchValuation.py` function over N synthetic rows
+- select: `_select_record` over synthetic tables of 1k-1M records, building
+  the index on every call (cold) and reusing it (warm)
+- db: the `CompanyValuationDB` getters against `FakeAirtableServer`, a local
+  HTTP server speaking Airtable's list-records API (with pagination)
+
+Every case reports calls/sec (and items/sec for batch and db), latency
+percentiles and tracemalloc allocations (peak and retained bytes per call).
+Results can be saved as a JSON baseline and compared with a later run:
+
+    python -m Modules.CompanyValuation.Tools.Benchmarks --output bench/base.json
+    python -m Modules.CompanyValuation.Tools.Benchmarks --baseline bench/base.json
+
+The comparison exits with status 1 when a case's median latency regressed by
+more than `--tolerance` (default 25%).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+
+from . import BatchValuation, Calculations
+from . import CompanyValuationDB as db
+from .AirtableClient import rate_limiter
+from .CalculatorCache import calculator_cache
+from .RecordStore import FinancialRecord
+from .StorageBackends import AirtableBackend
+from .SyntheticData import generate_synthetic_dataset
+
+GROUPS = ("calculators", "batch", "select", "db")
+DEFAULT_SELECT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+PERCENTILES = (50, 90, 95, 99)
+
+
+# -------------------------------
+# Measurement
+# -------------------------------
+
+def measure(
+    func: Callable[[], Any],
+    min_time: float = 0.5,
+    min_calls: int = 5,
+    max_calls: int = 100_000,
+    items: int = 1,
+    warmup: int = 1,
+) -> Dict[str, Any]:
+    """Time `func()` until `min_time` has passed (at least `min_calls` calls).
+
+    Latencies are taken per call; allocations come from a separate traced
+    pass over `min_calls` calls so tracing does not skew the timings.
+    `items` is the number of rows/records one call processes.
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies: List[int] = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    while len(latencies) < max_calls and (len(latencies) < min_calls or clock() < deadline):
+        start = clock()
+        func()
+        latencies.append(clock() - start)
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(min_calls):
+        func()
+    after, peak = tracemalloc.get_traced_memory()
+    if not was_tracing:
+        tracemalloc.stop()
+
+    samples = np.asarray(latencies, dtype=float) / 1e3  # microseconds
+    total_seconds = samples.sum() / 1e6
+    calls_per_sec = len(samples) / total_seconds if total_seconds > 0 else float("inf")
+    result: Dict[str, Any] = {
+        "calls": len(samples),
+        "calls_per_sec": calls_per_sec,
+        "mean_us": float(samples.mean()),
+        **{f"p{q}_us": float(v) for q, v in zip(PERCENTILES, np.percentile(samples, PERCENTILES))},
+        "max_us": float(samples.max()),
+        "peak_alloc_bytes": int(peak - before),
+        "retained_bytes_per_call": int((after - before) / min_calls),
+    }
+    if items != 1:
+        result["items"] = items
+        result["items_per_sec"] = calls_per_sec * items
+    return result
+
+
+# -------------------------------
+# Synthetic inputs
+# -------------------------------
+
+def synthetic_statements(n_records: int, periods: Sequence[str] = ("2022", "2023", "2024")) -> List[Dict[str, Any]]:
+    """Minimal Airtable-format statement records (cheap enough for 1M rows)."""
+    rng = np.random.default_rng(7)
+    assets = rng.lognormal(20, 1.5, n_records)
+    n_periods = len(periods)
+    return [
+        {
+            "id": f"recbench{i:09d}",
+            "fields": {
+                "company": f"Company {i // n_periods:07d}",
+                "period": periods[i % n_periods],
+                "total_assets": float(assets[i]),
+                "total_liabilities": float(assets[i] * 0.55),
+                "revenue": float(assets[i] * 0.8),
+            },
+        }
+        for i in range(n_records)
+    ]
+
+
+SCALAR_INPUTS: Dict[str, Dict[str, Any]] = {
+    "calculate_book_value": {"total_assets": 5.2e9, "total_liabilities": 2.9e9},
+    "estimate_liquidation_value": {
+        "total_liabilities": 2.9e9,
+        "asset_breakdown": {"cash": 8e8, "accounts_receivable": 1.1e9, "inventory": 6e8, "ppe": 1.9e9},
+    },
+    "calculate_market_cap": {"share_price": 42.0, "shares_outstanding": 1.5e8},
+    "calculate_comparable_multiples": {
+        "revenue": 6.5e9,
+        "ebitda": 1.6e9,
+        "net_income": 8.4e8,
+        "industry_multiples": {"ev_ebitda": 9.0, "pe": 16.0, "ev_sales": 2.1},
+    },
+    "calculate_dcf": {
+        "free_cash_flows": [4.1e8, 4.4e8, 4.6e8, 4.9e8, 5.2e8],
+        "wacc": 0.095,
+        "terminal_growth_rate": 0.025,
+    },
+    "calculate_earnings_multiple": {
+        "ebitda": 1.6e9,
+        "revenue": 6.5e9,
+        "industry_multiples": {"ebitda": 9.0, "revenue": 2.1},
+    },
+}
+
+# Batch function -> extra keyword arguments (explicit multiples keep the store out of the loop)
+BATCH_FUNCTIONS: Dict[str, Dict[str, Any]] = {
+    "batch_book_value": {},
+    "batch_liquidation_value": {},
+    "batch_market_cap": {},
+    "batch_comparable_multiples": {"industry_multiples": {"ev_ebitda": 9.0, "pe": 16.0, "ev_sales": 2.1}},
+    "batch_dcf": {},
+    "batch_earnings_multiple": {"industry_multiples": {"ebitda": 9.0, "revenue": 2.1}},
+}
+
+
+# -------------------------------
+# Fake Airtable server
+# -------------------------------
+
+# The delta-sync formula of `LocalReplica.delta_formula`
+_MODIFIED_AFTER = re.compile(r"IS_AFTER\(LAST_MODIFIED_TIME\(\), DATETIME_PARSE\('([^']+)'\)\)")
+
+
+class FakeAirtableServer:
+    """Local HTTP server answering Airtable list-records requests from memory.
+
+    Serves `GET /v0/<base>/<table>` and `POST /v0/<base>/<table>/listRecords`
+    with `pageSize`/`offset` pagination, optionally adding `latency` seconds
+    per page to mimic network round trips. Records carry a last-modified
+    time (`modified`, the server's creation time unless set by `put_record`),
+    so the replica's delta-sync `filterByFormula` is honoured.
+    """
+
+    def __init__(self, tables: Mapping[str, List[Dict[str, Any]]], page_size: int = 100, latency: float = 0.0):
+        self.tables = {name: list(records) for name, records in tables.items()}
+        self.page_size = page_size
+        self.latency = latency
+        self.requests = 0
+        self.formulas: List[str] = []
+        self.created_at = datetime.now(timezone.utc)
+        self.modified: Dict[tuple, datetime] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def put_record(self, table_name: str, record: Dict[str, Any], modified: Optional[datetime] = None) -> None:
+        """Insert or replace (by id) a record, stamping its last-modified time (default now)."""
+        records = self.tables.setdefault(table_name, [])
+        for position, existing in enumerate(records):
+            if existing["id"] == record["id"]:
+                records[position] = record
+                break
+        else:
+            records.append(record)
+        self.modified[(table_name, record["id"])] = modified or datetime.now(timezone.utc)
+
+    def delete_record(self, table_name: str, record_id: str) -> None:
+        self.tables[table_name] = [rec for rec in self.tables.get(table_name, []) if rec["id"] != record_id]
+        self.modified.pop((table_name, record_id), None)
+
+    def _matching(self, table_name: str, formula: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        records = self.tables.get(table_name)
+        match = _MODIFIED_AFTER.fullmatch(formula or "")
+        if records is None or match is None:
+            return records
+        after = datetime.strptime(match.group(1), "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+        return [rec for rec in records if self.modified.get((table_name, rec["id"]), self.created_at) > after]
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page(
+        self,
+        table_name: str,
+        offset: int,
+        page_size: Optional[int],
+        formula: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        records = self._matching(table_name, formula)
+        if records is None:
+            return None
+        size = min(int(page_size or self.page_size), self.page_size)
+        body: Dict[str, Any] = {"records": records[offset:offset + size]}
+        if offset + size < len(records):
+            body["offset"] = str(offset + size)
+        return body
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, table_name: str, params: Mapping[str, Any]) -> None:
+                server.requests += 1
+                formula = params.get("filterByFormula")
+                if formula:
+                    server.formulas.append(formula)
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.page(table_name, int(params.get("offset") or 0), params.get("pageSize"), formula)
+                payload = json.dumps(body if body is not None else {"error": "NOT_FOUND"}).encode()
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                self._respond(unquote(url.path.rstrip("/").split("/")[-1]), params)
+
+            def do_POST(self) -> None:  # noqa: N802 - http.server API
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                self._respond(unquote(url.path.rstrip("/").split("/")[-2]), params)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeAirtableServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeAirtableServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+# -------------------------------
+# Benchmark groups
+# -------------------------------
+
+def bench_calculators(min_time: float) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    statement = generate_synthetic_dataset(1, ["2024"], seed=1)["financial_statements"][0]
+    record = FinancialRecord.from_record(statement)
+    saved_size = calculator_cache.maxsize
+    calculator_cache.maxsize = 0  # measure computation, not cache hits
+    try:
+        for name, inputs in SCALAR_INPUTS.items():
+            tool = getattr(Calculations, name)
+            results[f"calculators.{name}.inputs"] = measure(lambda: tool(**inputs), min_time)
+            extra = {k: v for k, v in inputs.items() if k == "industry_multiples"}
+            results[f"calculators.{name}.record"] = measure(lambda: tool(records=record, **extra), min_time)
+    finally:
+        calculator_cache.maxsize = saved_size
+    return results
+
+
+def bench_batch(n_rows: int, min_time: float) -> Dict[str, Dict[str, Any]]:
+    dataset = generate_synthetic_dataset(max(1, n_rows // 3), seed=3)
+    columns = BatchValuation.records_to_columns(dataset["financial_statements"][:n_rows])
+    rows = len(next(iter(columns.values())))
+    results = {}
+    for name, kwargs in BATCH_FUNCTIONS.items():
+        func = getattr(BatchValuation, name)
+        results[f"batch.{name}"] = measure(lambda: func(columns, **kwargs), min_time, items=rows)
+    results["batch.records_to_columns"] = measure(
+        lambda: BatchValuation.records_to_columns(dataset["financial_statements"][:n_rows]), min_time, items=rows
+    )
+    return results
+
+
+def bench_select(sizes: Iterable[int], min_time: float) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for size in sizes:
+        records = synthetic_statements(size)
+        target = records[len(records) // 2]["fields"]
+        company, period = target["company"], target["period"]
+        results[f"select.cold.{size}"] = measure(
+            lambda records=records: Calculations._select_record(iter(records), company, period),
+            min_time, min_calls=3, warmup=0, items=size,
+        )
+        results[f"select.warm.{size}"] = measure(
+            lambda records=records: Calculations._select_record(records, company, period), min_time
+        )
+        results[f"select.warm_latest.{size}"] = measure(
+            lambda records=records: Calculations._select_record(records, company), min_time
+        )
+        # The next size is generated without this list still alive
+        del records
+    return results
+
+
+def bench_db(n_companies: int, min_time: float, page_latency: float = 0.0) -> Dict[str, Dict[str, Any]]:
+    tables = generate_synthetic_dataset(n_companies, seed=5)
+    base_id = "appBENCHMARK0000"
+    bucket = rate_limiter(base_id)
+    saved_rate = (bucket.rate, bucket.capacity)
+    bucket.rate = bucket.capacity = 1e9  # measure the client, not Airtable's 5 req/s limit
+    saved_backend = db._backend
+    results = {}
+    try:
+        with FakeAirtableServer(tables, latency=page_latency) as server:
+            db.set_backend(AirtableBackend("patBENCHMARK", base_id, endpoint_url=server.url))
+            for table_name in ("financial_statements", "industry_multiples", "companiesV2", "income_statements"):
+                getter = getattr(db, f"get_{table_name}")
+                count = len(tables.get(table_name, []))
+                results[f"db.get_{table_name}"] = {
+                    **measure(getter, min_time, min_calls=3, items=count),
+                    "pages_per_call": max(1, -(-count // server.page_size)),
+                }
+            names = ("financial_statements", "industry_multiples", "income_statements", "balance_sheets")
+            total = sum(len(tables.get(name, [])) for name in names)
+            results["db.afetch_tables"] = measure(
+                lambda: asyncio.run(db.afetch_tables(*names)), min_time, min_calls=3, items=total
+            )
+    finally:
+        bucket.rate, bucket.capacity = saved_rate
+        db._backend = saved_backend
+    return results
+
+
+def run_benchmarks(
+    groups: Sequence[str] = GROUPS,
+    select_sizes: Sequence[int] = DEFAULT_SELECT_SIZES,
+    batch_rows: int = 100_000,
+    db_companies: int = 1_000,
+    min_time: float = 0.5,
+) -> Dict[str, Any]:
+    """Run the requested groups; returns {"meta": ..., "results": {case: stats}}."""
+    results: Dict[str, Dict[str, Any]] = {}
+    if "calculators" in groups:
+        results.update(bench_calculators(min_time))
+    if "batch" in groups:
+        results.update(bench_batch(batch_rows, min_time))
+    if "select" in groups:
+        results.update(bench_select(select_sizes, min_time))
+    if "db" in groups:
+        results.update(bench_db(db_companies, min_time))
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "groups": list(groups),
+            "select_sizes": list(select_sizes),
+            "batch_rows": batch_rows,
+            "db_companies": db_companies,
+        },
+        "results": results,
+    }
+
+
+# -------------------------------
+# Baselines
+# -------------------------------
+
+def save_results(report: Mapping[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare_results(
+    baseline: Mapping[str, Any],
+    current: Mapping[str, Any],
+    tolerance: float = 0.25,
+) -> List[Dict[str, Any]]:
+    """Per-case median latency change against `baseline`; `regressed` beyond `tolerance`."""
+    rows = []
+    for case, stats in current["results"].items():
+        before = baseline.get("results", {}).get(case)
+        if not before or not before.get("p50_us"):
+            continue
+        change = stats["p50_us"] / before["p50_us"] - 1.0
+        rows.append({
+            "case": case,
+            "baseline_p50_us": before["p50_us"],
+            "p50_us": stats["p50_us"],
+            "change": change,
+            "regressed": change > tolerance,
+        })
+    return rows
+
+
+def format_report(report: Mapping[str, Any]) -> str:
+    lines = [f"{'case':<58} {'calls/s':>12} {'items/s':>12} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>9}"]
+    for case, stats in report["results"].items():
+        items = f"{stats['items_per_sec']:>12.3g}" if "items_per_sec" in stats else f"{'':>12}"
+        lines.append(
+            f"{case:<58} {stats['calls_per_sec']:>12.1f} {items} {stats['p50_us']:>10.1f} "
+            f"{stats['p99_us']:>10.1f} {stats['peak_alloc_bytes'] / 1024:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the valuation calculators and data layer.")
+    parser.add_argument("--groups", nargs="*", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--select-sizes", nargs="*", type=int, default=list(DEFAULT_SELECT_SIZES))
+    parser.add_argument("--batch-rows", type=int, default=100_000)
+    parser.add_argument("--db-companies", type=int, default=1_000)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to spend per case")
+    parser.add_argument("--output", help="Write results as a JSON baseline to this path")
+    parser.add_argument("--baseline", help="Compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median latency increase")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.groups, args.select_sizes, args.batch_rows, args.db_companies, args.min_time)
+    print(format_report(report))
+    if args.output:
+        save_results(report, args.output)
+        print(f"Saved {len(report['results'])} results to {args.output}")
+    if args.baseline:
+        rows = compare_results(load_results(args.baseline), report, args.tolerance)
+        regressions = [row for row in rows if row["regressed"]]
+        for row in rows:
+            flag = "REGRESSED" if row["regressed"] else ""
+            print(f"{row['case']:<58} {row['baseline_p50_us']:>10.1f} -> {row['p50_us']:>10.1f} us ({row['change']:+.1%}) {flag}")
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
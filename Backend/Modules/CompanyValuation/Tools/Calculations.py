@@ -14,14 +14,22 @@ Return payloads are structured dicts with numeric results, confidence, and notes
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, Mapping, Optional
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
 
 try:
     # Prefer local module (within CompanyValuation/Tools)
-    from .CompanyValuationDB import get_financial_statements, get_industry_multiples
+    from .CalculatorCache import memoize
+    from .MaterializedResults import materialized
+    from .MultiplesIndex import MultiplesIndex, get_multiples_index, record_segment
+    from .RecordStore import FinancialRecord, index_for
+    from .ValuationWriter import PRIMARY_RESULT, write_behind
 except Exception:  # pragma: no cover - fallback to sibling Tools placement
     # Fallback to Backend/Tools if imported from another context
-    from ..Tools.CompanyValuationDB import get_financial_statements, get_industry_multiples  # type: ignore
+    from ..Tools.CalculatorCache import memoize  # type: ignore
+    from ..Tools.MaterializedResults import materialized  # type: ignore
+    from ..Tools.MultiplesIndex import MultiplesIndex, get_multiples_index, record_segment  # type: ignore
+    from ..Tools.RecordStore import FinancialRecord, index_for  # type: ignore
+    from ..Tools.ValuationWriter import PRIMARY_RESULT, write_behind  # type: ignore
 
 
 # -------------------------------
@@ -50,28 +58,40 @@ def _select_record(
 
     Preference order:
     1) Matches both company and period (if provided)
-    2) Matches company only
+    2) Latest period for the company
     3) First record
     """
-    records_list = list(records) if records is not None else []
-    if not records_list:
+    if records is None:
         return None
+    return index_for(records).record(company, period)
 
-    def matches(rec: Mapping[str, Any], key: str, value: str) -> bool:
-        fields = _extract_fields(rec)
-        return str(fields.get(key, "")).strip().lower() == value.strip().lower()
 
-    if company and period:
-        for rec in records_list:
-            if matches(rec, "company", company) and matches(rec, "period", period):
-                return rec
+def _lookup_fields(
+    records: Optional[Iterable[Mapping[str, Any]]],
+    company: Optional[str] = None,
+    period: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Normalized fields of the selected record, served from the indexed store.
 
-    if company:
-        for rec in records_list:
-            if matches(rec, "company", company):
-                return rec
+    Falls back to the data store when `records` is None. The returned dict is
+    shared with the index and must not be mutated.
+    """
+    return index_for(records).lookup(company, period)
 
-    return records_list[0]
+
+def _lookup_record(
+    records: Optional[Any],
+    company: Optional[str] = None,
+    period: Optional[str] = None,
+) -> Optional[FinancialRecord]:
+    """Alias-resolved `FinancialRecord` for the selected record.
+
+    `records` may be Airtable-like records, `FinancialRecord`s, a single
+    `FinancialRecord`, or None to use the data store.
+    """
+    if isinstance(records, FinancialRecord):
+        return records
+    return index_for(records).lookup_record(company, period)
 
 
 def _get_number(fields: Mapping[str, Any], *keys: str, default: float = 0.0) -> float:
@@ -81,10 +101,99 @@ def _get_number(fields: Mapping[str, Any], *keys: str, default: float = 0.0) ->
     return float(default)
 
 
+# DCF assumptions used when the inputs do not provide them
+DEFAULT_FCF_GROWTH = 0.05
+DEFAULT_WACC = 0.10
+DEFAULT_TERMINAL_GROWTH = 0.03
+
+# Fallback multiples when the industry_multiples table is empty or unreachable
+DEFAULT_COMPARABLE_MULTIPLES: Dict[str, float] = {"ev_ebitda": 8.0, "pe": 15.0, "ev_sales": 2.0}
+DEFAULT_EARNINGS_MULTIPLES: Dict[str, float] = {"ebitda": 8.0, "revenue": 2.0}
+
+
+# Tool multiple -> MultiplesIndex statistic it is read from
+COMPARABLE_MULTIPLE_SOURCES: Dict[str, str] = {"ev_ebitda": "ev_ebitda", "pe": "pe", "ev_sales": "ev_sales"}
+EARNINGS_MULTIPLE_SOURCES: Dict[str, str] = {"ebitda": "ev_ebitda", "revenue": "ev_sales"}
+
+
+def _multiples_index() -> Optional[MultiplesIndex]:
+    try:
+        return get_multiples_index()
+    except Exception:
+        return None
+
+
+def _segment_stats(
+    segment: Optional[Tuple[str, str, str]] = None,
+    index: Optional[MultiplesIndex] = None,
+) -> Dict[str, Any]:
+    """Multiple statistics for an (industry, region, size bucket) segment; {} without data."""
+    index = _multiples_index() if index is None else index
+    if index is None:
+        return {}
+    return index.lookup(*(segment or ()))
+
+
+def _segment_medians(
+    stats: Mapping[str, Any],
+    sources: Mapping[str, str],
+    defaults: Mapping[str, float],
+) -> Dict[str, float]:
+    return {
+        name: stats[source]["median"] if stats.get(source) else defaults[name]
+        for name, source in sources.items()
+    }
+
+
+def _multiples_note(stats: Mapping[str, Any]) -> str:
+    segments = sorted({entry["segment"] for entry in stats.values() if entry})
+    if not segments:
+        return "Default industry multiples used (no industry multiples data)."
+    labels = [" / ".join(part for part in segment if part) or "all industries" for segment in segments]
+    return f"Industry multiples are segment medians ({', '.join(labels)})."
+
+
+def _company_segment(
+    record: Optional[FinancialRecord],
+    records: Optional[Any],
+    company: Optional[str],
+    period: Optional[str],
+) -> Tuple[str, str, str]:
+    """Segment of the company's statement record, looked up if not loaded yet."""
+    if record is None and (company or records is not None):
+        try:
+            record = _lookup_record(records, company=company, period=period)
+        except Exception:
+            record = None
+    return record_segment(record)
+
+
+def _comparable_industry_multiples(
+    segment: Optional[Tuple[str, str, str]] = None,
+    index: Optional[MultiplesIndex] = None,
+) -> Dict[str, float]:
+    """Median EV/EBITDA, P/E and EV/Sales of the segment (or defaults).
+
+    `segment` is (industry, region, size bucket); None means all industries.
+    """
+    return _segment_medians(_segment_stats(segment, index), COMPARABLE_MULTIPLE_SOURCES, DEFAULT_COMPARABLE_MULTIPLES)
+
+
+def _earnings_industry_multiples(
+    segment: Optional[Tuple[str, str, str]] = None,
+    index: Optional[MultiplesIndex] = None,
+) -> Dict[str, float]:
+    """Median EBITDA (EV/EBITDA) and revenue (EV/Sales) multiples of the segment (or defaults)."""
+    return _segment_medians(_segment_stats(segment, index), EARNINGS_MULTIPLE_SOURCES, DEFAULT_EARNINGS_MULTIPLES)
+
+
 # -------------------------------
 # Tool 1: Book Value Calculator
 # -------------------------------
 
+@memoize
+@materialized(explicit=("total_assets", "total_liabilities"))
+@write_behind(overrides=("total_assets", "total_liabilities"))
 def calculate_book_value(
     company: Optional[str] = None,
     period: Optional[str] = None,
@@ -101,9 +210,8 @@ def calculate_book_value(
     """
     # Prefer explicit inputs if provided
     if total_assets is None or total_liabilities is None:
-        records_source = records if records is not None else get_financial_statements()
-        chosen = _select_record(records_source, company=company, period=period)
-        if not chosen:
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
             return {
                 "tool": "calculate_book_value",
                 "company": company,
@@ -111,10 +219,10 @@ def calculate_book_value(
                 "success": False,
                 "message": "No financial statement records available.",
             }
+        period = record.period or period
 
-        fields = _extract_fields(chosen)
-        total_assets = _get_number(fields, "total_assets", "assets") if total_assets is None else total_assets
-        total_liabilities = _get_number(fields, "total_liabilities", "liabilities") if total_liabilities is None else total_liabilities
+        total_assets = (record.total_assets or 0.0) if total_assets is None else total_assets
+        total_liabilities = (record.total_liabilities or 0.0) if total_liabilities is None else total_liabilities
 
     book_value = float(total_assets) - float(total_liabilities)
 
@@ -164,7 +272,56 @@ DEFAULT_LIQUIDATION_DISCOUNTS: Dict[str, float] = {
     "other_assets": 0.30,
 }
 
+# Record fields inspected when no explicit asset breakdown is given
+LIQUIDATION_CANDIDATE_KEYS = frozenset({
+    "assets",
+    "total_assets",
+    "cash",
+    "cash_and_equivalents",
+    "marketable_securities",
+    "accounts_receivable",
+    "receivables",
+    "inventory",
+    "prepaid_expenses",
+    "pp&e",
+    "ppe",
+    "property_plant_equipment",
+    "intangibles",
+    "goodwill",
+    "other_assets",
+})
+
+
+def _infer_asset_breakdown(fields: Mapping[str, Any], discounts_map: Dict[str, float]) -> Dict[str, float]:
+    """Asset categories present in a record's fields.
+
+    If no category is found but total assets are present, returns
+    {"total_assets": value} and adds the blanket 0.70 forced-sale discount to
+    `discounts_map` (unless it already has one).
+    """
+    inferred_breakdown: Dict[str, float] = {}
+    candidate_keys = set(discounts_map.keys()) | LIQUIDATION_CANDIDATE_KEYS
+    total_assets_value = None
+    for key in candidate_keys:
+        if key in fields and isinstance(fields[key], (int, float)):
+            value = float(fields[key])
+            if key in ("assets", "total_assets"):
+                total_assets_value = value
+            else:
+                inferred_breakdown[key] = value
+
+    # If no breakdown found but total assets present, apply blanket discount as proxy
+    if not inferred_breakdown and total_assets_value is not None:
+        inferred_breakdown = {"total_assets": total_assets_value}
+        # Use a conservative blanket discount for forced sale
+        if "total_assets" not in discounts_map:
+            discounts_map["total_assets"] = 0.70
+    return inferred_breakdown
+
 
+@memoize
+@materialized(explicit=("asset_breakdown", "total_liabilities"))
+@write_behind(overrides=("asset_breakdown", "total_liabilities"))
 def estimate_liquidation_value(
     company: Optional[str] = None,
     period: Optional[str] = None,
@@ -182,55 +339,24 @@ def estimate_liquidation_value(
     discounts_map = _safe_lower_keys(discounts or DEFAULT_LIQUIDATION_DISCOUNTS)
 
     # Source data
-    chosen_fields: Dict[str, Any] = {}
+    chosen_fields: Mapping[str, Any] = {}
+    record = None
     if asset_breakdown is None or total_liabilities is None:
-        records_source = records if records is not None else get_financial_statements()
-        chosen = _select_record(records_source, company=company, period=period)
-        if chosen:
-            chosen_fields = _extract_fields(chosen)
+        record = _lookup_record(records, company=company, period=period)
+        chosen_fields = record.fields if record is not None else {}
+        if record is not None:
+            period = record.period or period
 
     # Determine liabilities
     if total_liabilities is None:
-        total_liabilities = _get_number(chosen_fields, "total_liabilities", "liabilities", default=0.0)
+        total_liabilities = (record.total_liabilities or 0.0) if record is not None else 0.0
 
     # Determine asset breakdown
     inferred_breakdown: Dict[str, float] = {}
     if asset_breakdown is not None:
         inferred_breakdown = {str(k).lower(): float(v) for k, v in asset_breakdown.items()}
     else:
-        # Try to infer common categories
-        candidate_keys = set(discounts_map.keys()) | {
-            "assets",
-            "total_assets",
-            "cash",
-            "cash_and_equivalents",
-            "marketable_securities",
-            "accounts_receivable",
-            "receivables",
-            "inventory",
-            "prepaid_expenses",
-            "pp&e",
-            "ppe",
-            "property_plant_equipment",
-            "intangibles",
-            "goodwill",
-            "other_assets",
-        }
-        total_assets_value = None
-        for key in candidate_keys:
-            if key in chosen_fields and isinstance(chosen_fields[key], (int, float)):
-                value = float(chosen_fields[key])
-                if key in ("assets", "total_assets"):
-                    total_assets_value = value
-                else:
-                    inferred_breakdown[key] = value
-
-        # If no breakdown found but total assets present, apply blanket discount as proxy
-        if not inferred_breakdown and total_assets_value is not None:
-            inferred_breakdown = {"total_assets": total_assets_value}
-            # Use a conservative blanket discount for forced sale
-            if "total_assets" not in discounts_map:
-                discounts_map["total_assets"] = 0.70
+        inferred_breakdown = _infer_asset_breakdown(chosen_fields, discounts_map)
 
     # Compute discounted asset value
     discounted_total = 0.0
@@ -275,6 +401,9 @@ def estimate_liquidation_value(
 # MARKET-BASED VALUATION TOOLS
 # -------------------------------
 
+@memoize
+@materialized(explicit=("share_price", "shares_outstanding"))
+@write_behind(overrides=("share_price", "shares_outstanding"))
 def calculate_market_cap(
     company: Optional[str] = None,
     period: Optional[str] = None,
@@ -288,9 +417,8 @@ def calculate_market_cap(
     """
     # Prefer explicit inputs if provided
     if share_price is None or shares_outstanding is None:
-        records_source = records if records is not None else get_financial_statements()
-        chosen = _select_record(records_source, company=company, period=period)
-        if not chosen:
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
             return {
                 "tool": "calculate_market_cap",
                 "company": company,
@@ -298,10 +426,10 @@ def calculate_market_cap(
                 "success": False,
                 "message": "No financial statement records available.",
             }
+        period = record.period or period
 
-        fields = _extract_fields(chosen)
-        share_price = _get_number(fields, "share_price", "price") if share_price is None else share_price
-        shares_outstanding = _get_number(fields, "shares_outstanding", "shares") if shares_outstanding is None else shares_outstanding
+        share_price = (record.share_price or 0.0) if share_price is None else share_price
+        shares_outstanding = (record.shares_outstanding or 0.0) if shares_outstanding is None else shares_outstanding
 
     if share_price is None or shares_outstanding is None or share_price <= 0 or shares_outstanding <= 0:
         return {
@@ -338,6 +466,12 @@ def calculate_market_cap(
     }
 
 
+@memoize
+@materialized(
+    {"industry_multiples": lambda record: _comparable_industry_multiples(record_segment(record))},
+    explicit=("revenue", "ebitda", "net_income"),
+)
+@write_behind(overrides=("revenue", "ebitda", "net_income"))
 def calculate_comparable_multiples(
     company: Optional[str] = None,
     period: Optional[str] = None,
@@ -352,13 +486,15 @@ def calculate_comparable_multiples(
 ) -> Dict[str, Any]:
     """Calculate company value using comparable industry multiples.
     
-    Supports EV/EBITDA, P/E, and EV/Sales multiples.
+    Supports EV/EBITDA, P/E, and EV/Sales multiples. Without
+    `industry_multiples`, the medians of the company's industry segment
+    (industry, region, size bucket) from the multiples index are used.
     """
+    record = None
     # Prefer explicit inputs if provided
     if any(x is None for x in [revenue, ebitda, net_income]):
-        records_source = records if records is not None else get_financial_statements()
-        chosen = _select_record(records_source, company=company, period=period)
-        if not chosen:
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
             return {
                 "tool": "calculate_comparable_multiples",
                 "company": company,
@@ -366,37 +502,20 @@ def calculate_comparable_multiples(
                 "success": False,
                 "message": "No financial statement records available.",
             }
+        period = record.period or period
 
-        fields = _extract_fields(chosen)
-        revenue = _get_number(fields, "revenue", "total_revenue") if revenue is None else revenue
-        ebitda = _get_number(fields, "ebitda", "operating_income") if ebitda is None else ebitda
-        net_income = _get_number(fields, "net_income", "net_profit") if net_income is None else net_income
+        revenue = (record.revenue or 0.0) if revenue is None else revenue
+        ebitda = (record.ebitda or 0.0) if ebitda is None else ebitda
+        net_income = (record.net_income or 0.0) if net_income is None else net_income
 
     # Get industry multiples if not provided
+    multiples_note = None
     if industry_multiples is None:
-        try:
-            multiples_records = get_industry_multiples()
-            if multiples_records:
-                # Use first available industry multiple record
-                multiples_fields = _extract_fields(multiples_records[0])
-                industry_multiples = {
-                    "ev_ebitda": _get_number(multiples_fields, "ev_ebitda", "ev_ebitda_multiple", default=8.0),
-                    "pe": _get_number(multiples_fields, "pe", "pe_multiple", default=15.0),
-                    "ev_sales": _get_number(multiples_fields, "ev_sales", "ev_sales_multiple", default=2.0),
-                }
-            else:
-                # Default industry multiples
-                industry_multiples = {
-                    "ev_ebitda": 8.0,
-                    "pe": 15.0,
-                    "ev_sales": 2.0,
-                }
-        except Exception:
-            industry_multiples = {
-                "ev_ebitda": 8.0,
-                "pe": 15.0,
-                "ev_sales": 2.0,
-            }
+        stats = _segment_stats(_company_segment(record, records, company, period))
+        industry_multiples = _segment_medians(stats, COMPARABLE_MULTIPLE_SOURCES, DEFAULT_COMPARABLE_MULTIPLES)
+        multiples_note = _multiples_note(stats)
+    else:
+        industry_multiples = dict(industry_multiples)
 
     # Override with explicit multiples if provided
     if ev_ebitda_multiple is not None:
@@ -433,6 +552,8 @@ def calculate_comparable_multiples(
     notes = []
     if len(valuations) < 3:
         notes.append(f"Only {len(valuations)} multiple(s) calculated due to missing data.")
+    if multiples_note:
+        notes.append(multiples_note)
     notes.append("Multiples should be adjusted for company-specific risk factors.")
 
     confidence = 0.8 if len(valuations) >= 2 else 0.6
@@ -461,6 +582,9 @@ def calculate_comparable_multiples(
 # EARNING-BASED VALUATION TOOLS
 # -------------------------------
 
+@memoize
+@materialized(explicit=("free_cash_flows", "wacc"))
+@write_behind(overrides=("free_cash_flows", "wacc"))
 def calculate_dcf(
     company: Optional[str] = None,
     period: Optional[str] = None,
@@ -477,9 +601,8 @@ def calculate_dcf(
     """
     # Prefer explicit inputs if provided
     if free_cash_flows is None or wacc is None:
-        records_source = records if records is not None else get_financial_statements()
-        chosen = _select_record(records_source, company=company, period=period)
-        if not chosen:
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
             return {
                 "tool": "calculate_dcf",
                 "company": company,
@@ -487,28 +610,28 @@ def calculate_dcf(
                 "success": False,
                 "message": "No financial statement records available.",
             }
+        period = record.period or period
 
-        fields = _extract_fields(chosen)
         if free_cash_flows is None:
             # Try to extract FCF or calculate from available data
-            fcf = _get_number(fields, "free_cash_flow", "fcf")
+            fcf = record.free_cash_flow or 0.0
             if fcf == 0:
                 # Calculate FCF = Operating Cash Flow - CapEx
-                ocf = _get_number(fields, "operating_cash_flow", "ocf")
-                capex = _get_number(fields, "capital_expenditures", "capex")
+                ocf = record.operating_cash_flow or 0.0
+                capex = record.capital_expenditures or 0.0
                 fcf = ocf - capex
             if fcf != 0:
                 # Project FCF for forecast years with simple growth assumption
-                growth = 0.05  # 5% default growth
+                growth = DEFAULT_FCF_GROWTH  # 5% default growth
                 free_cash_flows = [fcf * (1 + growth) ** i for i in range(forecast_years)]
             else:
                 free_cash_flows = [0] * forecast_years
 
         if wacc is None:
-            wacc = _get_number(fields, "wacc", "discount_rate", default=0.10)
+            wacc = record.wacc if record.wacc is not None else DEFAULT_WACC
 
     if terminal_growth_rate is None:
-        terminal_growth_rate = 0.03  # 3% default terminal growth
+        terminal_growth_rate = DEFAULT_TERMINAL_GROWTH  # 3% default terminal growth
 
     if not free_cash_flows or len(free_cash_flows) == 0:
         return {
@@ -523,7 +646,7 @@ def calculate_dcf(
     if len(free_cash_flows) < forecast_years:
         # Extend with last year's growth
         last_fcf = free_cash_flows[-1] if free_cash_flows else 0
-        growth = 0.05  # 5% default growth
+        growth = DEFAULT_FCF_GROWTH  # 5% default growth
         while len(free_cash_flows) < forecast_years:
             free_cash_flows.append(last_fcf * (1 + growth))
             last_fcf = free_cash_flows[-1]
@@ -571,6 +694,12 @@ def calculate_dcf(
     }
 
 
+@memoize
+@materialized(
+    {"industry_multiples": lambda record: _earnings_industry_multiples(record_segment(record))},
+    explicit=("ebitda", "revenue"),
+)
+@write_behind(overrides=("ebitda", "revenue"))
 def calculate_earnings_multiple(
     company: Optional[str] = None,
     period: Optional[str] = None,
@@ -583,13 +712,15 @@ def calculate_earnings_multiple(
 ) -> Dict[str, Any]:
     """Calculate company value using earnings and revenue multiples.
     
-    Supports EBITDA and Revenue multiples.
+    Supports EBITDA and Revenue multiples. Without `industry_multiples`,
+    the company's industry segment medians are used (see
+    `calculate_comparable_multiples`).
     """
+    record = None
     # Prefer explicit inputs if provided
     if ebitda is None or revenue is None:
-        records_source = records if records is not None else get_financial_statements()
-        chosen = _select_record(records_source, company=company, period=period)
-        if not chosen:
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
             return {
                 "tool": "calculate_earnings_multiple",
                 "company": company,
@@ -597,31 +728,19 @@ def calculate_earnings_multiple(
                 "success": False,
                 "message": "No financial statement records available.",
             }
+        period = record.period or period
 
-        fields = _extract_fields(chosen)
-        ebitda = _get_number(fields, "ebitda", "operating_income") if ebitda is None else ebitda
-        revenue = _get_number(fields, "revenue", "total_revenue") if revenue is None else revenue
+        ebitda = (record.ebitda or 0.0) if ebitda is None else ebitda
+        revenue = (record.revenue or 0.0) if revenue is None else revenue
 
     # Get industry multiples if not provided
+    multiples_note = None
     if industry_multiples is None:
-        try:
-            multiples_records = get_industry_multiples()
-            if multiples_records:
-                multiples_fields = _extract_fields(multiples_records[0])
-                industry_multiples = {
-                    "ebitda": _get_number(multiples_fields, "ebitda_multiple", "ev_ebitda", default=8.0),
-                    "revenue": _get_number(multiples_fields, "revenue_multiple", "ev_sales", default=2.0),
-                }
-            else:
-                industry_multiples = {
-                    "ebitda": 8.0,
-                    "revenue": 2.0,
-                }
-        except Exception:
-            industry_multiples = {
-                "ebitda": 8.0,
-                "revenue": 2.0,
-            }
+        stats = _segment_stats(_company_segment(record, records, company, period))
+        industry_multiples = _segment_medians(stats, EARNINGS_MULTIPLE_SOURCES, DEFAULT_EARNINGS_MULTIPLES)
+        multiples_note = _multiples_note(stats)
+    else:
+        industry_multiples = dict(industry_multiples)
 
     # Override with explicit multiples if provided
     if ebitda_multiple is not None:
@@ -653,6 +772,8 @@ def calculate_earnings_multiple(
     notes = []
     if len(valuations) < 2:
         notes.append(f"Only {len(valuations)} multiple(s) calculated due to missing data.")
+    if multiples_note:
+        notes.append(multiples_note)
     notes.append("Multiples should be adjusted for company-specific factors and growth prospects.")
 
     confidence = 0.8 if len(valuations) >= 2 else 0.6
@@ -675,3 +796,138 @@ def calculate_earnings_multiple(
         "notes": "; ".join(notes),
     }
 
+
+
+# -------------------------------
+# TRIANGULATION
+# -------------------------------
+
+# Valuation approach -> calculators contributing to it
+TRIANGULATION_APPROACHES: Dict[str, tuple] = {
+    "asset_based": ("calculate_book_value", "estimate_liquidation_value"),
+    "market_based": ("calculate_market_cap", "calculate_comparable_multiples"),
+    "earning_based": ("calculate_dcf", "calculate_earnings_multiple"),
+}
+
+
+@memoize
+def triangulate_valuation(
+    company: Optional[str] = None,
+    period: Optional[str] = None,
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+    industry_multiples: Optional[Mapping[str, float]] = None,
+    discounts: Optional[Mapping[str, float]] = None,
+    wacc: Optional[float] = None,
+    terminal_growth_rate: Optional[float] = None,
+    forecast_years: int = 5,
+) -> Dict[str, Any]:
+    """Run all six valuation methods in one call and triangulate the results.
+
+    The statement record and the industry multiples are fetched once and
+    shared by every method. Each approach (asset-, market-, earning-based)
+    is the average of its successful methods; the triangulated value is the
+    average of the approaches, alongside a confidence-weighted average.
+    `industry_multiples` may combine comparable keys (ev_ebitda, pe,
+    ev_sales) and earnings keys (ebitda, revenue); keys it omits use the
+    company's segment medians.
+    """
+    record = _lookup_record(records, company=company, period=period)
+    if record is None:
+        return {
+            "tool": "triangulate_valuation",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": "No financial statement records available.",
+        }
+
+    # Caller-supplied multiples overlay the segment medians key by key
+    supplied = dict(industry_multiples or {})
+    comparable_multiples = {k: supplied[k] for k in COMPARABLE_MULTIPLE_SOURCES if k in supplied}
+    earnings_multiples = {k: supplied[k] for k in EARNINGS_MULTIPLE_SOURCES if k in supplied}
+    if comparable_multiples.keys() < COMPARABLE_MULTIPLE_SOURCES.keys() or (
+        earnings_multiples.keys() < EARNINGS_MULTIPLE_SOURCES.keys()
+    ):
+        index = _multiples_index()
+        segment = record_segment(record)
+        comparable_multiples = {**_comparable_industry_multiples(segment, index), **comparable_multiples}
+        earnings_multiples = {**_earnings_industry_multiples(segment, index), **earnings_multiples}
+
+    # Every method reads the same record; none of them touches the data store again
+    company = company or record.company
+    period = period or record.period
+    shared = {"company": company, "period": period, "records": record}
+    methods = {
+        "calculate_book_value": calculate_book_value(**shared),
+        "estimate_liquidation_value": estimate_liquidation_value(**shared, discounts=discounts),
+        "calculate_market_cap": calculate_market_cap(**shared),
+        "calculate_comparable_multiples": calculate_comparable_multiples(**shared, industry_multiples=comparable_multiples),
+        "calculate_dcf": calculate_dcf(
+            **shared, wacc=wacc, terminal_growth_rate=terminal_growth_rate, forecast_years=forecast_years
+        ),
+        "calculate_earnings_multiple": calculate_earnings_multiple(**shared, industry_multiples=earnings_multiples),
+    }
+
+    values: Dict[str, float] = {}
+    for name, payload in methods.items():
+        if payload.get("success"):
+            value = payload["result"].get(PRIMARY_RESULT[name])
+            if isinstance(value, (int, float)):
+                values[name] = float(value)
+
+    approaches: Dict[str, Dict[str, Any]] = {}
+    for approach, names in TRIANGULATION_APPROACHES.items():
+        approach_values = [values[name] for name in names if name in values]
+        if approach_values:
+            confidences = [float(methods[name].get("confidence") or 0.0) for name in names if name in values]
+            approaches[approach] = {
+                "value": sum(approach_values) / len(approach_values),
+                "confidence": sum(confidences) / len(confidences),
+                "methods": [name for name in names if name in values],
+            }
+
+    if not approaches:
+        return {
+            "tool": "triangulate_valuation",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": "No valuation method succeeded.",
+            "methods": methods,
+        }
+
+    approach_values = [a["value"] for a in approaches.values()]
+    weight_total = sum(a["confidence"] for a in approaches.values())
+    weighted = (
+        sum(a["value"] * a["confidence"] for a in approaches.values()) / weight_total if weight_total else None
+    )
+
+    notes = []
+    missing = [name for name in methods if name not in values]
+    if missing:
+        notes.append(f"Excluded (no result): {', '.join(missing)}.")
+    if len(approaches) < 3:
+        notes.append(f"Only {len(approaches)} of 3 approaches available.")
+    notes.append("Triangulated value is the simple average of the approach values.")
+
+    return {
+        "tool": "triangulate_valuation",
+        "company": company,
+        "period": period,
+        "success": True,
+        "inputs": {
+            "comparable_multiples": comparable_multiples,
+            "earnings_multiples": earnings_multiples,
+            "forecast_years": forecast_years,
+        },
+        "result": {
+            "method_values": values,
+            "approaches": approaches,
+            "triangulated_value": sum(approach_values) / len(approach_values),
+            "confidence_weighted_value": weighted,
+            "valuation_range": {"low": min(values.values()), "high": max(values.values())},
+        },
+        "methods": methods,
+        "confidence": round(sum(a["confidence"] for a in approaches.values()) / 3, 4),
+        "notes": "; ".join(notes),
+    }
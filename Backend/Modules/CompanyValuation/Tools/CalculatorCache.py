@@ -0,0 +1,208 @@
+"""
+Memoization for the calculator tools.
+
+With explicit inputs the `calculate_*` tools are pure, yet agents call them
+repeatedly with identical arguments while writing one report. `memoize`
+caches their payloads in a bounded LRU keyed by the canonicalized call:
+
+- Arguments are bound to the signature (defaults applied), so positional and
+  keyword calls share an entry; lists, tuples, sets and mappings (e.g.
+  `free_cash_flows`, `discounts`, `records`) become nested tuples, with
+  mapping keys tagged by type so `{1: x}` and `{"1": x}` differ.
+- Calls with more than `MAX_MEMOIZED_RECORDS` caller-supplied `records` are
+  not cached (counted as uncacheable).
+- A call that reads from the data store (a `get_*` helper or `table_version`)
+  is not cached, since its result depends on data that can change.
+- Payloads are copied in and out of the cache, so callers may mutate them.
+
+`CALCULATOR_CACHE_SIZE` sets the capacity (default 1024; 0 disables caching).
+`cache_info()` reports hits, misses and bypassed calls per tool.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+CALCULATOR_CACHE_SIZE = int(os.getenv("CALCULATOR_CACHE_SIZE", "1024") or 0)
+
+# Calls passing more `records` than this are not memoized: hashing the whole
+# list would cost more than the calculation, which reuses the list's index.
+MAX_MEMOIZED_RECORDS = 100
+
+# Per-call flag box, set while a memoized call runs
+_store_access: ContextVar[Optional[List[bool]]] = ContextVar("calculator_store_access", default=None)
+
+
+def note_data_store_access() -> None:
+    """Mark the running memoized call (if any) as dependent on the data store."""
+    box = _store_access.get()
+    if box is not None:
+        box[0] = True
+
+
+class _Uncacheable(TypeError):
+    pass
+
+
+_ATOMS = (type(None), str, bytes, bool, int, float)
+
+
+def canonicalize(value: Any) -> Any:
+    """Hashable, order-insensitive (for mappings/sets) representation of `value`."""
+    kind = type(value)
+    if kind in _ATOMS:
+        return value
+    if kind is dict:
+        return ("map", tuple(sorted(((type(k).__name__, canonicalize(k)), canonicalize(v)) for k, v in value.items())))
+    if kind is list or kind is tuple:
+        return ("seq", tuple(canonicalize(v) for v in value))
+    if isinstance(value, (str, bytes, bool, int, float)):
+        return value
+    if isinstance(value, Mapping):
+        return ("map", tuple(sorted(((type(k).__name__, canonicalize(k)), canonicalize(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ("seq", tuple(canonicalize(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ("set", tuple(sorted((canonicalize(v) for v in value), key=repr)))
+    if hasattr(value, "tolist"):  # NumPy arrays and scalars
+        return canonicalize(value.tolist())
+    if callable(getattr(value, "cache_key", None)):  # e.g. FinancialRecord
+        return (type(value).__name__, canonicalize(value.cache_key()))
+    try:
+        hash(value)
+    except TypeError:
+        raise _Uncacheable(type(value).__name__) from None
+    return value
+
+
+def _copy_payload(value: Any) -> Any:
+    """Copy of a JSON-like payload (much cheaper than `copy.deepcopy`)."""
+    if isinstance(value, dict):
+        return {k: _copy_payload(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_payload(v) for v in value]
+    return value
+
+
+class CalculatorCache:
+    """Thread-safe bounded LRU of calculator payloads with per-tool counters."""
+
+    def __init__(self, maxsize: int = CALCULATOR_CACHE_SIZE):
+        self.maxsize = max(0, int(maxsize))
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, tool: str, name: str) -> None:
+        counters = self.stats.setdefault(tool, {"hits": 0, "misses": 0, "bypassed": 0, "uncacheable": 0})
+        counters[name] += 1
+
+    def get(self, key: tuple) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._count(key[0], "hits")
+                return self._entries[key]
+            return None
+
+    def put(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def count(self, tool: str, name: str) -> None:
+        with self._lock:
+            self._count(tool, name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats.clear()
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {"hits": 0, "misses": 0, "bypassed": 0, "uncacheable": 0}
+            for counters in self.stats.values():
+                for name, value in counters.items():
+                    totals[name] += value
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                **totals,
+                "tools": {tool: dict(counters) for tool, counters in self.stats.items()},
+            }
+
+
+calculator_cache = CalculatorCache()
+
+
+def cache_info() -> Dict[str, Any]:
+    """Hit/miss/bypass counts (total and per tool) and current cache size."""
+    return calculator_cache.info()
+
+
+def clear_calculator_cache() -> None:
+    calculator_cache.clear()
+
+
+def memoize(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Cache `func`'s payloads for calls that do not touch the data store."""
+    signature = inspect.signature(func)
+    tool = func.__name__
+    defaults = {
+        name: param.default
+        for name, param in signature.parameters.items()
+        if param.default is not inspect.Parameter.empty
+    }
+    keyword_only_call = len(defaults) == len(signature.parameters)
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if calculator_cache.maxsize == 0:
+            return func(*args, **kwargs)
+        try:
+            if not args and keyword_only_call and kwargs.keys() <= defaults.keys():
+                # Fast path for agent tool calls (keywords only)
+                arguments = {**defaults, **kwargs}
+            else:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = bound.arguments
+            records = arguments.get("records")
+            if isinstance(records, (list, tuple)) and len(records) > MAX_MEMOIZED_RECORDS:
+                raise _Uncacheable("records")
+            key = (tool, canonicalize(arguments))
+        except (TypeError, RecursionError):
+            calculator_cache.count(tool, "uncacheable")
+            return func(*args, **kwargs)
+
+        cached = calculator_cache.get(key)
+        if cached is not None:
+            return _copy_payload(cached)
+
+        box = [False]
+        outer = _store_access.get()
+        token = _store_access.set(box)
+        try:
+            payload = func(*args, **kwargs)
+        finally:
+            _store_access.reset(token)
+            if box[0] and outer is not None:
+                outer[0] = True
+
+        if box[0]:
+            calculator_cache.count(tool, "bypassed")
+        else:
+            calculator_cache.count(tool, "misses")
+            calculator_cache.put(key, _copy_payload(payload))
+        return payload
+
+    return wrapper
@@ -0,0 +1,213 @@
+"""
+Per-company panel joined from the V2 tables.
+
+The V2 analysts used to call `get_companiesV2`, `get_income_statements`,
+`get_balance_sheets` and `get_valuation_metrics`, receive every record of
+every table and join them in the model's context. `CompanyPanel` does the
+join locally: each table is hashed once by normalized company key, so
+building the panel is linear in the number of records and a lookup is a
+dict probe. A company's panel is its registry fields plus one merged row per
+period:
+
+    {"company", "ticker", "sector", "country",
+     "periods": [{"period": "2024", "revenue": ..., "total_assets": ..., "market_cap": ...}, ...]}
+
+Airtable bookkeeping (record ids, created times) and empty fields are
+dropped; persisted calculator results in `valuation_metrics` (rows with a
+`method`) are reduced to `"valuations": {method: value}`.
+`get_company_panel_index` rebuilds the panel when any of the four tables
+changes (for unversioned live Airtable tables, once per
+COMPANY_VALUATION_CACHE_TTL seconds).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    from .CompanyValuationDB import (
+        get_balance_sheets,
+        get_companiesV2,
+        get_income_statements,
+        get_valuation_metrics,
+        cache_is_current,
+        table_version,
+    )
+    from .RecordStore import normalize_fields, normalize_key, period_sort_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.CompanyValuationDB import (  # type: ignore
+        get_balance_sheets,
+        get_companiesV2,
+        get_income_statements,
+        get_valuation_metrics,
+        cache_is_current,
+        table_version,
+    )
+    from ..Tools.RecordStore import normalize_fields, normalize_key, period_sort_key  # type: ignore
+
+# Tables merged into the per-period rows, in precedence order for shared fields
+PERIOD_TABLES = ("income_statements", "balance_sheets", "valuation_metrics")
+PANEL_TABLES = ("companiesV2", *PERIOD_TABLES)
+KEY_FIELDS = ("company", "company_name", "name", "period")
+MAX_PANEL_COMPANIES = 25
+
+
+def company_key(fields: Mapping[str, Any]) -> str:
+    """Join key of a normalized record: its company name, normalized."""
+    return normalize_key(fields.get("company") or fields.get("company_name") or fields.get("name"))
+
+
+def _compact(fields: Mapping[str, Any]) -> Dict[str, Any]:
+    return {name: value for name, value in fields.items() if name not in KEY_FIELDS and value not in (None, "", [])}
+
+
+class CompanyPanel:
+    """Hash join of companiesV2 and the per-period V2 tables by company key."""
+
+    def __init__(self, tables: Mapping[str, Iterable[Mapping[str, Any]]]):
+        self.version: Any = None
+        self.fetched_at = 0.0
+        self.unavailable: List[str] = []  # tables that could not be loaded
+        self.registry: Dict[str, Dict[str, Any]] = {}
+        for record in tables.get("companiesV2") or []:
+            fields = normalize_fields(record)
+            key = company_key(fields)
+            if key and key not in self.registry:
+                self.registry[key] = fields
+
+        # Build side: (company, period) -> merged row; earlier tables win on shared fields
+        rows: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for table in PERIOD_TABLES:
+            for record in tables.get(table) or []:
+                fields = normalize_fields(record)
+                key = company_key(fields)
+                if not key:
+                    continue
+                period = fields.get("period")
+                row = rows.setdefault(key, {}).setdefault(normalize_key(period), {"period": period})
+                method = fields.get("method")
+                if method:
+                    # Persisted calculator results (ValuationWriter): one row per method
+                    row.setdefault("valuations", {}).setdefault(method, fields.get("value"))
+                    continue
+                for name, value in _compact(fields).items():
+                    row.setdefault(name, value)
+
+        self.periods: Dict[str, List[Dict[str, Any]]] = {
+            key: sorted(by_period.values(), key=lambda row: period_sort_key(row["period"]) or (0, 0))
+            for key, by_period in rows.items()
+        }
+        self.companies: List[str] = list(dict.fromkeys([*self.registry, *self.periods]))
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def panel(self, company: str, latest_periods: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Joined panel of one company (None when it is in none of the tables)."""
+        key = normalize_key(company)
+        info = self.registry.get(key)
+        periods = self.periods.get(key)
+        if info is None and periods is None:
+            return None
+        periods = periods or []
+        if latest_periods:
+            periods = periods[-int(latest_periods):]
+        name = (info or {}).get("company_name") or (info or {}).get("name") or company
+        return {"company": name, **_compact(info or {}), "periods": [dict(row) for row in periods]}
+
+
+# -------------------------------
+# Cached panel
+# -------------------------------
+
+_panel: Optional[CompanyPanel] = None
+_lock = threading.Lock()
+
+_LOADERS = {
+    "companiesV2": get_companiesV2,
+    "income_statements": get_income_statements,
+    "balance_sheets": get_balance_sheets,
+    "valuation_metrics": get_valuation_metrics,
+}
+
+
+def get_company_panel_index() -> CompanyPanel:
+    """Panel over the data store, rebuilt when any of the four tables changes.
+
+    Tables without a version (live Airtable) are reused for
+    COMPANY_VALUATION_CACHE_TTL seconds. A table that fails to load is left
+    out and listed in `unavailable`; such a panel is not cached.
+    """
+    global _panel
+    version: Tuple[Any, ...] = tuple(table_version(name) for name in PANEL_TABLES)
+    with _lock:
+        if _panel is not None and cache_is_current(_panel.version, version, _panel.fetched_at):
+            return _panel
+    fetched_at = time.monotonic()
+    tables, unavailable = {}, []
+    for name, load in _LOADERS.items():
+        try:
+            tables[name] = load()
+        except Exception:
+            tables[name] = []
+            unavailable.append(name)
+    panel = CompanyPanel(tables)
+    panel.version = version
+    panel.fetched_at = fetched_at
+    panel.unavailable = unavailable
+    if not unavailable:
+        with _lock:
+            _panel = panel
+    return panel
+
+
+def get_company_panel(
+    companies: Optional[List[str]] = None,
+    latest_periods: Optional[int] = None,
+    max_companies: int = MAX_PANEL_COMPANIES,
+) -> Dict[str, Any]:
+    """Get companies' profile, income statement, balance sheet and valuation metrics joined per period.
+
+    Prefer this over fetching the four tables separately. `companies` lists
+    company names (all companies, up to `max_companies`, when omitted);
+    `latest_periods` keeps only each company's N most recent periods.
+    """
+    try:
+        index = get_company_panel_index()
+    except Exception as exc:
+        return {"tool": "get_company_panel", "company": companies, "success": False, "message": str(exc)}
+    if len(index.unavailable) == len(_LOADERS):
+        return {
+            "tool": "get_company_panel",
+            "company": companies,
+            "success": False,
+            "message": "Could not load the company tables; the data store may be unreachable.",
+        }
+    names = list(companies) if companies else index.companies
+    notes: List[str] = []
+    if index.unavailable:
+        notes.append(f"Could not load: {', '.join(index.unavailable)}; those fields are missing.")
+    if not companies and len(names) > max_companies:
+        notes.append(f"Showing {max_companies} of {len(names)} companies; pass `companies` to select others.")
+        names = names[:max_companies]
+
+    panels, missing = [], []
+    for name in names:
+        panel = index.panel(name, latest_periods)
+        if panel is None:
+            missing.append(name)
+        else:
+            panels.append(panel)
+    if missing:
+        notes.append(f"Not found: {', '.join(missing)}.")
+
+    return {
+        "tool": "get_company_panel",
+        "company": companies,
+        "success": bool(panels),
+        "inputs": {"latest_periods": latest_periods, "max_companies": max_companies},
+        "result": {"companies": panels, "total_companies": len(index)},
+        "notes": "; ".join(notes),
+    }
@@ -1,63 +1,243 @@
+import asyncio
 import os
 import uuid
 import time as time_module
 from datetime import datetime, timedelta
-from pyairtable import Api
 from dotenv import load_dotenv
 
+from .AirtableClient import get_api
+from .CalculatorCache import note_data_store_access
+from .StorageBackends import AirtableBackend, ParquetFixtureBackend, SQLiteBackend, StorageBackend
+
 load_dotenv()
 
 AIRTABLE_TOKEN = os.getenv("AIRTABLE_API_KEY")
 BASE_ID = os.getenv("AIRTABLE_BASE_ID")
+AIRTABLE_ENDPOINT_URL = os.getenv("AIRTABLE_ENDPOINT_URL")
+
+# Optional local replica: when AIRTABLE_REPLICA_PATH is set, the get_* helpers
+# read from a SQLite mirror of the base instead of calling Airtable.
+# AIRTABLE_REPLICA_MAX_AGE (seconds) triggers a delta sync before serving a
+# table whose last sync is older than that.
+AIRTABLE_REPLICA_PATH = os.getenv("AIRTABLE_REPLICA_PATH")
+AIRTABLE_REPLICA_MAX_AGE = float(os.getenv("AIRTABLE_REPLICA_MAX_AGE", "0") or 0)
+
+# Storage backend: "airtable" (default), "sqlite", "parquet" or "snapshot"
+COMPANY_VALUATION_BACKEND = os.getenv("COMPANY_VALUATION_BACKEND", "airtable")
+COMPANY_VALUATION_SQLITE_PATH = os.getenv("COMPANY_VALUATION_SQLITE_PATH")
+COMPANY_VALUATION_PARQUET_DIR = os.getenv("COMPANY_VALUATION_PARQUET_DIR")
+COMPANY_VALUATION_SNAPSHOT_DIR = os.getenv("COMPANY_VALUATION_SNAPSHOT_DIR")
+
+# Caches keyed on table_version() reuse data whose version is unknown (live
+# Airtable reads) for this many seconds; 0 rebuilds them on every call.
+COMPANY_VALUATION_CACHE_TTL = float(os.getenv("COMPANY_VALUATION_CACHE_TTL", "60") or 0)
+
+TABLE_NAMES = (
+    "companies",
+    "financial_statements",
+    "market_data",
+    "transactions",
+    "discount_rates",
+    "industry_multiples",
+    "companiesV2",
+    "income_statements",
+    "balance_sheets",
+    "valuation_metrics",
+)
+
+# Backends are created on first use (credentials may be absent at import)
+_backend = None
+_airtable_backend = None
+
+
+def _get_airtable_backend():
+    global _airtable_backend
+    if _airtable_backend is None:
+        _airtable_backend = AirtableBackend(
+            AIRTABLE_TOKEN,
+            BASE_ID,
+            endpoint_url=AIRTABLE_ENDPOINT_URL,
+            replica_path=AIRTABLE_REPLICA_PATH,
+            replica_max_age=AIRTABLE_REPLICA_MAX_AGE,
+        )
+    return _airtable_backend
+
+
+def create_backend(kind=None):
+    """Build the storage backend named by `kind` (defaults to COMPANY_VALUATION_BACKEND)."""
+    kind = (kind or COMPANY_VALUATION_BACKEND or "airtable").strip().lower()
+    if kind == "airtable":
+        return _get_airtable_backend()
+    if kind == "sqlite":
+        return SQLiteBackend(COMPANY_VALUATION_SQLITE_PATH)
+    if kind == "parquet":
+        return ParquetFixtureBackend(COMPANY_VALUATION_PARQUET_DIR)
+    if kind == "snapshot":
+        # Imported lazily: pyarrow is only needed for snapshots
+        from .Snapshots import SnapshotBackend
+
+        return SnapshotBackend(COMPANY_VALUATION_SNAPSHOT_DIR)
+    raise ValueError(f"Unknown COMPANY_VALUATION_BACKEND '{kind}'. Use airtable, sqlite, parquet or snapshot.")
+
+
+def get_backend():
+    """Return the configured storage backend."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Replace the storage backend (a StorageBackend instance or a backend name)."""
+    global _backend
+    _backend = backend if isinstance(backend, StorageBackend) else create_backend(backend)
+    return _backend
+
+
+def get_table(name):
+    """Return the pyairtable Table for `name`, connecting lazily."""
+    return _get_airtable_backend().table(name)
+
+
+def __getattr__(name):
+    # Backwards compatible access to `api` and the `<name>_table` handles
+    if name == "api":
+        return get_api(AIRTABLE_TOKEN, AIRTABLE_ENDPOINT_URL)
+    if name.endswith("_table") and name[: -len("_table")] in TABLE_NAMES:
+        return get_table(name[: -len("_table")])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_replica():
+    """Return the local replica, or None when AIRTABLE_REPLICA_PATH is not set."""
+    return _get_airtable_backend().replica
+
+
+def sync_replica(full=False, tables=None):
+    """Mirror the Airtable base into the local replica.
+
+    Only records modified since the previous sync are fetched unless `full`
+    is True (a full sync also drops records deleted in Airtable).
+    """
+    backend = _get_airtable_backend()
+    if backend.replica is None:
+        raise RuntimeError("AIRTABLE_REPLICA_PATH is not set; no local replica configured.")
+    names = tables or list(TABLE_NAMES)
+    return backend.replica.sync({name: backend.table(name) for name in names}, full=full)
+
+
+def table_version(name):
+    """Version token for `name` that changes whenever its data is refreshed.
+
+    None means the backend cannot tell (live Airtable reads): assume it changed.
+    """
+    note_data_store_access()
+    return get_backend().table_version(name)
+
+
+def cache_is_current(cached_version, version, fetched_at):
+    """Whether a cache built for `cached_version` at `fetched_at` (time.monotonic()) can serve `version`.
 
-# Initialize API and table connections (per pyairtable migration guidelines)
-api = Api(AIRTABLE_TOKEN)
-companies_table = api.table(BASE_ID, "companies")
-financial_statements_table = api.table(BASE_ID, "financial_statements")
-market_data_table = api.table(BASE_ID, "market_data")
-transactions_table = api.table(BASE_ID, "transactions")
-discount_rates_table = api.table(BASE_ID, "discount_rates")
-industry_multiples_table = api.table(BASE_ID, "industry_multiples")
+    A known version must match. A version that is (or contains) None is
+    reused for COMPANY_VALUATION_CACHE_TTL seconds after the fetch.
+    """
+    if cached_version != version:
+        return False
+    unknown = version is None or (isinstance(version, tuple) and None in version)
+    return not unknown or time_module.monotonic() - fetched_at < COMPANY_VALUATION_CACHE_TTL
 
-companiesV2_table = api.table(BASE_ID, "companiesV2")
-income_statements_table = api.table(BASE_ID, "income_statements")
-balance_sheets_table = api.table(BASE_ID, "balance_sheets")
-valuation_metrics_table = api.table(BASE_ID, "valuation_metrics")
 
+def _fetch_table(name):
+    # Results that depend on stored data must not be memoized
+    note_data_store_access()
+    return get_backend().fetch_table(name)
 
 
 def get_companies():
-    return companies_table.all()
+    return _fetch_table("companies")
 
 def get_financial_statements():
-    return financial_statements_table.all()
+    return _fetch_table("financial_statements")
 
 def get_market_data():
-    return market_data_table.all()
+    return _fetch_table("market_data")
 
 def get_transactions():
-    return transactions_table.all()
+    return _fetch_table("transactions")
 
 def get_discount_rates():
-    return discount_rates_table.all()
-    
+    return _fetch_table("discount_rates")
+
 def get_industry_multiples():
-    return industry_multiples_table.all()
+    return _fetch_table("industry_multiples")
 
 
 def get_companiesV2():
     """Get all companies from the companiesV2 table"""
-    return companiesV2_table.all()
+    return _fetch_table("companiesV2")
 
 def get_income_statements():
     """Get all income statements from the income_statements table"""
-    return income_statements_table.all()
+    return _fetch_table("income_statements")
 
 def get_balance_sheets():
     """Get all balance sheets from the balance_sheets table"""
-    return balance_sheets_table.all()
+    return _fetch_table("balance_sheets")
 
 def get_valuation_metrics():
     """Get all valuation metrics from the valuation_metrics table"""
-    return valuation_metrics_table.all()
+    return _fetch_table("valuation_metrics")
+
+
+# -------------------------------
+# Async counterparts
+# -------------------------------
+# Different tables are fetched concurrently; see the backend's `afetch_table`
+# for how pages are requested without blocking the event loop.
+
+async def _afetch_table(name):
+    note_data_store_access()
+    return await get_backend().afetch_table(name)
+
+
+async def afetch_tables(*names):
+    """Fetch several tables concurrently; returns `{table_name: records}`."""
+    results = await asyncio.gather(*(_afetch_table(name) for name in names))
+    return dict(zip(names, results))
+
+
+async def aget_companies():
+    return await _afetch_table("companies")
+
+async def aget_financial_statements():
+    return await _afetch_table("financial_statements")
+
+async def aget_market_data():
+    return await _afetch_table("market_data")
+
+async def aget_transactions():
+    return await _afetch_table("transactions")
+
+async def aget_discount_rates():
+    return await _afetch_table("discount_rates")
+
+async def aget_industry_multiples():
+    return await _afetch_table("industry_multiples")
+
+
+async def aget_companiesV2():
+    """Get all companies from the companiesV2 table (async)"""
+    return await _afetch_table("companiesV2")
+
+async def aget_income_statements():
+    """Get all income statements from the income_statements table (async)"""
+    return await _afetch_table("income_statements")
+
+async def aget_balance_sheets():
+    """Get all balance sheets from the balance_sheets table (async)"""
+    return await _afetch_table("balance_sheets")
 
+async def aget_valuation_metrics():
+    """Get all valuation metrics from the valuation_metrics table (async)"""
+    return await _afetch_table("valuation_metrics")
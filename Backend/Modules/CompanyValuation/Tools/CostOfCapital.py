@@ -0,0 +1,460 @@
+"""
+Cost of capital: CAPM betas and WACC for many companies at once.
+
+`calculate_dcf` falls back to a `wacc` field or a flat 10%. This module
+estimates the discount rate instead:
+
+1) Betas: daily simple returns of every ticker are regressed on the market
+   index in one vectorized pass (`estimate_betas`, NaN-aware so tickers with
+   gaps or shorter histories share the same matrix). `rolling_betas` computes
+   every rolling window from cumulative sums, without looping over windows.
+2) Adjustments: Blume (0.67 × raw + 0.33) or Vasicek (shrink each beta toward
+   the peer mean in proportion to its standard error).
+3) WACC = E/V × (rf + β × ERP) + D/V × kd × (1 − t), with market-cap equity
+   and debt from the company's statement record.
+
+Raw regressions are cached per (ticker, index, window, as-of date), so a
+peer set re-queried on the same day is not downloaded or regressed again.
+Prices come from yfinance unless `prices` are passed explicitly.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .Calculations import _lookup_record
+    from .CompanyValuationDB import get_companiesV2
+    from .RecordStore import normalize_fields, normalize_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.Calculations import _lookup_record  # type: ignore
+    from ..Tools.CompanyValuationDB import get_companiesV2  # type: ignore
+    from ..Tools.RecordStore import normalize_fields, normalize_key  # type: ignore
+
+DEFAULT_MARKET_INDEX = "^GSPC"
+DEFAULT_WINDOW = 252  # trading days (one year)
+DEFAULT_RISK_FREE_RATE = 0.04
+DEFAULT_EQUITY_RISK_PREMIUM = 0.055
+DEFAULT_COST_OF_DEBT = 0.06
+DEFAULT_TAX_RATE = 0.25
+MIN_OBSERVATIONS = 20
+
+BLUME_WEIGHT = 0.67
+# Vasicek prior (mean, variance) when the peer set is too small to estimate one
+VASICEK_DEFAULT_PRIOR = (1.0, 0.16)
+BETA_ADJUSTMENTS = ("raw", "blume", "vasicek")
+
+BETA_CACHE_SIZE = 4096
+
+
+# -------------------------------
+# Regression
+# -------------------------------
+
+def to_returns(prices: np.ndarray) -> np.ndarray:
+    """Simple returns along axis 0; NaN where either price is missing or non-positive."""
+    prices = np.asarray(prices, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = prices[1:] / prices[:-1] - 1.0
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+
+def estimate_betas(asset_returns: np.ndarray, market_returns: np.ndarray) -> Dict[str, np.ndarray]:
+    """OLS of each column of `asset_returns` (T × N) on `market_returns` (T).
+
+    Observations where either return is NaN are dropped per column. Returns
+    arrays of length N: beta, alpha, r2, se (standard error of beta), n.
+    """
+    asset = np.asarray(asset_returns, dtype=float)
+    if asset.ndim == 1:
+        asset = asset[:, None]
+    market = np.asarray(market_returns, dtype=float)[:, None]
+    mask = np.isfinite(asset) & np.isfinite(market)
+    n = mask.sum(axis=0)
+
+    x = np.where(mask, market, 0.0)
+    y = np.where(mask, asset, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = x.sum(axis=0) / n
+        mean_y = y.sum(axis=0) / n
+        dx = np.where(mask, x - mean_x, 0.0)
+        dy = np.where(mask, y - mean_y, 0.0)
+        sxx = (dx * dx).sum(axis=0)
+        sxy = (dx * dy).sum(axis=0)
+        syy = (dy * dy).sum(axis=0)
+        return _ols_summary(n, mean_x, mean_y, sxx, sxy, syy)
+
+
+def _ols_summary(n, mean_x, mean_y, sxx, sxy, syy) -> Dict[str, np.ndarray]:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = sxy / sxx
+        residual = np.maximum(syy - beta * sxy, 0.0)
+        se = np.sqrt(residual / (n - 2) / sxx)
+        r2 = 1.0 - residual / syy
+    valid = (n >= MIN_OBSERVATIONS) & (sxx > 0)
+    nan = np.nan
+    return {
+        "beta": np.where(valid, beta, nan),
+        "alpha": np.where(valid, mean_y - beta * mean_x, nan),
+        "r2": np.where(valid, r2, nan),
+        "se": np.where(valid, se, nan),
+        "n": n.astype(int),
+    }
+
+
+def rolling_betas(asset_returns: np.ndarray, market_returns: np.ndarray, window: int) -> Dict[str, np.ndarray]:
+    """Betas over every `window`-day window ((T − window + 1) × N arrays), via cumulative sums."""
+    asset = np.asarray(asset_returns, dtype=float)
+    if asset.ndim == 1:
+        asset = asset[:, None]
+    market = np.asarray(market_returns, dtype=float)[:, None]
+    if window < 2 or window > asset.shape[0]:
+        raise ValueError(f"window must be between 2 and the number of returns ({asset.shape[0]}).")
+    mask = np.isfinite(asset) & np.isfinite(market)
+    x = np.where(mask, market, 0.0)
+    y = np.where(mask, asset, 0.0)
+
+    def windowed(values: np.ndarray) -> np.ndarray:
+        total = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        return total[window:] - total[:-window]
+
+    n = windowed(mask.astype(float))
+    sx, sy = windowed(x), windowed(y)
+    sxx_raw, sxy_raw, syy_raw = windowed(x * x), windowed(x * y), windowed(y * y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x, mean_y = sx / n, sy / n
+        sxx = sxx_raw - n * mean_x * mean_x
+        sxy = sxy_raw - n * mean_x * mean_y
+        syy = syy_raw - n * mean_y * mean_y
+        return _ols_summary(n, mean_x, mean_y, sxx, sxy, syy)
+
+
+def adjust_betas(
+    beta: np.ndarray,
+    se: Optional[np.ndarray] = None,
+    method: str = "blume",
+    prior: Optional[Tuple[float, float]] = None,
+) -> np.ndarray:
+    """Blume or Vasicek adjusted betas ("raw" returns them unchanged).
+
+    Vasicek: β_adj = w × β + (1 − w) × prior_mean, with w = prior_var / (prior_var + se²).
+    The prior is the cross-sectional mean/variance of `beta` when there are at
+    least three finite betas, else `VASICEK_DEFAULT_PRIOR`.
+    """
+    beta = np.asarray(beta, dtype=float)
+    if method == "raw":
+        return beta
+    if method == "blume":
+        return BLUME_WEIGHT * beta + (1.0 - BLUME_WEIGHT)
+    if method != "vasicek":
+        raise ValueError(f"Unknown beta adjustment '{method}'. Use one of {BETA_ADJUSTMENTS}.")
+    if se is None:
+        raise ValueError("Vasicek adjustment needs the standard errors of the betas.")
+    if prior is None:
+        finite = beta[np.isfinite(beta)]
+        prior = (float(finite.mean()), float(finite.var(ddof=1))) if finite.size >= 3 else VASICEK_DEFAULT_PRIOR
+    prior_mean, prior_var = prior
+    se2 = np.asarray(se, dtype=float) ** 2
+    weight = prior_var / (prior_var + se2)
+    return weight * beta + (1.0 - weight) * prior_mean
+
+
+def wacc_values(
+    beta: np.ndarray,
+    equity_value: np.ndarray,
+    debt_value: np.ndarray,
+    risk_free_rate: Any = DEFAULT_RISK_FREE_RATE,
+    equity_risk_premium: Any = DEFAULT_EQUITY_RISK_PREMIUM,
+    cost_of_debt: Any = DEFAULT_COST_OF_DEBT,
+    tax_rate: Any = DEFAULT_TAX_RATE,
+) -> Dict[str, np.ndarray]:
+    """Cost of equity, after-tax cost of debt, weights and WACC (all broadcastable)."""
+    beta = np.asarray(beta, dtype=float)
+    equity = np.asarray(equity_value, dtype=float)
+    debt = np.nan_to_num(np.asarray(debt_value, dtype=float), nan=0.0)
+    cost_of_equity = risk_free_rate + beta * np.asarray(equity_risk_premium, dtype=float)
+    after_tax_debt = np.asarray(cost_of_debt, dtype=float) * (1.0 - np.asarray(tax_rate, dtype=float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        equity_weight = np.where(equity > 0, equity / (equity + debt), 1.0)
+    return {
+        "cost_of_equity": cost_of_equity,
+        "after_tax_cost_of_debt": after_tax_debt,
+        "equity_weight": equity_weight,
+        "debt_weight": 1.0 - equity_weight,
+        "wacc": equity_weight * cost_of_equity + (1.0 - equity_weight) * after_tax_debt,
+    }
+
+
+# -------------------------------
+# Beta cache
+# -------------------------------
+
+_beta_cache: "OrderedDict[Tuple[str, str, int, str], Dict[str, float]]" = OrderedDict()
+_beta_cache_lock = threading.Lock()
+
+
+def _cache_get(key: Tuple[str, str, int, str]) -> Optional[Dict[str, float]]:
+    with _beta_cache_lock:
+        value = _beta_cache.get(key)
+        if value is not None:
+            _beta_cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key: Tuple[str, str, int, str], value: Dict[str, float]) -> None:
+    with _beta_cache_lock:
+        _beta_cache[key] = value
+        _beta_cache.move_to_end(key)
+        while len(_beta_cache) > BETA_CACHE_SIZE:
+            _beta_cache.popitem(last=False)
+
+
+def clear_beta_cache() -> None:
+    with _beta_cache_lock:
+        _beta_cache.clear()
+
+
+# -------------------------------
+# Prices
+# -------------------------------
+
+def fetch_prices(tickers: Sequence[str], market_index: str, window: int, as_of: date) -> Dict[str, np.ndarray]:
+    """Adjusted closes (aligned on the index's trading days) for `tickers` and the index via yfinance."""
+    import yfinance as yf  # optional: only needed when prices are not supplied
+
+    start = as_of - timedelta(days=int(window * 365 / 252) + 30)
+    symbols = list(dict.fromkeys([*tickers, market_index]))
+    frame = yf.download(
+        symbols, start=start.isoformat(), end=(as_of + timedelta(days=1)).isoformat(),
+        auto_adjust=True, progress=False, group_by="column",
+    )
+    closes = frame["Close"] if "Close" in frame else frame
+    if hasattr(closes, "to_frame") and not hasattr(closes, "columns"):
+        closes = closes.to_frame(symbols[0])
+    closes = closes.dropna(subset=[market_index]).tail(window + 1)
+    return {symbol: closes[symbol].to_numpy(dtype=float) for symbol in symbols if symbol in closes}
+
+
+def _regress_tickers(
+    tickers: Sequence[str],
+    market_index: str,
+    window: int,
+    as_of: date,
+    prices: Optional[Mapping[str, Sequence[float]]],
+) -> Dict[str, Dict[str, float]]:
+    """Raw regression per ticker, served from the cache where possible."""
+    as_of_key = as_of.isoformat()
+    # Explicit prices are not keyed by date, so they bypass the cache
+    results: Dict[str, Dict[str, float]] = {}
+    missing: List[str] = []
+    for ticker in tickers:
+        cached = None if prices is not None else _cache_get((ticker, market_index, window, as_of_key))
+        if cached is not None:
+            results[ticker] = cached
+        else:
+            missing.append(ticker)
+    if not missing:
+        return results
+
+    series = prices if prices is not None else fetch_prices(missing, market_index, window, as_of)
+    if market_index not in series:
+        raise ValueError(f"No prices for market index '{market_index}'.")
+    market = np.asarray(series[market_index], dtype=float)[-(window + 1):]
+    length = market.shape[0]
+    matrix = np.full((length, len(missing)), np.nan)
+    for column, ticker in enumerate(missing):
+        values = np.asarray(series.get(ticker, []), dtype=float)[-(window + 1):]
+        if values.size:
+            matrix[length - values.size:, column] = values  # align on the most recent date
+    stats = estimate_betas(to_returns(matrix), to_returns(market))
+    for column, ticker in enumerate(missing):
+        entry = {name: float(values[column]) for name, values in stats.items()}
+        results[ticker] = entry
+        if prices is None:
+            _cache_put((ticker, market_index, window, as_of_key), entry)
+    return results
+
+
+# -------------------------------
+# Tool
+# -------------------------------
+
+def _ticker_map() -> Dict[str, str]:
+    """Normalized company name -> ticker from companiesV2."""
+    mapping: Dict[str, str] = {}
+    for record in get_companiesV2():
+        fields = normalize_fields(record)
+        name = fields.get("company_name") or fields.get("company") or fields.get("name")
+        ticker = fields.get("ticker") or fields.get("symbol")
+        if name and ticker:
+            mapping.setdefault(normalize_key(name), str(ticker).strip().upper())
+    return mapping
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    return None
+
+
+def estimate_wacc(
+    companies: Optional[List[str]] = None,
+    tickers: Optional[List[str]] = None,
+    period: Optional[str] = None,
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+    market_index: str = DEFAULT_MARKET_INDEX,
+    window: int = DEFAULT_WINDOW,
+    as_of: Optional[str] = None,
+    adjustment: str = "blume",
+    risk_free_rate: float = DEFAULT_RISK_FREE_RATE,
+    equity_risk_premium: float = DEFAULT_EQUITY_RISK_PREMIUM,
+    cost_of_debt: Optional[float] = None,
+    tax_rate: Optional[float] = None,
+    rolling_window: Optional[int] = None,
+    prices: Optional[Dict[str, List[float]]] = None,
+) -> Dict[str, Any]:
+    """Estimate CAPM betas and WACC for a set of companies in one call.
+
+    `companies` are matched to tickers through companiesV2 (or pass
+    `tickers`, aligned with `companies` or on their own). Betas regress
+    `window` daily returns on `market_index` as of `as_of` (default today)
+    and are adjusted with `adjustment` ("blume", "vasicek" or "raw").
+    Equity and debt weights, cost of debt (`interest_expense / total_debt`)
+    and tax rate come from each company's statement record when available.
+    `rolling_window` adds rolling-beta statistics; `prices` maps tickers and
+    the index to daily closes for offline use.
+    """
+    if not companies and not tickers:
+        return {"tool": "estimate_wacc", "success": False, "message": "Provide companies or tickers."}
+    if adjustment not in BETA_ADJUSTMENTS:
+        return {
+            "tool": "estimate_wacc",
+            "success": False,
+            "message": f"Unknown adjustment '{adjustment}'. Use one of {list(BETA_ADJUSTMENTS)}.",
+        }
+
+    notes: List[str] = []
+    names = list(companies or tickers or [])
+    if tickers:
+        symbols = [str(t).strip().upper() for t in tickers]
+    else:
+        try:
+            mapping = _ticker_map()
+        except Exception:
+            mapping = {}
+        symbols = [mapping.get(normalize_key(name), "") for name in names]
+        unresolved = [name for name, symbol in zip(names, symbols) if not symbol]
+        if unresolved:
+            notes.append(f"No ticker in companiesV2 for: {', '.join(unresolved)}.")
+    if len(symbols) != len(names):
+        return {"tool": "estimate_wacc", "success": False, "message": "tickers must align with companies."}
+
+    as_of_date = date.fromisoformat(as_of) if as_of else date.today()
+    valid_symbols = [s for s in symbols if s]
+    try:
+        regressions = _regress_tickers(list(dict.fromkeys(valid_symbols)), market_index, window, as_of_date, prices)
+    except Exception as exc:
+        return {"tool": "estimate_wacc", "success": False, "message": f"Could not estimate betas: {exc}"}
+
+    n = len(names)
+    raw = np.array([regressions.get(s, {}).get("beta", np.nan) for s in symbols])
+    se = np.array([regressions.get(s, {}).get("se", np.nan) for s in symbols])
+    r2 = np.array([regressions.get(s, {}).get("r2", np.nan) for s in symbols])
+    adjusted = adjust_betas(raw, se, adjustment)
+
+    equity = np.full(n, np.nan)
+    debt = np.zeros(n)
+    kd = np.full(n, DEFAULT_COST_OF_DEBT if cost_of_debt is None else cost_of_debt)
+    tax = np.full(n, DEFAULT_TAX_RATE if tax_rate is None else tax_rate)
+    for i, name in enumerate(names if companies else []):
+        try:
+            record = _lookup_record(records, company=name, period=period)
+        except Exception:
+            record = None
+        if record is None or normalize_key(record.company) != normalize_key(name):
+            continue
+        if record.share_price and record.shares_outstanding:
+            equity[i] = record.share_price * record.shares_outstanding
+        fields = record.fields
+        total_debt = _number(fields.get("total_debt"))
+        debt[i] = total_debt if total_debt is not None else (record.total_liabilities or 0.0)
+        interest = _number(fields.get("interest_expense"))
+        if cost_of_debt is None and interest and total_debt:
+            kd[i] = abs(interest) / total_debt
+        record_tax = _number(fields.get("tax_rate"))
+        if tax_rate is None and record_tax is not None:
+            tax[i] = record_tax
+    if np.isnan(equity).any():
+        notes.append("Companies without market cap are weighted 100% equity.")
+
+    costs = wacc_values(adjusted, equity, debt, risk_free_rate, equity_risk_premium, kd, tax)
+
+    rolling: Dict[str, Dict[str, float]] = {}
+    if rolling_window and prices is not None:
+        market = to_returns(np.asarray(prices[market_index], dtype=float))
+        for symbol in dict.fromkeys(valid_symbols):
+            series = to_returns(np.asarray(prices.get(symbol, []), dtype=float))
+            if series.size != market.size or rolling_window > series.size:
+                continue
+            betas = rolling_betas(series, market, rolling_window)["beta"][:, 0]
+            finite = betas[np.isfinite(betas)]
+            if finite.size:
+                rolling[symbol] = {
+                    "latest": float(finite[-1]),
+                    "mean": float(finite.mean()),
+                    "min": float(finite.min()),
+                    "max": float(finite.max()),
+                    "windows": int(finite.size),
+                }
+    elif rolling_window:
+        notes.append("Rolling betas need explicit `prices`; skipped.")
+
+    def value(array: np.ndarray, i: int) -> Optional[float]:
+        return float(array[i]) if np.isfinite(array[i]) else None
+
+    results = []
+    for i, name in enumerate(names):
+        results.append({
+            "company": name if companies else None,
+            "ticker": symbols[i] or None,
+            "raw_beta": value(raw, i),
+            "adjusted_beta": value(adjusted, i),
+            "beta_se": value(se, i),
+            "r2": value(r2, i),
+            "observations": int(regressions.get(symbols[i], {}).get("n", 0)),
+            "cost_of_equity": value(costs["cost_of_equity"], i),
+            "after_tax_cost_of_debt": value(costs["after_tax_cost_of_debt"], i),
+            "equity_weight": value(costs["equity_weight"], i),
+            "wacc": value(costs["wacc"], i),
+            **({"rolling_beta": rolling[symbols[i]]} if symbols[i] in rolling else {}),
+        })
+
+    estimated = sum(1 for row in results if row["wacc"] is not None)
+    if estimated < n:
+        notes.append(f"{n - estimated} of {n} companies lack enough return history (min {MIN_OBSERVATIONS} days).")
+    notes.append(f"Betas: {window}-day regression on {market_index} as of {as_of_date.isoformat()}, {adjustment} adjusted.")
+
+    return {
+        "tool": "estimate_wacc",
+        "success": estimated > 0,
+        "inputs": {
+            "market_index": market_index,
+            "window": window,
+            "as_of": as_of_date.isoformat(),
+            "adjustment": adjustment,
+            "risk_free_rate": risk_free_rate,
+            "equity_risk_premium": equity_risk_premium,
+            "cost_of_debt": cost_of_debt,
+            "tax_rate": tax_rate,
+        },
+        "result": {"companies": results},
+        "confidence": round(0.8 * estimated / n, 4) if n else 0.0,
+        "notes": "; ".join(notes),
+    }
@@ -0,0 +1,247 @@
+"""
+Vectorized financial ratio engine for the V2 statement analysts.
+
+The income statement and balance sheet analysts computed every margin and
+ratio with `CalculatorTools`, one arithmetic operation (and one LLM round
+trip) at a time. `ratio_table` joins `income_statements` and
+`balance_sheets` on (company, period), orders each company's periods
+chronologically and computes the whole standard ratio set for every row with
+NumPy:
+
+- Income: gross, operating, EBITDA and net margins; revenue, EBITDA,
+  operating income and net income growth versus the previous period
+- Liquidity: current, quick and cash ratios, working capital
+- Leverage: debt-to-equity, debt-to-assets, liabilities-to-assets, equity ratio
+- Returns and efficiency (both statements): ROE, ROA, asset turnover,
+  interest coverage, book value per share
+
+A ratio whose inputs are missing, or whose denominator is zero, is None.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .BatchValuation import _pick, records_to_columns
+    from .CompanyValuationDB import get_balance_sheets, get_income_statements
+    from .RecordStore import normalize_fields, normalize_key, period_sort_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.BatchValuation import _pick, records_to_columns  # type: ignore
+    from ..Tools.CompanyValuationDB import get_balance_sheets, get_income_statements  # type: ignore
+    from ..Tools.RecordStore import normalize_fields, normalize_key, period_sort_key  # type: ignore
+
+RATIO_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "margins": ("gross_margin", "operating_margin", "ebitda_margin", "net_margin"),
+    "growth": ("revenue_growth", "ebitda_growth", "operating_income_growth", "net_income_growth"),
+    "liquidity": ("current_ratio", "quick_ratio", "cash_ratio", "working_capital"),
+    "leverage": ("debt_to_equity", "debt_to_assets", "liabilities_to_assets", "equity_ratio"),
+    "returns": ("roe", "roa", "asset_turnover", "interest_coverage", "book_value_per_share"),
+}
+# Groups each V2 analyst works with
+ANALYST_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "income": ("margins", "growth", "returns"),
+    "balance": ("liquidity", "leverage", "returns"),
+    "all": tuple(RATIO_GROUPS),
+}
+MAX_RATIO_ROWS = 200
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def _growth(values: np.ndarray, same_company: np.ndarray) -> np.ndarray:
+    """Change versus the previous row of the same company, relative to |previous|."""
+    previous = np.full(values.shape, np.nan)
+    previous[1:] = values[:-1]
+    previous = np.where(same_company, previous, np.nan)
+    return _divide(values - previous, np.abs(previous))
+
+
+def _joined_rows(
+    income_records: Iterable[Mapping[str, Any]],
+    balance_records: Iterable[Mapping[str, Any]],
+    companies: Optional[Sequence[str]],
+    start_period: Optional[str],
+    end_period: Optional[str],
+) -> List[Tuple[str, Any, Dict[str, Any], Dict[str, Any]]]:
+    """(company key, period sort key, income fields, balance fields), sorted by company and period."""
+    wanted = {normalize_key(c) for c in companies} if companies else None
+    start = period_sort_key(start_period) if start_period else None
+    end = period_sort_key(end_period) if end_period else None
+    joined: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for side, records in enumerate((income_records, balance_records)):
+        for record in records:
+            fields = normalize_fields(record)
+            company = normalize_key(fields.get("company") or fields.get("company_name"))
+            if not company or (wanted is not None and company not in wanted):
+                continue
+            entry = joined.setdefault((company, normalize_key(fields.get("period"))), [{}, {}])
+            if not entry[side]:
+                entry[side] = fields
+    rows = []
+    for (company, period), (income, balance) in joined.items():
+        sort_key = period_sort_key(period)
+        if (start is not None or end is not None) and (
+            sort_key is None or (start is not None and sort_key < start) or (end is not None and sort_key > end)
+        ):
+            continue
+        rows.append((company, sort_key or (0, 0), income, balance))
+    rows.sort(key=lambda row: (row[0], row[1]))
+    return rows
+
+
+def ratio_table(
+    income_records: Optional[Iterable[Mapping[str, Any]]] = None,
+    balance_records: Optional[Iterable[Mapping[str, Any]]] = None,
+    companies: Optional[Sequence[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+) -> Dict[str, np.ndarray]:
+    """Every ratio for every (company, period) row, as NumPy columns.
+
+    Records default to `get_income_statements()` / `get_balance_sheets()`.
+    Columns: company, period, then the ratios of `RATIO_GROUPS` (NaN when
+    not computable).
+    """
+    if income_records is None:
+        income_records = get_income_statements()
+    if balance_records is None:
+        balance_records = get_balance_sheets()
+    rows = _joined_rows(income_records, balance_records, companies, start_period, end_period)
+    n_rows = len(rows)
+    income = records_to_columns(row[2] for row in rows)
+    balance = records_to_columns(row[3] for row in rows)
+
+    revenue = _pick(income, n_rows, "revenue", "total_revenue")
+    cogs = _pick(income, n_rows, "cogs", "cost_of_revenue", "cost_of_goods_sold")
+    gross_profit = _pick(income, n_rows, "gross_profit")
+    gross_profit = np.where(np.isnan(gross_profit), revenue - cogs, gross_profit)
+    operating_income = _pick(income, n_rows, "operating_income", "ebit")
+    ebitda = _pick(income, n_rows, "ebitda")
+    net_income = _pick(income, n_rows, "net_income", "net_profit")
+    interest_expense = np.abs(_pick(income, n_rows, "interest_expense"))
+
+    total_assets = _pick(balance, n_rows, "total_assets", "assets")
+    total_liabilities = _pick(balance, n_rows, "total_liabilities", "liabilities")
+    current_assets = _pick(balance, n_rows, "current_assets", "total_current_assets")
+    current_liabilities = _pick(balance, n_rows, "current_liabilities", "total_current_liabilities")
+    inventory = _pick(balance, n_rows, "inventory", default=0.0)
+    cash = _pick(balance, n_rows, "cash", "cash_and_equivalents")
+    total_debt = _pick(balance, n_rows, "total_debt", "debt")
+    equity = _pick(balance, n_rows, "shareholders_equity", "total_equity", "equity")
+    equity = np.where(np.isnan(equity), total_assets - total_liabilities, equity)
+    shares = _pick(balance, n_rows, "shares_outstanding", "shares")
+
+    companies_col = np.array([row[0] for row in rows], dtype=object)
+    same_company = np.zeros(n_rows, dtype=bool)
+    same_company[1:] = companies_col[1:] == companies_col[:-1]
+
+    def label(row: Tuple[str, Any, Dict[str, Any], Dict[str, Any]], name: str) -> Any:
+        return row[2].get(name) or row[3].get(name)
+
+    return {
+        "company": np.array([label(row, "company") or row[0] for row in rows], dtype=object),
+        "period": np.array([label(row, "period") for row in rows], dtype=object),
+        "gross_margin": _divide(gross_profit, revenue),
+        "operating_margin": _divide(operating_income, revenue),
+        "ebitda_margin": _divide(ebitda, revenue),
+        "net_margin": _divide(net_income, revenue),
+        "revenue_growth": _growth(revenue, same_company),
+        "ebitda_growth": _growth(ebitda, same_company),
+        "operating_income_growth": _growth(operating_income, same_company),
+        "net_income_growth": _growth(net_income, same_company),
+        "current_ratio": _divide(current_assets, current_liabilities),
+        "quick_ratio": _divide(current_assets - inventory, current_liabilities),
+        "cash_ratio": _divide(cash, current_liabilities),
+        "working_capital": current_assets - current_liabilities,
+        "debt_to_equity": _divide(total_debt, equity),
+        "debt_to_assets": _divide(total_debt, total_assets),
+        "liabilities_to_assets": _divide(total_liabilities, total_assets),
+        "equity_ratio": _divide(equity, total_assets),
+        "roe": _divide(net_income, equity),
+        "roa": _divide(net_income, total_assets),
+        "asset_turnover": _divide(revenue, total_assets),
+        "interest_coverage": _divide(operating_income, interest_expense),
+        "book_value_per_share": _divide(equity, shares),
+    }
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else round(float(value), 6)
+    return value
+
+
+def compute_financial_ratios(
+    companies: Optional[List[str]] = None,
+    groups: Optional[List[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+    income_statements: Optional[List[Dict[str, Any]]] = None,
+    balance_sheets: Optional[List[Dict[str, Any]]] = None,
+    max_rows: int = MAX_RATIO_ROWS,
+) -> Dict[str, Any]:
+    """Compute the standard ratio set for every period of the given companies in one call.
+
+    `groups` selects ratio groups (margins, growth, liquidity, leverage,
+    returns) or an analyst preset ("income", "balance", "all"; default all).
+    Growth rates compare each period with the company's previous period, so
+    they are YoY or QoQ depending on the data. Statements default to the
+    `income_statements` and `balance_sheets` tables.
+    """
+    selected: List[str] = []
+    for group in groups or ["all"]:
+        names = ANALYST_GROUPS.get(group, (group,))
+        for name in names:
+            if name not in RATIO_GROUPS:
+                return {
+                    "tool": "compute_financial_ratios",
+                    "company": companies,
+                    "success": False,
+                    "message": f"Unknown ratio group '{group}'. Use one of {list(RATIO_GROUPS) + list(ANALYST_GROUPS)}.",
+                }
+            if name not in selected:
+                selected.append(name)
+    ratios = list(dict.fromkeys(r for group in selected for r in RATIO_GROUPS[group]))
+
+    try:
+        table = ratio_table(income_statements, balance_sheets, companies, start_period, end_period)
+    except Exception as exc:
+        return {"tool": "compute_financial_ratios", "company": companies, "success": False, "message": str(exc)}
+    n_rows = len(table["company"])
+    if not n_rows:
+        return {
+            "tool": "compute_financial_ratios",
+            "company": companies,
+            "success": False,
+            "message": "No income statement or balance sheet records for the selected companies and periods.",
+        }
+
+    notes = []
+    shown = min(n_rows, max(1, int(max_rows)))
+    if shown < n_rows:
+        notes.append(f"Showing {shown} of {n_rows} rows; narrow companies or periods.")
+    missing = [name for name in ratios if np.isnan(table[name]).all()]
+    if missing:
+        notes.append(f"Not computable from the available fields: {', '.join(missing)}.")
+    notes.append("Growth rates are versus the same company's previous period.")
+    columns = ["company", "period", *ratios]
+
+    return {
+        "tool": "compute_financial_ratios",
+        "company": companies,
+        "success": True,
+        "inputs": {"groups": selected, "start_period": start_period, "end_period": end_period},
+        "result": {
+            "columns": columns,
+            "rows": [{name: _cell(table[name][i]) for name in columns} for i in range(shown)],
+            "row_count": n_rows,
+        },
+        "confidence": round(0.9 * (1 - len(missing) / len(ratios)), 4) if ratios else 0.0,
+        "notes": "; ".join(notes),
+    }
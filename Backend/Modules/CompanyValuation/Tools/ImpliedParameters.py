@@ -0,0 +1,347 @@
+"""
+Implied parameters: invert the DCF and multiples formulas.
+
+Given a target value per company (usually its market cap), find the single
+parameter that makes the formula hit it, holding the others fixed:
+
+- DCF: `wacc`, `terminal_growth_rate`, `fcf_growth` (bracketed root finding)
+  or `free_cash_flow` (linear, solved exactly)
+- Multiples: `ev_ebitda`, `pe`, `ev_sales`, `ebitda_multiple`,
+  `revenue_multiple` (value / metric)
+
+`solve_bracketed` runs a safeguarded Newton iteration over whole arrays at
+once: each row keeps a sign-changing bracket, takes a Newton step (finite-
+difference slope) when it stays inside the bracket and bisects otherwise, so
+every bracketed row converges. Rows stop iterating independently; per-row
+diagnostics report convergence, iterations, residual and whether a root was
+bracketed at all.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+try:
+    from .BatchValuation import dcf_values
+    from .Calculations import DEFAULT_FCF_GROWTH, DEFAULT_TERMINAL_GROWTH, DEFAULT_WACC
+    from .RecordStore import index_for, normalize_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.BatchValuation import dcf_values  # type: ignore
+    from ..Tools.Calculations import DEFAULT_FCF_GROWTH, DEFAULT_TERMINAL_GROWTH, DEFAULT_WACC  # type: ignore
+    from ..Tools.RecordStore import index_for, normalize_key  # type: ignore
+
+DCF_PARAMETERS = ("wacc", "terminal_growth_rate", "fcf_growth", "free_cash_flow")
+# Multiple -> FinancialRecord metric it applies to
+MULTIPLE_PARAMETERS = {
+    "ev_ebitda": "ebitda",
+    "pe": "net_income",
+    "ev_sales": "revenue",
+    "ebitda_multiple": "ebitda",
+    "revenue_multiple": "revenue",
+}
+
+# Search ranges for the bracketed DCF parameters
+WACC_RANGE = (-0.5, 2.0)
+TERMINAL_GROWTH_RANGE = (-0.5, 2.0)
+FCF_GROWTH_RANGE = (-0.9, 2.0)
+SPREAD_EPSILON = 1e-6  # keep WACC and g apart (TV is undefined at WACC = g)
+
+DEFAULT_RTOL = 1e-10
+DEFAULT_MAX_ITER = 100
+
+
+# -------------------------------
+# Solver
+# -------------------------------
+
+def solve_bracketed(
+    func: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    lower: np.ndarray,
+    upper: np.ndarray,
+    scale: Optional[np.ndarray] = None,
+    rtol: float = DEFAULT_RTOL,
+    xtol: float = 1e-12,
+    max_iter: int = DEFAULT_MAX_ITER,
+) -> Dict[str, np.ndarray]:
+    """Find x in [lower, upper] with func(x, rows) = 0 for every row.
+
+    `func(x, rows)` evaluates the residual for the row indices `rows` (so only
+    unconverged rows are recomputed). A row converges when
+    |residual| <= rtol × scale or the bracket is narrower than `xtol`.
+    Returns arrays: root (NaN when not bracketed), converged, bracketed,
+    iterations, residual, newton_steps, bisection_steps.
+    """
+    n = len(lower)
+    rows_all = np.arange(n)
+    a = np.asarray(lower, dtype=float).copy()
+    b = np.asarray(upper, dtype=float).copy()
+    scale = np.ones(n) if scale is None else np.maximum(np.abs(np.asarray(scale, dtype=float)), 1e-300)
+    fa = func(a, rows_all)
+    fb = func(b, rows_all)
+
+    valid = np.isfinite(fa) & np.isfinite(fb) & (a < b)
+    bracketed = valid & (np.sign(fa) != np.sign(fb))
+    x = np.where(np.abs(fa) < np.abs(fb), a, b)
+    fx = np.where(np.abs(fa) < np.abs(fb), fa, fb)
+    bracketed |= valid & (fx == 0)
+
+    iterations = np.zeros(n, dtype=int)
+    newton_steps = np.zeros(n, dtype=int)
+    bisection_steps = np.zeros(n, dtype=int)
+    converged = bracketed & (np.abs(fx) <= rtol * scale)
+
+    for _ in range(max_iter):
+        rows = np.flatnonzero(bracketed & ~converged)
+        if not rows.size:
+            break
+        xr, fr, ar, br, far = x[rows], fx[rows], a[rows], b[rows], fa[rows]
+
+        # Newton step with a finite-difference slope, kept inside the bracket
+        h = 1e-7 * np.maximum(1.0, np.abs(xr))
+        slope = (func(xr + h, rows) - fr) / h
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = xr - fr / slope
+        use_newton = np.isfinite(newton) & (newton > ar) & (newton < br)
+        x_new = np.where(use_newton, newton, 0.5 * (ar + br))
+        f_new = func(x_new, rows)
+
+        # Shrink the bracket around the sign change
+        same_side = np.sign(f_new) == np.sign(far)
+        ar = np.where(same_side, x_new, ar)
+        far = np.where(same_side, f_new, far)
+        br = np.where(same_side, br, x_new)
+
+        x[rows], fx[rows], a[rows], b[rows], fa[rows] = x_new, f_new, ar, br, far
+        iterations[rows] += 1
+        newton_steps[rows] += use_newton
+        bisection_steps[rows] += ~use_newton
+        converged[rows] = (np.abs(f_new) <= rtol * scale[rows]) | (br - ar <= xtol * np.maximum(1.0, np.abs(x_new)))
+
+    return {
+        "root": np.where(bracketed, x, np.nan),
+        "converged": converged,
+        "bracketed": bracketed,
+        "iterations": iterations,
+        "residual": np.where(bracketed, fx, np.nan),
+        "newton_steps": newton_steps,
+        "bisection_steps": bisection_steps,
+    }
+
+
+def _as_array(value: Any, n: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=float), (n,)).astype(float)
+
+
+def implied_dcf_parameter(
+    parameter: str,
+    target_value: Any,
+    free_cash_flow: Any,
+    wacc: Any = DEFAULT_WACC,
+    terminal_growth_rate: Any = DEFAULT_TERMINAL_GROWTH,
+    fcf_growth: Any = DEFAULT_FCF_GROWTH,
+    forecast_years: int = 5,
+    rtol: float = DEFAULT_RTOL,
+    max_iter: int = DEFAULT_MAX_ITER,
+) -> Dict[str, np.ndarray]:
+    """Value of `parameter` at which the DCF equals `target_value`, per row.
+
+    All arguments broadcast to the number of targets. FCF_t is
+    free_cash_flow × (1+fcf_growth)^(t-1), as in `calculate_dcf`. For `wacc`
+    the search range is (g, 2.0]; for `terminal_growth_rate` it is
+    [-0.5, WACC).
+    """
+    if parameter not in DCF_PARAMETERS:
+        raise ValueError(f"Unknown DCF parameter '{parameter}'. Use one of {list(DCF_PARAMETERS)}.")
+    target = np.atleast_1d(np.asarray(target_value, dtype=float))
+    n = len(target)
+    params = {
+        "free_cash_flow": _as_array(free_cash_flow, n),
+        "wacc": _as_array(wacc, n),
+        "terminal_growth_rate": _as_array(terminal_growth_rate, n),
+        "fcf_growth": _as_array(fcf_growth, n),
+    }
+    years = np.arange(forecast_years, dtype=float)
+
+    def dcf(rows: np.ndarray, **override: np.ndarray) -> np.ndarray:
+        p = {name: override.get(name, values[rows]) for name, values in params.items()}
+        flows = p["free_cash_flow"][:, None] * (1.0 + p["fcf_growth"][:, None]) ** years
+        return dcf_values(flows, p["wacc"], p["terminal_growth_rate"])["dcf_value"]
+
+    rows_all = np.arange(n)
+    if parameter == "free_cash_flow":
+        # DCF is linear in the base FCF
+        unit = dcf(rows_all, free_cash_flow=np.ones(n))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            root = np.where((unit != 0) & np.isfinite(unit), target / unit, np.nan)
+        ok = np.isfinite(root)
+        return {
+            "root": root,
+            "converged": ok,
+            "bracketed": ok,
+            "iterations": np.zeros(n, dtype=int),
+            "residual": np.where(ok, 0.0, np.nan),
+            "newton_steps": np.zeros(n, dtype=int),
+            "bisection_steps": np.zeros(n, dtype=int),
+        }
+
+    if parameter == "wacc":
+        lower = np.maximum(params["terminal_growth_rate"] + SPREAD_EPSILON, WACC_RANGE[0])
+        upper = np.full(n, WACC_RANGE[1])
+    elif parameter == "terminal_growth_rate":
+        lower = np.full(n, TERMINAL_GROWTH_RANGE[0])
+        upper = np.minimum(params["wacc"] - SPREAD_EPSILON, TERMINAL_GROWTH_RANGE[1])
+    else:
+        lower = np.full(n, FCF_GROWTH_RANGE[0])
+        upper = np.full(n, FCF_GROWTH_RANGE[1])
+
+    def residual(x: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return dcf(rows, **{parameter: x}) - target[rows]
+
+    return solve_bracketed(residual, lower, upper, scale=target, rtol=rtol, max_iter=max_iter)
+
+
+def implied_multiple(target_value: Any, metric: Any) -> np.ndarray:
+    """Multiple at which metric × multiple equals the target (NaN where metric ≤ 0)."""
+    target = np.atleast_1d(np.asarray(target_value, dtype=float))
+    metric = _as_array(metric, len(target))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(metric > 0, target / metric, np.nan)
+
+
+# -------------------------------
+# Tool
+# -------------------------------
+
+def _clean(value: Any) -> Optional[float]:
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def solve_implied_parameters(
+    parameter: str = "wacc",
+    companies: Optional[List[str]] = None,
+    period: Optional[str] = None,
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+    target_values: Optional[Dict[str, float]] = None,
+    wacc: Optional[float] = None,
+    terminal_growth_rate: Optional[float] = None,
+    fcf_growth: Optional[float] = None,
+    forecast_years: int = 5,
+) -> Dict[str, Any]:
+    """Parameter implied by each company's market value, across a peer set.
+
+    `parameter` is a DCF input (wacc, terminal_growth_rate, fcf_growth,
+    free_cash_flow) or a multiple (ev_ebitda, pe, ev_sales, ebitda_multiple,
+    revenue_multiple). Targets default to market cap (share price × shares)
+    unless `target_values` maps company -> value. `companies` defaults to every
+    company in the statements; the other DCF inputs come from each record
+    unless given.
+    """
+    if parameter not in DCF_PARAMETERS and parameter not in MULTIPLE_PARAMETERS:
+        return {
+            "tool": "solve_implied_parameters",
+            "success": False,
+            "message": f"Unknown parameter '{parameter}'. Use one of {list(DCF_PARAMETERS) + list(MULTIPLE_PARAMETERS)}.",
+        }
+
+    index = index_for(records)
+    if companies is None:
+        companies = list(dict.fromkeys(rec.company for rec in index.financial if rec.company))
+    targets = {normalize_key(k): v for k, v in (target_values or {}).items()}
+
+    names: List[str] = []
+    rows: List[Any] = []
+    skipped: List[str] = []
+    for company in companies:
+        record = index.lookup_record(company, period)
+        if record is None or normalize_key(record.company) != normalize_key(company):
+            skipped.append(company)
+            continue
+        target = targets.get(normalize_key(company))
+        if target is None and (record.share_price or 0) > 0 and (record.shares_outstanding or 0) > 0:
+            target = record.share_price * record.shares_outstanding
+        if target is None:
+            skipped.append(company)
+            continue
+        names.append(company)
+        rows.append((record, float(target)))
+
+    if not rows:
+        return {
+            "tool": "solve_implied_parameters",
+            "parameter": parameter,
+            "success": False,
+            "message": "No companies with both a statement record and a target value.",
+            "skipped": skipped,
+        }
+
+    target = np.array([t for _, t in rows])
+    if parameter in MULTIPLE_PARAMETERS:
+        metric = np.array([getattr(rec, MULTIPLE_PARAMETERS[parameter]) or 0.0 for rec, _ in rows])
+        implied = implied_multiple(target, metric)
+        solved = {
+            "root": implied,
+            "converged": np.isfinite(implied),
+            "bracketed": np.isfinite(implied),
+            "iterations": np.zeros(len(rows), dtype=int),
+            "residual": np.where(np.isfinite(implied), 0.0, np.nan),
+            "newton_steps": np.zeros(len(rows), dtype=int),
+            "bisection_steps": np.zeros(len(rows), dtype=int),
+        }
+    else:
+        def base_fcf(rec: Any) -> float:
+            fcf = rec.free_cash_flow or 0.0
+            return fcf if fcf != 0 else (rec.operating_cash_flow or 0.0) - (rec.capital_expenditures or 0.0)
+
+        record_wacc = np.array([rec.wacc if rec.wacc is not None else DEFAULT_WACC for rec, _ in rows])
+        solved = implied_dcf_parameter(
+            parameter,
+            target,
+            free_cash_flow=np.array([base_fcf(rec) for rec, _ in rows]),
+            wacc=record_wacc if wacc is None else wacc,
+            terminal_growth_rate=DEFAULT_TERMINAL_GROWTH if terminal_growth_rate is None else terminal_growth_rate,
+            fcf_growth=DEFAULT_FCF_GROWTH if fcf_growth is None else fcf_growth,
+            forecast_years=forecast_years,
+        )
+
+    results = {
+        name: {
+            "implied": _clean(solved["root"][i]),
+            "target_value": float(target[i]),
+            "converged": bool(solved["converged"][i]),
+            "bracketed": bool(solved["bracketed"][i]),
+            "iterations": int(solved["iterations"][i]),
+            "residual": _clean(solved["residual"][i]),
+        }
+        for i, name in enumerate(names)
+    }
+    implied_values = solved["root"][np.isfinite(solved["root"]) & solved["converged"]]
+    not_bracketed = [name for name, r in results.items() if not r["bracketed"]]
+
+    notes = []
+    if not_bracketed:
+        notes.append(f"No solution in the search range for: {', '.join(not_bracketed)}.")
+    if skipped:
+        notes.append(f"Skipped (no record or target): {', '.join(skipped)}.")
+
+    return {
+        "tool": "solve_implied_parameters",
+        "parameter": parameter,
+        "period": period,
+        "success": bool(implied_values.size),
+        "result": {
+            "companies": results,
+            "summary": {
+                "solved": int(implied_values.size),
+                "total": len(names),
+                "median": float(np.median(implied_values)) if implied_values.size else None,
+                "mean": float(implied_values.mean()) if implied_values.size else None,
+                "max_iterations": int(solved["iterations"].max()),
+                "newton_steps": int(solved["newton_steps"].sum()),
+                "bisection_steps": int(solved["bisection_steps"].sum()),
+            },
+        },
+        "notes": "; ".join(notes),
+    }
@@ -0,0 +1,345 @@
+"""
+Local replica of the Airtable base.
+
+Mirrors the valuation tables into a SQLite file so the `get_*` helpers in
+`CompanyValuationDB` can be answered without a round trip to Airtable.
+
+- The first sync of a table downloads every record.
+- Later syncs only request records whose LAST_MODIFIED_TIME() is after the
+  watermark stored by the previous sync (delta sync).
+- A full sync also prunes records that were deleted upstream, which a delta
+  sync cannot see.
+
+Records are stored and returned in Airtable format (`id`, `createdTime`,
+`fields`) so callers cannot tell whether they were served live or locally.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Records modified while a sync is running may carry a timestamp slightly
+# older than the moment the sync started; re-fetching a small overlap window
+# is cheaper than missing them.
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    table_name   TEXT NOT NULL,
+    record_id    TEXT NOT NULL,
+    created_time TEXT,
+    position     INTEGER NOT NULL,
+    fields       TEXT NOT NULL,
+    PRIMARY KEY (table_name, record_id)
+);
+CREATE INDEX IF NOT EXISTS records_by_position ON records (table_name, position);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name     TEXT PRIMARY KEY,
+    watermark      TEXT NOT NULL,
+    last_sync      TEXT NOT NULL,
+    last_full_sync TEXT,
+    record_count   INTEGER NOT NULL DEFAULT 0,
+    generation     INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _to_airtable_timestamp(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def delta_formula(watermark: str) -> str:
+    """Airtable formula selecting records modified after `watermark`."""
+    return f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{watermark}'))"
+
+
+class AirtableReplica:
+    """SQLite mirror of a set of Airtable tables."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # -------------------------------
+    # State
+    # -------------------------------
+
+    def sync_state(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Return the stored sync state for `table_name`, or None if never synced."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT watermark, last_sync, last_full_sync, record_count, generation "
+                "FROM sync_state WHERE table_name = ?",
+                (table_name,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "table": table_name,
+            "watermark": row[0],
+            "last_sync": row[1],
+            "last_full_sync": row[2],
+            "record_count": row[3],
+            "generation": row[4],
+        }
+
+    def has_table(self, table_name: str) -> bool:
+        return self.sync_state(table_name) is not None
+
+    def table_age(self, table_name: str) -> Optional[timedelta]:
+        """Time elapsed since the last sync of `table_name` (None if never synced)."""
+        state = self.sync_state(table_name)
+        if state is None:
+            return None
+        return _utcnow() - datetime.fromisoformat(state["last_sync"])
+
+    # -------------------------------
+    # Reads
+    # -------------------------------
+
+    def read_table(self, table_name: str) -> List[Dict[str, Any]]:
+        """Return all mirrored records of `table_name` in Airtable order."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT record_id, created_time, fields FROM records "
+                "WHERE table_name = ? ORDER BY position",
+                (table_name,),
+            ).fetchall()
+        return [
+            {"id": record_id, "createdTime": created_time, "fields": json.loads(fields)}
+            for record_id, created_time, fields in rows
+        ]
+
+    # -------------------------------
+    # Sync
+    # -------------------------------
+
+    def sync_table(self, table_name: str, table: Any, full: bool = False) -> Dict[str, Any]:
+        """Mirror one Airtable table.
+
+        `table` is a pyairtable `Table` (anything exposing `all(formula=...)`).
+        A delta sync is used when the table has been synced before and `full`
+        is False; otherwise every record is fetched and stale rows are pruned.
+        """
+        with self._lock:
+            state = self.sync_state(table_name)
+            started = _utcnow()
+            delta = state is not None and not full
+
+            if delta:
+                fetched = table.all(formula=delta_formula(state["watermark"]))
+            else:
+                fetched = table.all()
+
+            with closing(self._connect()) as conn, conn:
+                upserted = self._write_records(conn, table_name, fetched, delta=delta)
+                deleted = 0
+                if not delta:
+                    deleted = self._prune(conn, table_name, {rec["id"] for rec in fetched})
+                count = conn.execute(
+                    "SELECT COUNT(*) FROM records WHERE table_name = ?", (table_name,)
+                ).fetchone()[0]
+                changed = bool(upserted or deleted)
+                generation = (state["generation"] if state else 0) + (1 if changed or state is None else 0)
+                conn.execute(
+                    "INSERT INTO sync_state (table_name, watermark, last_sync, last_full_sync, record_count, generation) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(table_name) DO UPDATE SET watermark = excluded.watermark, "
+                    "last_sync = excluded.last_sync, "
+                    "last_full_sync = COALESCE(excluded.last_full_sync, sync_state.last_full_sync), "
+                    "record_count = excluded.record_count, generation = excluded.generation",
+                    (
+                        table_name,
+                        _to_airtable_timestamp(started - WATERMARK_OVERLAP),
+                        started.isoformat(),
+                        None if delta else started.isoformat(),
+                        count,
+                        generation,
+                    ),
+                )
+
+        logger.info(
+            "Synced %s (%s): %d upserted, %d deleted, %d total",
+            table_name, "delta" if delta else "full", upserted, deleted, count,
+        )
+        return {
+            "table": table_name,
+            "mode": "delta" if delta else "full",
+            "fetched": len(fetched),
+            "upserted": upserted,
+            "deleted": deleted,
+            "record_count": count,
+            "generation": generation,
+        }
+
+    def load_records(self, table_name: str, records: List[Mapping[str, Any]]) -> Dict[str, Any]:
+        """Replace the contents of `table_name` with `records` (no Airtable involved).
+
+        Used to populate a standalone SQLite store, e.g. with synthetic data.
+        """
+        return self.sync_table(table_name, _StaticTable(records), full=True)
+
+    def upsert_fields(
+        self,
+        table_name: str,
+        rows: List[Mapping[str, Any]],
+        key_fields: List[str],
+    ) -> Dict[str, int]:
+        """Insert or update records matched on `key_fields` (Airtable upsert semantics).
+
+        Matched records have the given fields merged into their existing fields.
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            existing: Dict[tuple, tuple] = {}
+            for record_id, fields in conn.execute(
+                "SELECT record_id, fields FROM records WHERE table_name = ?", (table_name,)
+            ):
+                decoded = json.loads(fields)
+                existing[tuple(decoded.get(k) for k in key_fields)] = (record_id, decoded)
+
+            next_position = conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM records WHERE table_name = ?", (table_name,)
+            ).fetchone()[0]
+            created = updated = 0
+            for row in rows:
+                key = tuple(row.get(k) for k in key_fields)
+                if key in existing:
+                    record_id, fields = existing[key]
+                    fields = {**fields, **row}
+                    conn.execute(
+                        "UPDATE records SET fields = ? WHERE table_name = ? AND record_id = ?",
+                        (json.dumps(fields, sort_keys=True), table_name, record_id),
+                    )
+                    updated += 1
+                else:
+                    record_id = f"rec{uuid.uuid4().hex[:14]}"
+                    fields = dict(row)
+                    conn.execute(
+                        "INSERT INTO records (table_name, record_id, created_time, position, fields) VALUES (?, ?, ?, ?, ?)",
+                        (table_name, record_id, _to_airtable_timestamp(_utcnow()), next_position,
+                         json.dumps(fields, sort_keys=True)),
+                    )
+                    next_position += 1
+                    created += 1
+                existing[key] = (record_id, fields)
+
+            now = _utcnow()
+            conn.execute(
+                "INSERT INTO sync_state (table_name, watermark, last_sync, record_count, generation) "
+                "VALUES (?, ?, ?, (SELECT COUNT(*) FROM records WHERE table_name = ?), 1) "
+                "ON CONFLICT(table_name) DO UPDATE SET record_count = excluded.record_count, "
+                "generation = sync_state.generation + 1",
+                (table_name, _to_airtable_timestamp(now), now.isoformat(), table_name),
+            )
+        return {"created": created, "updated": updated}
+
+    def sync(self, tables: Mapping[str, Any], full: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Sync every table in the `{name: Table}` mapping."""
+        return {name: self.sync_table(name, table, full=full) for name, table in tables.items()}
+
+    def _write_records(
+        self,
+        conn: sqlite3.Connection,
+        table_name: str,
+        records: List[Mapping[str, Any]],
+        delta: bool,
+    ) -> int:
+        """Write `records`; returns how many rows were new or differed from the replica.
+
+        Records already stored unchanged (e.g. the overlap window a delta sync
+        re-reads) are skipped, so they do not count as changes.
+        """
+        if not records:
+            return 0
+        stored = self._stored_rows(conn, table_name, [rec["id"] for rec in records] if delta else None)
+        rows = []
+        for position, rec in enumerate(records):
+            row = (rec["id"], rec.get("createdTime"), position, json.dumps(rec.get("fields", {}), sort_keys=True))
+            current = stored.get(rec["id"])
+            if current is not None and current[0] == row[1] and current[2] == row[3]:
+                # Delta syncs keep existing positions; full syncs also restore the order
+                if delta or current[1] == position:
+                    continue
+            rows.append(row)
+        if not rows:
+            return 0
+
+        if delta:
+            # Existing records keep their position; new ones are appended.
+            next_position = conn.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM records WHERE table_name = ?",
+                (table_name,),
+            ).fetchone()[0]
+            rows = [(rid, created, next_position + i, fields) for i, (rid, created, _, fields) in enumerate(rows)]
+            conflict = "fields = excluded.fields, created_time = excluded.created_time"
+        else:
+            conflict = "fields = excluded.fields, created_time = excluded.created_time, position = excluded.position"
+
+        conn.executemany(
+            "INSERT INTO records (table_name, record_id, created_time, position, fields) "
+            f"VALUES (?, ?, ?, ?, ?) ON CONFLICT(table_name, record_id) DO UPDATE SET {conflict}",
+            [(table_name, *row) for row in rows],
+        )
+        return len(rows)
+
+    def _stored_rows(
+        self,
+        conn: sqlite3.Connection,
+        table_name: str,
+        record_ids: Optional[List[str]] = None,
+    ) -> Dict[str, Tuple[Optional[str], int, str]]:
+        """record_id -> (created_time, position, fields JSON) for `record_ids` (all rows when None)."""
+        query = "SELECT record_id, created_time, position, fields FROM records WHERE table_name = ?"
+        if record_ids is None:
+            return {row[0]: row[1:] for row in conn.execute(query, (table_name,))}
+        stored: Dict[str, Tuple[Optional[str], int, str]] = {}
+        for start in range(0, len(record_ids), 500):
+            chunk = record_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in conn.execute(f"{query} AND record_id IN ({placeholders})", (table_name, *chunk)):
+                stored[row[0]] = row[1:]
+        return stored
+
+    def _prune(self, conn: sqlite3.Connection, table_name: str, keep_ids: set) -> int:
+        existing = {
+            row[0]
+            for row in conn.execute("SELECT record_id FROM records WHERE table_name = ?", (table_name,))
+        }
+        stale = existing - keep_ids
+        conn.executemany(
+            "DELETE FROM records WHERE table_name = ? AND record_id = ?",
+            [(table_name, record_id) for record_id in stale],
+        )
+        return len(stale)
+
+
+class _StaticTable:
+    """Adapter giving a list of records the `Table.all()` interface."""
+
+    def __init__(self, records: List[Mapping[str, Any]]):
+        self._records = list(records)
+
+    def all(self, **_: Any) -> List[Mapping[str, Any]]:
+        return self._records
@@ -0,0 +1,285 @@
+"""
+Materialized calculator results.
+
+Valuations of companies whose data has not changed (e.g. everything the
+nightly revaluation already computed) should not be recomputed when an agent
+asks again. `materialized` wraps a calculator so that, when
+`MATERIALIZED_RESULTS_PATH` is set, successful payloads are stored in a
+SQLite table keyed by
+
+    (company, period, method, input hash)
+
+The input hash covers everything the result depends on:
+- the call arguments, except `company`/`period`/`records`, which only select
+  the statement record;
+- a fingerprint of that record's fields;
+- values the tool would fill from the data store (e.g. the segment's
+  industry multiples when `industry_multiples` is omitted), via `resolvers`.
+
+A call with unchanged inputs is answered from the table without running the
+calculator (or its write-behind). When a statement record changes, its
+fingerprint changes, so old entries stop matching. They are also deleted:
+when the same (company, period, method) is stored again, and by a sweep that
+runs whenever the statements table version changes.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+try:
+    from .CalculatorCache import canonicalize
+    from .RecordStore import FinancialRecord, StatementIndex, index_for, normalize_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.CalculatorCache import canonicalize  # type: ignore
+    from ..Tools.RecordStore import FinancialRecord, StatementIndex, index_for, normalize_key  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZED_RESULTS_PATH = os.getenv("MATERIALIZED_RESULTS_PATH")
+
+# Arguments that select the statement record rather than change the result
+SELECTOR_ARGUMENTS = ("company", "period", "records")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS materialized_results (
+    company     TEXT NOT NULL,
+    period      TEXT NOT NULL,
+    method      TEXT NOT NULL,
+    input_hash  TEXT NOT NULL,
+    record_hash TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (company, period, method, input_hash)
+);
+CREATE INDEX IF NOT EXISTS materialized_by_record ON materialized_results (company, period);
+"""
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(repr(canonicalize(value)).encode()).hexdigest()
+
+
+def record_fingerprint(record: FinancialRecord) -> str:
+    """Content hash of a statement record's (normalized) fields."""
+    return _digest(record.fields)
+
+
+class MaterializedStore:
+    """SQLite table of calculator payloads keyed by (company, period, method, input hash)."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        self._swept_index: Optional[StatementIndex] = None
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "invalidated": 0}
+
+    def get(self, company: str, period: str, method: str, input_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM materialized_results "
+                "WHERE company = ? AND period = ? AND method = ? AND input_hash = ?",
+                (company, period, method, input_hash),
+            ).fetchone()
+            self.stats["hits" if row else "misses"] += 1
+        return json.loads(row[0]) if row else None
+
+    def put(
+        self,
+        company: str,
+        period: str,
+        method: str,
+        input_hash: str,
+        record_hash: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        """Store `payload`, dropping entries of the same key computed from another record version."""
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM materialized_results WHERE company = ? AND period = ? AND method = ? AND record_hash != ?",
+                (company, period, method, record_hash),
+            ).rowcount
+            self._conn.execute(
+                "INSERT OR REPLACE INTO materialized_results "
+                "(company, period, method, input_hash, record_hash, payload, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (company, period, method, input_hash, record_hash, encoded, datetime.now(timezone.utc).isoformat()),
+            )
+            self.stats["stored"] += 1
+            self.stats["invalidated"] += max(0, removed)
+
+    def invalidate(self, company: Optional[str] = None, period: Optional[str] = None) -> int:
+        """Delete entries of `company` (and `period`), or everything when both are None."""
+        clauses, params = [], []
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(normalize_key(company))
+        if period is not None:
+            clauses.append("period = ?")
+            params.append(normalize_key(period))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock, self._conn:
+            removed = self._conn.execute(f"DELETE FROM materialized_results{where}", params).rowcount
+            self.stats["invalidated"] += max(0, removed)
+        return removed
+
+    def sweep(self, index: StatementIndex) -> int:
+        """Drop entries whose statement record changed or disappeared.
+
+        Runs once per store index, i.e. once per statements table version.
+        """
+        if index is self._swept_index:
+            return 0
+        current: Dict[Tuple[str, str], str] = {}
+        for record in index.financial:
+            current.setdefault((normalize_key(record.company), normalize_key(record.period)), record_fingerprint(record))
+        with self._lock, self._conn:
+            stored = self._conn.execute(
+                "SELECT DISTINCT company, period, record_hash FROM materialized_results"
+            ).fetchall()
+            stale = [(c, p, h) for c, p, h in stored if current.get((c, p)) != h]
+            removed = max(0, self._conn.executemany(
+                "DELETE FROM materialized_results WHERE company = ? AND period = ? AND record_hash = ?", stale
+            ).rowcount)
+            self.stats["invalidated"] += removed
+            self._swept_index = index
+        return removed
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM materialized_results").fetchone()[0]
+            return {"path": str(self.path), "entries": size, **self.stats}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# -------------------------------
+# Process-wide store
+# -------------------------------
+
+_store: Optional[MaterializedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_materialized_store() -> Optional[MaterializedStore]:
+    """The store at MATERIALIZED_RESULTS_PATH (None when materialization is off)."""
+    global _store
+    if _store is None and MATERIALIZED_RESULTS_PATH:
+        with _store_lock:
+            if _store is None:
+                _store = MaterializedStore(MATERIALIZED_RESULTS_PATH)
+    return _store
+
+
+def set_materialized_store(path: Optional[str]) -> Optional[MaterializedStore]:
+    """Switch materialization on (a SQLite path) or off (None) at runtime."""
+    global _store, MATERIALIZED_RESULTS_PATH
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        MATERIALIZED_RESULTS_PATH = path
+        _store = MaterializedStore(path) if path else None
+    return _store
+
+
+def materialized_info() -> Dict[str, Any]:
+    store = get_materialized_store()
+    return store.info() if store is not None else {"enabled": False}
+
+
+# -------------------------------
+# Decorator
+# -------------------------------
+
+def _selected_record(store: MaterializedStore, arguments: Mapping[str, Any]) -> Optional[FinancialRecord]:
+    records = arguments.get("records")
+    if isinstance(records, FinancialRecord):
+        record = records
+    else:
+        index = index_for(records)
+        # Without a table version every read builds a new index; sweeping it would scan the table per call
+        if records is None and index.version is not None:
+            store.sweep(index)
+        record = index.lookup_record(arguments.get("company"), arguments.get("period"))
+    # The index falls back to another company's record; that must not be keyed under this one
+    if record is None or normalize_key(record.company) != normalize_key(arguments.get("company")):
+        return None
+    return record
+
+
+def materialized(
+    resolvers: Optional[Mapping[str, Callable[[FinancialRecord], Any]]] = None,
+    explicit: Tuple[str, ...] = (),
+) -> Callable[[Callable[..., Dict[str, Any]]], Callable[..., Dict[str, Any]]]:
+    """Serve `func` from the materialized store when its inputs are unchanged.
+
+    `resolvers` maps an argument name to the value the calculator derives
+    from the record/data store when the argument is None, so an omitted
+    argument and the equivalent explicit value share an entry. When every
+    argument in `explicit` is given the calculator does not read the record,
+    so the call runs directly without a record lookup.
+    """
+    resolvers = dict(resolvers or {})
+
+    def decorate(func: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        signature = inspect.signature(func)
+        method = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            store = get_materialized_store()
+            if store is None or not (kwargs.get("company") or (args and args[0])):
+                return func(*args, **kwargs)
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = bound.arguments
+                if explicit and all(arguments.get(name) is not None for name in explicit):
+                    record = None
+                else:
+                    record = _selected_record(store, arguments)
+                if record is not None:
+                    inputs = {name: value for name, value in arguments.items() if name not in SELECTOR_ARGUMENTS}
+                    for name, resolve in resolvers.items():
+                        if inputs.get(name) is None:
+                            inputs[name] = resolve(record)
+                    record_hash = record_fingerprint(record)
+                    key = (normalize_key(record.company), normalize_key(record.period), method)
+                    input_hash = _digest({"inputs": inputs, "record": record_hash})
+                    cached = store.get(*key, input_hash)
+            except Exception:
+                logger.debug("Materialized lookup failed for %s", method, exc_info=True)
+                record = None
+            if record is None:
+                return func(*args, **kwargs)
+            if cached is not None:
+                return cached
+
+            payload = func(*args, **kwargs)
+            if isinstance(payload, Mapping) and payload.get("success"):
+                try:
+                    store.put(*key, input_hash, record_hash, payload)
+                except Exception:
+                    logger.warning("Could not materialize %s result", method, exc_info=True)
+            return payload
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,389 @@
+"""
+Monte Carlo DCF.
+
+`simulate_dcf_monte_carlo` samples FCF growth, WACC, terminal growth and
+(optionally) FCF margin from the given distributions and values every path
+with `calculate_dcf`'s formula. Paths are simulated in fixed-size vectorized
+chunks, optionally spread over a process pool, and each chunk is reduced to a
+fixed-size summary (moments + histogram) before it is merged, so memory does
+not grow with the number of paths. Percentiles are read off the merged
+histogram.
+
+Each chunk draws from its own stream spawned from `seed`, so results are
+reproducible for a given seed and chunk size regardless of the worker count.
+
+Distribution specs (per parameter):
+
+    0.09                                            # fixed value
+    {"dist": "normal", "mean": 0.09, "std": 0.01}
+    {"dist": "uniform", "low": 0.02, "high": 0.08}
+    {"dist": "triangular", "low": 0.0, "mode": 0.05, "high": 0.1}
+    {"dist": "lognormal", "mean": 0.0, "sigma": 0.2}   # of the underlying normal
+
+Any spec may add "min"/"max" to clip samples.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    from .BatchValuation import dcf_values
+    from .Calculations import DEFAULT_FCF_GROWTH, DEFAULT_TERMINAL_GROWTH, DEFAULT_WACC, _lookup_record
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.BatchValuation import dcf_values  # type: ignore
+    from ..Tools.Calculations import DEFAULT_FCF_GROWTH, DEFAULT_TERMINAL_GROWTH, DEFAULT_WACC, _lookup_record  # type: ignore
+
+DistributionSpec = Union[float, Mapping[str, Any]]
+
+SIMULATED_PARAMETERS = ("fcf_growth", "wacc", "terminal_growth", "margin")
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+DEFAULT_CHUNK_SIZE = 100_000
+MAX_PATHS = 50_000_000
+
+# Internal histogram resolution; the returned histogram is rebinned
+HISTOGRAM_RESOLUTION = 4096
+# Range of the internal histogram, set from the first chunk's quantiles
+PILOT_QUANTILES = (0.001, 0.999)
+PILOT_MARGIN = 0.5  # widen the pilot range by this fraction on each side
+
+
+# -------------------------------
+# Sampling
+# -------------------------------
+
+def sample(spec: DistributionSpec, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw `size` samples from a distribution spec (see module docstring)."""
+    if not isinstance(spec, Mapping):
+        return np.full(size, float(spec))
+    dist = str(spec.get("dist", "normal")).lower()
+    if dist == "fixed":
+        values = np.full(size, float(spec["value"]))
+    elif dist == "normal":
+        values = rng.normal(float(spec["mean"]), float(spec.get("std", 0.0)), size)
+    elif dist == "uniform":
+        values = rng.uniform(float(spec["low"]), float(spec["high"]), size)
+    elif dist == "triangular":
+        values = rng.triangular(float(spec["low"]), float(spec["mode"]), float(spec["high"]), size)
+    elif dist == "lognormal":
+        values = rng.lognormal(float(spec.get("mean", 0.0)), float(spec.get("sigma", 0.0)), size)
+    else:
+        raise ValueError(f"Unknown distribution '{dist}'. Use fixed, normal, uniform, triangular or lognormal.")
+    if "min" in spec or "max" in spec:
+        values = np.clip(values, spec.get("min", -np.inf), spec.get("max", np.inf))
+    return values
+
+
+def simulate_values(
+    size: int,
+    rng: np.random.Generator,
+    base_free_cash_flow: float,
+    distributions: Mapping[str, DistributionSpec],
+    forecast_years: int = 5,
+    revenue: Optional[float] = None,
+) -> Tuple[np.ndarray, int]:
+    """DCF values of `size` sampled paths; returns (valid values, invalid path count).
+
+    With a `margin` distribution and `revenue`, the base FCF of each path is
+    revenue × margin; otherwise it is `base_free_cash_flow`. Paths with
+    WACC ≤ g have no finite value and are counted as invalid.
+    """
+    growth = sample(distributions["fcf_growth"], size, rng)
+    wacc = sample(distributions["wacc"], size, rng)
+    terminal_growth = sample(distributions["terminal_growth"], size, rng)
+    if distributions.get("margin") is not None and revenue is not None:
+        base = float(revenue) * sample(distributions["margin"], size, rng)
+    else:
+        base = np.full(size, float(base_free_cash_flow))
+
+    years = np.arange(forecast_years, dtype=float)
+    flows = base[:, None] * (1.0 + growth[:, None]) ** years
+    values = dcf_values(flows, wacc, terminal_growth)["dcf_value"]
+    valid = (wacc > terminal_growth) & np.isfinite(values)
+    return values[valid], int(size - valid.sum())
+
+
+# -------------------------------
+# Streaming summary
+# -------------------------------
+
+@dataclass
+class StreamingSummary:
+    """Mergeable fixed-size summary of a stream of values."""
+
+    edges: np.ndarray
+    counts: np.ndarray = field(default=None)  # type: ignore[assignment]
+    count: int = 0
+    invalid: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+    minimum: float = np.inf
+    maximum: float = -np.inf
+    underflow: int = 0
+    overflow: int = 0
+
+    def __post_init__(self) -> None:
+        if self.counts is None:
+            self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def add(self, values: np.ndarray, invalid: int = 0) -> "StreamingSummary":
+        self.invalid += invalid
+        if not values.size:
+            return self
+        self.count += int(values.size)
+        # Shift by the range midpoint to keep the variance numerically stable
+        shifted = values - self._shift
+        self.total += float(shifted.sum())
+        self.total_sq += float(np.dot(shifted, shifted))
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self.underflow += int((values < self.edges[0]).sum())
+        self.overflow += int((values > self.edges[-1]).sum())
+        self.counts += np.histogram(values, bins=self.edges)[0]
+        return self
+
+    def merge(self, other: "StreamingSummary") -> "StreamingSummary":
+        self.count += other.count
+        self.invalid += other.invalid
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.counts += other.counts
+        return self
+
+    @property
+    def _shift(self) -> float:
+        return float(self.edges[0] + self.edges[-1]) / 2.0
+
+    @property
+    def mean(self) -> float:
+        return self._shift + self.total / self.count if self.count else float("nan")
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return float("nan")
+        mean_shifted = self.total / self.count
+        variance = (self.total_sq - self.count * mean_shifted ** 2) / (self.count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def percentiles(self, qs: Sequence[float]) -> Dict[str, Optional[float]]:
+        """Percentiles interpolated within histogram bins (under/overflow clamp to min/max)."""
+        if not self.count:
+            return {f"p{q:g}": None for q in qs}
+        cumulative = np.concatenate([[self.underflow], self.underflow + np.cumsum(self.counts)])
+        out: Dict[str, Optional[float]] = {}
+        for q in qs:
+            target = q / 100.0 * self.count
+            if target <= self.underflow:
+                value = self.minimum if self.underflow else float(self.edges[0])
+            elif target > cumulative[-1]:
+                value = self.maximum
+            else:
+                i = int(np.searchsorted(cumulative, target, side="left")) - 1
+                i = min(max(i, 0), len(self.counts) - 1)
+                in_bin = self.counts[i]
+                fraction = (target - cumulative[i]) / in_bin if in_bin else 0.0
+                value = float(self.edges[i] + fraction * (self.edges[i + 1] - self.edges[i]))
+            out[f"p{q:g}"] = min(max(value, self.minimum), self.maximum)
+        return out
+
+    def histogram(self, bins: int) -> Dict[str, List[float]]:
+        """Histogram rebinned to `bins` equal-width bins over the internal range."""
+        bins = max(1, min(bins, len(self.counts)))
+        groups = np.array_split(np.arange(len(self.counts)), bins)
+        return {
+            "edges": [float(self.edges[g[0]]) for g in groups] + [float(self.edges[-1])],
+            "counts": [int(self.counts[g].sum()) for g in groups],
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+        }
+
+
+def _histogram_edges(pilot: np.ndarray) -> np.ndarray:
+    if pilot.size:
+        low, high = np.quantile(pilot, PILOT_QUANTILES)
+    else:
+        low, high = -1.0, 1.0
+    span = (high - low) or max(abs(high), 1.0)
+    return np.linspace(low - PILOT_MARGIN * span, high + PILOT_MARGIN * span, HISTOGRAM_RESOLUTION + 1)
+
+
+def _simulate_chunk(args: Tuple[Any, ...]) -> StreamingSummary:
+    # Module-level so it can run in worker processes
+    seed_sequence, size, base_free_cash_flow, distributions, forecast_years, revenue, edges = args
+    rng = np.random.default_rng(seed_sequence)
+    values, invalid = simulate_values(size, rng, base_free_cash_flow, distributions, forecast_years, revenue)
+    return StreamingSummary(edges).add(values, invalid)
+
+
+def run_simulation(
+    n_paths: int,
+    base_free_cash_flow: float,
+    distributions: Mapping[str, DistributionSpec],
+    forecast_years: int = 5,
+    revenue: Optional[float] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seed: Optional[int] = None,
+    workers: int = 1,
+) -> StreamingSummary:
+    """Simulate `n_paths` in chunks of `chunk_size` and return the merged summary.
+
+    The first chunk runs in-process and fixes the histogram range; the rest run
+    on `workers` processes (in-process when `workers` <= 1).
+    """
+    chunk_size = max(1, int(chunk_size))
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    rng = np.random.default_rng(seeds[0])
+    pilot, pilot_invalid = simulate_values(sizes[0], rng, base_free_cash_flow, distributions, forecast_years, revenue)
+    summary = StreamingSummary(_histogram_edges(pilot)).add(pilot, pilot_invalid)
+    del pilot
+
+    tasks = [
+        (seeds[i], sizes[i], base_free_cash_flow, dict(distributions), forecast_years, revenue, summary.edges)
+        for i in range(1, len(sizes))
+    ]
+    if workers > 1 and tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_simulate_chunk, tasks):
+                summary.merge(part)
+    else:
+        for task in tasks:
+            summary.merge(_simulate_chunk(task))
+    return summary
+
+
+# -------------------------------
+# Tool
+# -------------------------------
+
+def simulate_dcf_monte_carlo(
+    company: Optional[str] = None,
+    period: Optional[str] = None,
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+    free_cash_flow: Optional[float] = None,
+    revenue: Optional[float] = None,
+    fcf_growth: Optional[DistributionSpec] = None,
+    wacc: Optional[DistributionSpec] = None,
+    terminal_growth: Optional[DistributionSpec] = None,
+    margin: Optional[DistributionSpec] = None,
+    n_paths: int = 1_000_000,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    forecast_years: int = 5,
+    percentiles: Optional[List[float]] = None,
+    histogram_bins: int = 20,
+) -> Dict[str, Any]:
+    """Probabilistic DCF valuation range.
+
+    Defaults when a distribution is omitted: FCF growth ~ N(5%, 2%),
+    WACC ~ N(record WACC or 10%, 1%), terminal growth ~ N(3%, 0.5%).
+    `margin` (FCF margin on revenue) is used only when given.
+    """
+    needs_record = free_cash_flow is None or wacc is None or (margin is not None and revenue is None)
+    if needs_record:
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
+            return {
+                "tool": "simulate_dcf_monte_carlo",
+                "company": company,
+                "period": period,
+                "success": False,
+                "message": "No financial statement records available.",
+            }
+        if free_cash_flow is None:
+            free_cash_flow = record.free_cash_flow or 0.0
+            if free_cash_flow == 0:
+                free_cash_flow = (record.operating_cash_flow or 0.0) - (record.capital_expenditures or 0.0)
+        if margin is not None and revenue is None:
+            revenue = record.revenue or 0.0
+        if wacc is None:
+            base_wacc = record.wacc if record.wacc is not None else DEFAULT_WACC
+            wacc = {"dist": "normal", "mean": base_wacc, "std": 0.01}
+
+    if not free_cash_flow and not (margin is not None and revenue):
+        return {
+            "tool": "simulate_dcf_monte_carlo",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": "No free cash flow (or revenue and margin) data available.",
+        }
+    if not 0 < n_paths <= MAX_PATHS:
+        return {
+            "tool": "simulate_dcf_monte_carlo",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": f"n_paths must be between 1 and {MAX_PATHS}.",
+        }
+
+    distributions: Dict[str, Optional[DistributionSpec]] = {
+        "fcf_growth": fcf_growth if fcf_growth is not None else {"dist": "normal", "mean": DEFAULT_FCF_GROWTH, "std": 0.02},
+        "wacc": wacc,
+        "terminal_growth": terminal_growth if terminal_growth is not None else {"dist": "normal", "mean": DEFAULT_TERMINAL_GROWTH, "std": 0.005},
+        "margin": margin,
+    }
+    try:
+        summary = run_simulation(
+            n_paths,
+            float(free_cash_flow or 0.0),
+            distributions,
+            forecast_years=forecast_years,
+            revenue=revenue,
+            chunk_size=chunk_size,
+            seed=seed,
+            workers=workers,
+        )
+    except (KeyError, ValueError) as exc:
+        return {
+            "tool": "simulate_dcf_monte_carlo",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": f"Invalid distribution: {exc}",
+        }
+
+    invalid_share = summary.invalid / n_paths
+    notes = [f"{n_paths:,} paths in chunks of {min(chunk_size, n_paths):,}; percentiles are histogram estimates."]
+    if summary.invalid:
+        notes.append(f"{summary.invalid:,} path(s) ({invalid_share:.1%}) with WACC ≤ g were excluded.")
+
+    return {
+        "tool": "simulate_dcf_monte_carlo",
+        "company": company,
+        "period": period,
+        "success": summary.count > 0,
+        "inputs": {
+            "free_cash_flow": float(free_cash_flow or 0.0),
+            "revenue": None if revenue is None else float(revenue),
+            "distributions": distributions,
+            "n_paths": n_paths,
+            "seed": seed,
+            "forecast_years": forecast_years,
+        },
+        "result": {
+            "mean": summary.mean,
+            "std": summary.std,
+            "min": summary.minimum if summary.count else None,
+            "max": summary.maximum if summary.count else None,
+            "percentiles": summary.percentiles(percentiles or DEFAULT_PERCENTILES),
+            "valid_paths": summary.count,
+            "invalid_paths": summary.invalid,
+            "histogram": summary.histogram(histogram_bins),
+        },
+        "confidence": 0.7 if invalid_share < 0.01 else 0.5,
+        "notes": "; ".join(notes),
+    }
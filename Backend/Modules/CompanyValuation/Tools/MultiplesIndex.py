@@ -0,0 +1,240 @@
+"""
+Pre-aggregated industry multiple statistics.
+
+The multiples tools used to download `industry_multiples` and take its first
+record whatever the company's sector. `MultiplesIndex` aggregates the table
+into median, mean and quartiles of EV/EBITDA, P/E and EV/Sales per segment:
+
+    (industry, region, size bucket) -> (industry, region) -> (industry) -> all
+
+Every row contributes to each level of its hierarchy, so `lookup` is a few
+dict probes: for each multiple it returns the most specific segment that has
+data for it.
+
+`update()` is incremental: rows are diffed by record id and content, and only
+the segments whose members changed are re-aggregated. `get_multiples_index`
+applies the diff whenever the table version changes (on live Airtable, after
+COMPANY_VALUATION_CACHE_TTL seconds).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from .CompanyValuationDB import cache_is_current, get_industry_multiples, table_version
+    from .RecordStore import FinancialRecord, normalize_fields, normalize_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.CompanyValuationDB import cache_is_current, get_industry_multiples, table_version  # type: ignore
+    from ..Tools.RecordStore import FinancialRecord, normalize_fields, normalize_key  # type: ignore
+
+# Canonical multiple -> field aliases, in priority order
+MULTIPLE_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "ev_ebitda": ("ev_ebitda", "ev_ebitda_multiple", "ebitda_multiple"),
+    "pe": ("pe", "pe_multiple", "p_e"),
+    "ev_sales": ("ev_sales", "ev_sales_multiple", "revenue_multiple"),
+}
+
+# Market cap upper bounds of the size buckets
+SIZE_BUCKETS: Tuple[Tuple[str, float], ...] = (
+    ("small", 2e9),
+    ("mid", 10e9),
+    ("large", float("inf")),
+)
+
+ANY = ""  # wildcard component of a segment key
+
+Segment = Tuple[str, str, str]
+
+
+def size_bucket(market_cap: Optional[float]) -> str:
+    """Size bucket for a market cap ("" when unknown)."""
+    if market_cap is None or not market_cap > 0:
+        return ANY
+    for name, upper in SIZE_BUCKETS:
+        if market_cap < upper:
+            return name
+    return SIZE_BUCKETS[-1][0]
+
+
+def segment_of(fields: Mapping[str, Any], market_cap: Optional[float] = None) -> Segment:
+    """(industry, region, size bucket) of a normalized multiples or statement row.
+
+    The size bucket comes from a `size_bucket`/`size` field, else from `market_cap`.
+    """
+    industry = normalize_key(fields.get("industry") or fields.get("sector"))
+    region = normalize_key(fields.get("region"))
+    bucket = normalize_key(fields.get("size_bucket") or fields.get("size")) or size_bucket(market_cap)
+    return (industry, region, bucket)
+
+
+def record_segment(record: Optional[FinancialRecord]) -> Segment:
+    """Segment of a statement record (the all-industries segment for None)."""
+    if record is None:
+        return (ANY, ANY, ANY)
+    market_cap = None
+    if record.share_price is not None and record.shares_outstanding is not None:
+        market_cap = record.share_price * record.shares_outstanding
+    return segment_of(record.fields, market_cap)
+
+
+def _levels(segment: Segment) -> List[Segment]:
+    """Segments a row aggregates into, most specific first."""
+    industry, region, bucket = segment
+    levels: List[Segment] = []
+    if industry and region and bucket:
+        levels.append((industry, region, bucket))
+    if industry and region:
+        levels.append((industry, region, ANY))
+    if industry:
+        levels.append((industry, ANY, ANY))
+    levels.append((ANY, ANY, ANY))
+    return levels
+
+
+def _row_values(fields: Mapping[str, Any]) -> Tuple[Optional[float], ...]:
+    values = []
+    for aliases in MULTIPLE_ALIASES.values():
+        value = None
+        for alias in aliases:
+            candidate = fields.get(alias)
+            if isinstance(candidate, (int, float)) and not isinstance(candidate, bool):
+                value = float(candidate)
+                break
+        values.append(value)
+    return tuple(values)
+
+
+def _describe(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    array = np.asarray(values, dtype=float)
+    q1, median, q3 = np.percentile(array, [25, 50, 75])
+    return {
+        "median": float(median),
+        "mean": float(array.mean()),
+        "q1": float(q1),
+        "q3": float(q3),
+        "count": int(array.size),
+    }
+
+
+class MultiplesIndex:
+    """Segment -> multiple statistics, maintained incrementally."""
+
+    def __init__(self, records: Optional[Iterable[Mapping[str, Any]]] = None):
+        # record key -> (segment, values)
+        self._rows: Dict[str, Tuple[Segment, Tuple[Optional[float], ...]]] = {}
+        # segment -> member record keys
+        self._members: Dict[Segment, Set[str]] = {}
+        # segment -> multiple -> stats
+        self.stats: Dict[Segment, Dict[str, Optional[Dict[str, float]]]] = {}
+        self.version: Any = None
+        self.fetched_at = 0.0
+        self.last_update: Dict[str, int] = {}
+        if records is not None:
+            self.update(records)
+
+    def update(self, records: Iterable[Mapping[str, Any]]) -> Dict[str, int]:
+        """Sync with the full table; re-aggregates only segments whose rows changed."""
+        incoming: Dict[str, Tuple[Segment, Tuple[Optional[float], ...]]] = {}
+        for position, record in enumerate(records):
+            fields = normalize_fields(record)
+            key = str(record.get("id") or f"#{position}") if isinstance(record, Mapping) else f"#{position}"
+            incoming[key] = (segment_of(fields), _row_values(fields))
+
+        dirty: Set[Segment] = set()
+        removed = [key for key in self._rows if key not in incoming]
+        changed = [key for key, row in incoming.items() if self._rows.get(key) != row]
+        for key in removed + changed:
+            old = self._rows.pop(key, None)
+            if old is not None:
+                for level in _levels(old[0]):
+                    self._members[level].discard(key)
+                    dirty.add(level)
+        for key in changed:
+            row = incoming[key]
+            self._rows[key] = row
+            for level in _levels(row[0]):
+                self._members.setdefault(level, set()).add(key)
+                dirty.add(level)
+
+        for segment in dirty:
+            members = self._members.get(segment)
+            if not members:
+                self._members.pop(segment, None)
+                self.stats.pop(segment, None)
+                continue
+            rows = [self._rows[key][1] for key in members]
+            self.stats[segment] = {
+                name: _describe([row[i] for row in rows if row[i] is not None])
+                for i, name in enumerate(MULTIPLE_ALIASES)
+            }
+
+        self.last_update = {
+            "rows": len(self._rows),
+            "changed_rows": len(changed),
+            "removed_rows": len(removed),
+            "segments_recomputed": len(dirty),
+            "segments": len(self.stats),
+        }
+        return self.last_update
+
+    def lookup(
+        self,
+        industry: Optional[str] = None,
+        region: Optional[str] = None,
+        size: Optional[str] = None,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Statistics per multiple from the most specific segment with data.
+
+        Each entry carries its "segment" (industry, region, size bucket) so
+        callers can report what the multiple is based on.
+        """
+        levels = _levels((normalize_key(industry), normalize_key(region), normalize_key(size)))
+        out: Dict[str, Optional[Dict[str, Any]]] = {}
+        # The shared index is updated in place by get_multiples_index
+        with _lock:
+            for name in MULTIPLE_ALIASES:
+                out[name] = None
+                for level in levels:
+                    stats = self.stats.get(level, {}).get(name)
+                    if stats is not None:
+                        out[name] = {**stats, "segment": level}
+                        break
+        return out
+
+    def segments(self) -> List[Segment]:
+        with _lock:
+            return sorted(self.stats)
+
+
+# -------------------------------
+# Cached index
+# -------------------------------
+
+_index = MultiplesIndex()
+_lock = threading.Lock()
+
+
+def get_multiples_index() -> MultiplesIndex:
+    """Index over `get_industry_multiples()`, updated incrementally when the table changes.
+
+    On live Airtable (no table version) the index is reused for
+    COMPANY_VALUATION_CACHE_TTL seconds.
+    """
+    version = table_version("industry_multiples")
+    with _lock:
+        if _index.fetched_at and cache_is_current(_index.version, version, _index.fetched_at):
+            return _index
+    fetched_at = time.monotonic()
+    records = get_industry_multiples()
+    with _lock:
+        _index.update(records)
+        _index.version = version
+        _index.fetched_at = fetched_at
+        return _index
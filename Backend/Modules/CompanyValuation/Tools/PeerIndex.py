@@ -0,0 +1,403 @@
+"""
+Nearest-neighbour peer selection over company financial profiles.
+
+The agent used to find "5–10 similar companies" with ExaTools web searches:
+several round trips per report and different answers each time. `PeerIndex`
+builds one profile per company from the latest period of the statement
+tables and the company registries:
+
+    sector / region (one-hot) | log size | EBITDA margin | net margin
+    revenue growth | leverage (liabilities / assets)
+
+Numeric features are robust-scaled (median / IQR, clipped) and missing values
+sit at the median, so every company gets a vector. The vectors go into a
+`scipy.spatial.cKDTree`; a peer query is one tree lookup.
+
+Each profile also carries the company's own observed multiples (EV/EBITDA,
+P/E, EV/Sales from market cap, debt and cash), so a query returns the
+multiples its peers imply. `get_peer_index` rebuilds the index when any
+source table changes (for unversioned live Airtable tables, once per
+COMPANY_VALUATION_CACHE_TTL seconds or on `refresh`).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+try:
+    from .Calculations import calculate_comparable_multiples
+    from .CompanyValuationDB import (
+        get_balance_sheets,
+        get_companies,
+        get_companiesV2,
+        get_financial_statements,
+        get_income_statements,
+        get_valuation_metrics,
+        cache_is_current,
+        table_version,
+    )
+    from .MultiplesIndex import size_bucket
+    from .RecordStore import FinancialRecord, normalize_fields, normalize_key, period_sort_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.Calculations import calculate_comparable_multiples  # type: ignore
+    from ..Tools.CompanyValuationDB import (  # type: ignore
+        get_balance_sheets,
+        get_companies,
+        get_companiesV2,
+        get_financial_statements,
+        get_income_statements,
+        get_valuation_metrics,
+        cache_is_current,
+        table_version,
+    )
+    from ..Tools.MultiplesIndex import size_bucket  # type: ignore
+    from ..Tools.RecordStore import FinancialRecord, normalize_fields, normalize_key, period_sort_key  # type: ignore
+
+SOURCE_TABLES = (
+    "financial_statements",
+    "income_statements",
+    "balance_sheets",
+    "valuation_metrics",
+    "companies",
+    "companiesV2",
+)
+
+NUMERIC_FEATURES = ("log_size", "ebitda_margin", "net_margin", "revenue_growth", "leverage")
+
+# Relative weight of each block in the distance. A sector mismatch costs
+# about as much as two IQRs on one numeric feature, so peers come from the
+# same sector unless it has too few members.
+FEATURE_WEIGHTS: Dict[str, float] = {
+    "sector": 2.0,
+    "region": 0.5,
+    "log_size": 1.0,
+    "ebitda_margin": 1.0,
+    "net_margin": 0.5,
+    "revenue_growth": 0.5,
+    "leverage": 0.5,
+}
+CLIP = 4.0  # robust z-scores are clipped to ±CLIP so outliers do not dominate
+
+PEER_MULTIPLES = ("ev_ebitda", "pe", "ev_sales")
+DEFAULT_PEERS = 8
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    return None
+
+
+def _ratio(numerator: Optional[float], denominator: Optional[float]) -> Optional[float]:
+    if numerator is None or not denominator:
+        return None
+    return numerator / denominator
+
+
+def _latest_two(records: Iterable[Mapping[str, Any]]) -> Dict[str, Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Company key -> (latest, previous) normalized fields, by period order."""
+    by_company: Dict[str, List[Tuple[Any, int, Dict[str, Any]]]] = {}
+    for position, record in enumerate(records):
+        fields = normalize_fields(record)
+        company = normalize_key(fields.get("company") or fields.get("company_name") or fields.get("name"))
+        if company:
+            sort_key = period_sort_key(normalize_key(fields.get("period")))
+            by_company.setdefault(company, []).append((sort_key or (-1, -1), position, fields))
+    out = {}
+    for company, rows in by_company.items():
+        rows.sort(key=lambda row: (row[0], row[1]))
+        out[company] = (rows[-1][2], rows[-2][2] if len(rows) > 1 else None)
+    return out
+
+
+def _registry(records: Iterable[Mapping[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Company key -> registry fields (companies / companiesV2)."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        fields = normalize_fields(record)
+        name = fields.get("company_name") or fields.get("name") or fields.get("company")
+        if name:
+            out.setdefault(normalize_key(name), {**fields, "display_name": str(name)})
+    return out
+
+
+def build_profiles(tables: Mapping[str, Iterable[Mapping[str, Any]]]) -> List[Dict[str, Any]]:
+    """One profile (labels, raw features, observed multiples) per company.
+
+    `tables` maps the `SOURCE_TABLES` names to Airtable-like records; missing
+    tables are treated as empty.
+    """
+    statements = _latest_two(tables.get("financial_statements") or [])
+    income = _latest_two(tables.get("income_statements") or [])
+    balance = _latest_two(tables.get("balance_sheets") or [])
+    metrics = _latest_two(tables.get("valuation_metrics") or [])
+    registry = _registry(tables.get("companiesV2") or [])
+    for key, fields in _registry(tables.get("companies") or []).items():
+        registry.setdefault(key, fields)
+
+    profiles = []
+    for key in dict.fromkeys([*statements, *income, *balance]):
+        latest: Dict[str, Any] = {}
+        previous: Dict[str, Any] = {}
+        # Earlier sources win: the consolidated statements, then the V2 tables
+        for source in (statements, income, balance, metrics):
+            current, prior = source.get(key, ({}, None))
+            for name, value in current.items():
+                latest.setdefault(name, value)
+            for name, value in (prior or {}).items():
+                previous.setdefault(name, value)
+        record = FinancialRecord(latest)
+        info = registry.get(key, {})
+
+        revenue, ebitda, net_income = record.revenue, record.ebitda, record.net_income
+        total_assets, total_liabilities = record.total_assets, record.total_liabilities
+        market_cap = _number(latest.get("market_cap"))
+        if market_cap is None and record.share_price and record.shares_outstanding:
+            market_cap = record.share_price * record.shares_outstanding
+        enterprise_value = _number(latest.get("enterprise_value"))
+        if enterprise_value is None and market_cap is not None:
+            debt = _number(latest.get("total_debt"))
+            if debt is None:
+                debt = total_liabilities or 0.0
+            enterprise_value = market_cap + debt - (_number(latest.get("cash")) or 0.0)
+        previous_revenue = FinancialRecord(previous).revenue if previous else None
+
+        size = market_cap if market_cap and market_cap > 0 else revenue
+        multiples = {
+            "ev_ebitda": _ratio(enterprise_value, ebitda) if ebitda and ebitda > 0 else None,
+            "pe": _ratio(market_cap, net_income) if net_income and net_income > 0 else None,
+            "ev_sales": _ratio(enterprise_value, revenue) if revenue and revenue > 0 else None,
+        }
+        profiles.append({
+            "key": key,
+            "company": info.get("display_name") or latest.get("company") or key,
+            "period": latest.get("period"),
+            "ticker": info.get("ticker") or info.get("symbol"),
+            "sector": normalize_key(latest.get("industry") or latest.get("sector") or info.get("sector") or info.get("industry")),
+            "region": normalize_key(latest.get("region") or latest.get("country") or info.get("country") or info.get("region")),
+            "size_bucket": size_bucket(market_cap),
+            "market_cap": market_cap,
+            "features": {
+                "log_size": math.log10(size) if size and size > 0 else None,
+                "ebitda_margin": _ratio(ebitda, revenue) if revenue and revenue > 0 else None,
+                "net_margin": _ratio(net_income, revenue) if revenue and revenue > 0 else None,
+                "revenue_growth": _ratio(revenue, previous_revenue) - 1.0
+                if revenue is not None and previous_revenue and previous_revenue > 0 else None,
+                "leverage": _ratio(total_liabilities, total_assets) if total_assets and total_assets > 0 else None,
+            },
+            "multiples": {name: value for name, value in multiples.items() if value is not None and value > 0},
+        })
+    return profiles
+
+
+class PeerIndex:
+    """KD-tree over normalized company profiles."""
+
+    def __init__(self, profiles: List[Dict[str, Any]], weights: Optional[Mapping[str, float]] = None):
+        self.profiles = profiles
+        self.weights = {**FEATURE_WEIGHTS, **(weights or {})}
+        self.position = {profile["key"]: i for i, profile in enumerate(profiles)}
+        self.sectors = sorted({p["sector"] for p in profiles if p["sector"]})
+        self.regions = sorted({p["region"] for p in profiles if p["region"]})
+        self.version: Any = None
+        self.fetched_at = 0.0
+
+        raw = np.array(
+            [[np.nan if p["features"][name] is None else p["features"][name] for name in NUMERIC_FEATURES]
+             for p in profiles],
+            dtype=float,
+        ).reshape(len(profiles), len(NUMERIC_FEATURES))
+        with np.errstate(all="ignore"):
+            self.center = np.nanmedian(raw, axis=0) if len(profiles) else np.zeros(len(NUMERIC_FEATURES))
+            q1, q3 = (np.nanpercentile(raw, [25, 75], axis=0) if len(profiles)
+                      else (np.zeros(len(NUMERIC_FEATURES)),) * 2)
+        self.center = np.nan_to_num(self.center)
+        self.scale = np.where(np.isfinite(q3 - q1) & (q3 - q1 > 0), q3 - q1, 1.0)
+        self.vectors = self._encode(raw, [p["sector"] for p in profiles], [p["region"] for p in profiles])
+        self.tree = cKDTree(self.vectors) if len(profiles) else None
+
+    def _encode(self, raw: np.ndarray, sectors: List[str], regions: List[str]) -> np.ndarray:
+        scaled = np.clip((raw - self.center) / self.scale, -CLIP, CLIP)
+        scaled = np.nan_to_num(scaled, nan=0.0) * np.array([self.weights[name] for name in NUMERIC_FEATURES])
+        blocks = [scaled]
+        for labels, vocabulary, weight in (
+            (sectors, self.sectors, self.weights["sector"]),
+            (regions, self.regions, self.weights["region"]),
+        ):
+            onehot = np.zeros((len(labels), len(vocabulary)))
+            lookup = {label: i for i, label in enumerate(vocabulary)}
+            for row, label in enumerate(labels):
+                if label in lookup:
+                    onehot[row, lookup[label]] = 1.0
+            # Scale so two different categories are `weight` apart
+            blocks.append(onehot * (weight / math.sqrt(2)))
+        return np.hstack(blocks)
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def query(
+        self,
+        company: str,
+        k: int = DEFAULT_PEERS,
+        same_sector: bool = False,
+    ) -> Optional[List[Tuple[Dict[str, Any], float]]]:
+        """The `k` nearest profiles to `company` (excluding itself) with their distances.
+
+        None when the company is not indexed.
+        """
+        target = self.position.get(normalize_key(company))
+        if target is None or self.tree is None:
+            return None
+        sector = self.profiles[target]["sector"]
+        # Over-fetch when filtering so the filter rarely leaves fewer than k
+        fetch = min(len(self.profiles), (k + 1) * (4 if same_sector else 1))
+        distances, positions = self.tree.query(self.vectors[target], k=fetch)
+        distances, positions = np.atleast_1d(distances), np.atleast_1d(positions)
+        peers = []
+        for distance, position in zip(distances, positions):
+            profile = self.profiles[int(position)]
+            if int(position) == target or (same_sector and profile["sector"] != sector):
+                continue
+            peers.append((profile, float(distance)))
+            if len(peers) == k:
+                break
+        return peers
+
+
+# -------------------------------
+# Cached index
+# -------------------------------
+
+_index: Optional[PeerIndex] = None
+_lock = threading.Lock()
+
+_LOADERS = {
+    "financial_statements": get_financial_statements,
+    "income_statements": get_income_statements,
+    "balance_sheets": get_balance_sheets,
+    "valuation_metrics": get_valuation_metrics,
+    "companies": get_companies,
+    "companiesV2": get_companiesV2,
+}
+
+
+def get_peer_index(refresh: bool = False) -> PeerIndex:
+    """Index over the data store, rebuilt when any source table changes.
+
+    Tables without a version (live Airtable) are reused for
+    COMPANY_VALUATION_CACHE_TTL seconds; `refresh` rebuilds regardless.
+    """
+    global _index
+    version = tuple(table_version(name) for name in SOURCE_TABLES)
+    with _lock:
+        if not refresh and _index is not None and cache_is_current(_index.version, version, _index.fetched_at):
+            return _index
+    fetched_at = time.monotonic()
+    tables = {}
+    for name, load in _LOADERS.items():
+        try:
+            tables[name] = load()
+        except Exception:
+            tables[name] = []
+    index = PeerIndex(build_profiles(tables))
+    index.version = version
+    index.fetched_at = fetched_at
+    with _lock:
+        _index = index
+    return index
+
+
+def _median(values: List[float]) -> Optional[float]:
+    return float(np.median(values)) if values else None
+
+
+def find_peers(
+    company: str,
+    k: int = DEFAULT_PEERS,
+    same_sector: bool = False,
+    period: Optional[str] = None,
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Find the `k` most similar companies in the database and the multiples they imply.
+
+    Similarity is distance over sector, region, size, margins, growth and
+    leverage. Returns each peer's observed EV/EBITDA, P/E and EV/Sales, the
+    peer medians, and the company valued at those medians (via
+    `calculate_comparable_multiples`). `same_sector=True` keeps only peers
+    of the company's sector; `period`/`records` select the statement record
+    the implied values are computed from.
+    """
+    index = get_peer_index()
+    peers = index.query(company, k=max(1, int(k)), same_sector=same_sector)
+    if peers is None:
+        return {
+            "tool": "find_peers",
+            "company": company,
+            "success": False,
+            "message": f"'{company}' is not in the statement tables; use a web search for peers.",
+        }
+
+    target = index.profiles[index.position[normalize_key(company)]]
+    notes: List[str] = []
+    medians = {
+        name: _median([p["multiples"][name] for p, _ in peers if name in p["multiples"]])
+        for name in PEER_MULTIPLES
+    }
+    implied = None
+    peer_multiples = {name: value for name, value in medians.items() if value is not None}
+    if peer_multiples:
+        implied = calculate_comparable_multiples(
+            company=company, period=period, records=records, industry_multiples=peer_multiples,
+        )
+        if not implied.get("success"):
+            notes.append(implied.get("message", "Implied valuation unavailable."))
+            implied = None
+    else:
+        notes.append("Peers have no observed multiples (market cap missing).")
+    if len(peers) < k:
+        notes.append(f"Only {len(peers)} peer(s) found.")
+    notes.append(
+        f"Peers by distance over sector, region, size, margins, growth and leverage among {len(index)} companies."
+    )
+
+    return {
+        "tool": "find_peers",
+        "company": company,
+        "period": period,
+        "success": True,
+        "inputs": {"k": k, "same_sector": same_sector},
+        "result": {
+            "target": {
+                "company": target["company"],
+                "sector": target["sector"],
+                "region": target["region"],
+                "size_bucket": target["size_bucket"],
+                "features": target["features"],
+                "multiples": target["multiples"],
+            },
+            "peers": [
+                {
+                    "company": profile["company"],
+                    "ticker": profile["ticker"],
+                    "sector": profile["sector"],
+                    "region": profile["region"],
+                    "size_bucket": profile["size_bucket"],
+                    "distance": round(distance, 4),
+                    "similarity": round(1.0 / (1.0 + distance), 4),
+                    "multiples": profile["multiples"],
+                }
+                for profile, distance in peers
+            ],
+            "peer_multiples": medians,
+            "implied_valuation": implied["result"] if implied else None,
+        },
+        "confidence": round(min(0.85, 0.5 + 0.05 * len(peers)), 2),
+        "notes": "; ".join(notes),
+    }
@@ -0,0 +1,244 @@
+"""
+Indexed, pre-normalized store of financial statement records.
+
+`_select_record` used to scan every record and build a lowercased copy of its
+fields on each comparison. `StatementIndex` normalizes every record once and
+keeps two hash indexes:
+
+- (company, period) -> first record for that pair
+- company           -> record with the latest period for that company
+
+Lookups are O(1) and return the shared normalized field dicts; callers must
+treat them as read-only. `get_statement_index` rebuilds the index only when
+the underlying table is refreshed.
+
+Each record is also loaded into a `FinancialRecord`, a slotted view whose
+numeric attributes are resolved from their field aliases once at load time
+(`total_assets`/`assets`, `revenue`/`total_revenue`, ...), so calculators read
+plain attributes instead of probing alias keys on every call.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    from .CompanyValuationDB import cache_is_current, get_financial_statements, table_version
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.CompanyValuationDB import cache_is_current, get_financial_statements, table_version  # type: ignore
+
+
+_YEAR = re.compile(r"(19|20)\d{2}")
+_QUARTER = re.compile(r"(?<![a-z])q([1-4])(?!\d)|(?<!\d)([1-4])q(?![a-z])", re.IGNORECASE)
+_HALF = re.compile(r"(?<![a-z])[hs]([12])(?!\d)|(?<!\d)([12])[hs](?![a-z])", re.IGNORECASE)
+_ISO_MONTH = re.compile(r"(?:19|20)\d{2}-(\d{2})")
+
+
+def normalize_fields(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """Lowercased copy of an Airtable record's fields (plain dicts supported)."""
+    if not isinstance(record, Mapping):
+        return {}
+    fields = record["fields"] if isinstance(record.get("fields"), Mapping) else record
+    return {str(k).lower(): v for k, v in fields.items()}
+
+
+def normalize_key(value: Any) -> str:
+    return str(value if value is not None else "").strip().lower()
+
+
+def period_sort_key(period: Any) -> Optional[Tuple[int, int]]:
+    """Sortable (year, month-of-period-end) for labels like "2023", "Q3 2024",
+    "H1 2022" or "2024-06-30"; None when no year can be found."""
+    text = str(period or "")
+    year_match = _YEAR.search(text)
+    if not year_match:
+        return None
+    year = int(year_match.group(0))
+    quarter = _QUARTER.search(text)
+    if quarter:
+        return (year, int(quarter.group(1) or quarter.group(2)) * 3)
+    half = _HALF.search(text)
+    if half:
+        return (year, int(half.group(1) or half.group(2)) * 6)
+    month = _ISO_MONTH.search(text)
+    if month:
+        return (year, int(month.group(1)))
+    return (year, 12)
+
+
+# Canonical attribute -> field aliases, in priority order
+FINANCIAL_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "total_assets": ("total_assets", "assets"),
+    "total_liabilities": ("total_liabilities", "liabilities"),
+    "revenue": ("revenue", "total_revenue"),
+    "ebitda": ("ebitda", "operating_income"),
+    "net_income": ("net_income", "net_profit"),
+    "share_price": ("share_price", "price"),
+    "shares_outstanding": ("shares_outstanding", "shares"),
+    "free_cash_flow": ("free_cash_flow", "fcf"),
+    "operating_cash_flow": ("operating_cash_flow", "ocf"),
+    "capital_expenditures": ("capital_expenditures", "capex"),
+    "wacc": ("wacc", "discount_rate"),
+}
+
+
+class FinancialRecord:
+    """Alias-resolved view of one statement record.
+
+    Numeric attributes hold the first numeric alias value as a float, or None
+    when the record has none. `fields` keeps the normalized field dict for
+    anything else (e.g. liquidation asset categories).
+    """
+
+    __slots__ = ("company", "period", "fields", *FINANCIAL_ALIASES)
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+        self.company = fields.get("company")
+        self.period = fields.get("period")
+        for name, aliases in FINANCIAL_ALIASES.items():
+            value = None
+            for alias in aliases:
+                candidate = fields.get(alias)
+                if isinstance(candidate, (int, float)):
+                    value = float(candidate)
+                    break
+            setattr(self, name, value)
+
+    @classmethod
+    def from_record(cls, record: Any) -> "FinancialRecord":
+        """Build from an Airtable-like record or plain dict (records pass through)."""
+        if isinstance(record, cls):
+            return record
+        return cls(normalize_fields(record))
+
+    def cache_key(self) -> Dict[str, Any]:
+        return self.fields
+
+    def __repr__(self) -> str:
+        return f"FinancialRecord(company={self.company!r}, period={self.period!r})"
+
+
+class StatementIndex:
+    """Hash-indexed view over a list of financial statement records."""
+
+    __slots__ = ("records", "fields", "financial", "by_company_period", "latest_by_company", "version", "columns")
+
+    def __init__(self, records: Iterable[Any]):
+        self.records: List[Any] = list(records) if records is not None else []
+        self.financial: List[FinancialRecord] = [FinancialRecord.from_record(rec) for rec in self.records]
+        self.fields: List[Dict[str, Any]] = [rec.fields for rec in self.financial]
+        self.by_company_period: Dict[Tuple[str, str], int] = {}
+        self.latest_by_company: Dict[str, int] = {}
+        self.version: Any = None  # table version of store indexes (None when unknown)
+        self.columns: Optional[Dict[str, Any]] = None  # columnar view, see BatchValuation.index_columns
+
+        latest_keys: Dict[str, Optional[Tuple[int, int]]] = {}
+        for position, fields in enumerate(self.fields):
+            company = normalize_key(fields.get("company"))
+            period = normalize_key(fields.get("period"))
+            self.by_company_period.setdefault((company, period), position)
+
+            sort_key = period_sort_key(period)
+            if company not in self.latest_by_company:
+                self.latest_by_company[company] = position
+                latest_keys[company] = sort_key
+            elif sort_key is not None and (latest_keys[company] is None or sort_key > latest_keys[company]):
+                self.latest_by_company[company] = position
+                latest_keys[company] = sort_key
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def position(self, company: Optional[str] = None, period: Optional[str] = None) -> Optional[int]:
+        """Position of the selected record.
+
+        Preference order:
+        1) Matches both company and period (if provided)
+        2) Latest period for the company
+        3) First record
+        """
+        if not self.records:
+            return None
+        if company:
+            company_key = normalize_key(company)
+            if period:
+                found = self.by_company_period.get((company_key, normalize_key(period)))
+                if found is not None:
+                    return found
+            found = self.latest_by_company.get(company_key)
+            if found is not None:
+                return found
+        return 0
+
+    def lookup(self, company: Optional[str] = None, period: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Shared normalized fields of the selected record (do not mutate)."""
+        found = self.position(company, period)
+        return None if found is None else self.fields[found]
+
+    def lookup_record(self, company: Optional[str] = None, period: Optional[str] = None) -> Optional[FinancialRecord]:
+        """Alias-resolved `FinancialRecord` of the selected record."""
+        found = self.position(company, period)
+        return None if found is None else self.financial[found]
+
+    def record(self, company: Optional[str] = None, period: Optional[str] = None) -> Optional[Mapping[str, Any]]:
+        """Original (un-normalized) selected record."""
+        found = self.position(company, period)
+        return None if found is None else self.records[found]
+
+
+# -------------------------------
+# Cached indexes
+# -------------------------------
+
+_lock = threading.Lock()
+_store_index: Optional[Tuple[Any, float, StatementIndex]] = None
+_explicit_index: Optional[StatementIndex] = None
+
+
+def get_statement_index() -> StatementIndex:
+    """Index over `get_financial_statements()`, rebuilt once per data refresh.
+
+    On live Airtable (no table version) the index is reused for
+    COMPANY_VALUATION_CACHE_TTL seconds.
+    """
+    global _store_index
+    version = table_version("financial_statements")
+    with _lock:
+        cached = _store_index
+    if cached is not None and cache_is_current(cached[0], version, cached[1]):
+        return cached[2]
+    fetched_at = time.monotonic()
+    index = StatementIndex(get_financial_statements())
+    index.version = version
+    with _lock:
+        _store_index = (version, fetched_at, index)
+    return index
+
+
+def index_for(records: Optional[Iterable[Mapping[str, Any]]]) -> StatementIndex:
+    """Index for caller-supplied `records` (or the data store when None).
+
+    The index of the most recent caller-supplied list or tuple is reused
+    while a later list holds the same records: the check compares elements
+    (by identity first, so it is a C-speed pass over the list), which catches
+    appended, removed and replaced records without keeping a reference to
+    the caller's list. Records edited in place (e.g. `records[0]["fields"]`
+    mutated) are not detected; pass new record dicts instead.
+    """
+    global _explicit_index
+    if records is None:
+        return get_statement_index()
+    if isinstance(records, (list, tuple)):
+        with _lock:
+            cached = _explicit_index
+        if cached is not None and len(cached.records) == len(records) and cached.records == (records if isinstance(records, list) else list(records)):
+            return cached
+        index = StatementIndex(records)
+        with _lock:
+            _explicit_index = index
+        return index
+    return StatementIndex(records)
@@ -0,0 +1,409 @@
+"""
+Nightly revaluation of the coverage universe.
+
+Every company listed in `companies`/`companiesV2` is valued with all six
+methods through `triangulate_valuation`, so stored results are exactly what
+the agent tools would return. The job:
+
+- loads the statements and the industry multiples index once, then splits the
+  universe into partitions of `--partition-size` companies;
+- values partitions on a process pool (`--workers`), shipping each worker only
+  the statement records of its partition;
+- streams each finished partition to the sink: one Parquet part file per
+  partition (`--output DIR`) or an upsert into `valuation_metrics` on the
+  configured storage backend (`--sink store`);
+- records finished partitions in a checkpoint file after they are written,
+  so rerunning the same command after a crash resumes where it stopped; a
+  run that wrote every partition marks the checkpoint finished, and the next
+  run starts over;
+- reports rows (valuations) per second as it goes and at the end.
+
+    python -m Modules.CompanyValuation.Tools.Revaluation --output tmp/revaluation --workers 8
+    python -m Modules.CompanyValuation.Tools.Revaluation --sink store --all-periods
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from . import ValuationWriter
+from .Calculations import (
+    DEFAULT_COMPARABLE_MULTIPLES,
+    DEFAULT_EARNINGS_MULTIPLES,
+    _comparable_industry_multiples,
+    _earnings_industry_multiples,
+    triangulate_valuation,
+)
+from .CalculatorCache import calculator_cache
+from .CompanyValuationDB import get_backend, get_companies, get_companiesV2, get_financial_statements
+from .MultiplesIndex import MultiplesIndex, get_multiples_index, record_segment
+from .RecordStore import FinancialRecord, StatementIndex, normalize_fields, normalize_key
+from .ValuationWriter import KEY_FIELDS, MAX_BATCH_SIZE, VALUATION_METRICS_TABLE, valuation_to_fields
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION_SIZE = 500
+CHECKPOINT_NAME = "_checkpoint.json"
+COMPANY_NAME_FIELDS = ("company", "company_name", "name")
+
+ROW_COLUMNS = ("company", "company_key", "period", "method", "value", "confidence", "result", "inputs", "computed_at")
+
+
+# -------------------------------
+# Universe
+# -------------------------------
+
+def _company_name(record: Mapping[str, Any]) -> Optional[str]:
+    fields = normalize_fields(record)
+    for name in COMPANY_NAME_FIELDS:
+        value = fields.get(name)
+        if value:
+            return str(value).strip()
+    return None
+
+
+def load_universe(tables: Sequence[str] = ("companies", "companiesV2")) -> List[str]:
+    """Company names from the coverage tables, de-duplicated case-insensitively and sorted."""
+    getters = {"companies": get_companies, "companiesV2": get_companiesV2}
+    names: Dict[str, str] = {}
+    for table in tables:
+        for record in getters[table]():
+            name = _company_name(record)
+            if name:
+                names.setdefault(normalize_key(name), name)
+    return [names[key] for key in sorted(names)]
+
+
+def partition(companies: Sequence[str], size: int) -> List[List[str]]:
+    size = max(1, int(size))
+    return [list(companies[i:i + size]) for i in range(0, len(companies), size)]
+
+
+def universe_fingerprint(companies: Sequence[str], options: Mapping[str, Any]) -> str:
+    """Hash of the universe and run options; a checkpoint only applies to the same run."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"companies": list(companies), "options": dict(options)}, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+# -------------------------------
+# Worker
+# -------------------------------
+
+def _init_worker() -> None:
+    # Every (company, period) is valued once; caching would only cost memory.
+    # Rows reach the sink directly, so the tools' write-behind is switched off.
+    calculator_cache.maxsize = 0
+    ValuationWriter.PERSIST_VALUATIONS = False
+
+
+def _segment_multiples(record: FinancialRecord, index: Optional[MultiplesIndex]) -> Dict[str, float]:
+    if index is None:
+        return {**DEFAULT_COMPARABLE_MULTIPLES, **DEFAULT_EARNINGS_MULTIPLES}
+    segment = record_segment(record)
+    return {**_comparable_industry_multiples(segment, index), **_earnings_industry_multiples(segment, index)}
+
+
+def revalue_partition(task: Tuple[int, List[str], List[Mapping[str, Any]], Optional[MultiplesIndex], Dict[str, Any]]) -> Dict[str, Any]:
+    """Value one partition; returns its `valuation_metrics` rows and counters."""
+    partition_id, companies, records, multiples_index, options = task
+    all_periods = options.get("all_periods", False)
+    index = StatementIndex(records)
+    rows: List[Dict[str, Any]] = []
+    missing: List[str] = []
+    failed = 0
+
+    by_company: Dict[str, Dict[str, FinancialRecord]] = {}
+    if all_periods:
+        for record in index.financial:
+            periods = by_company.setdefault(normalize_key(record.company), {})
+            periods.setdefault(normalize_key(record.period), record)
+
+    for company in companies:
+        if all_periods:
+            targets = list(by_company.get(normalize_key(company), {}).values())
+        else:
+            latest = index.lookup_record(company) if normalize_key(company) in index.latest_by_company else None
+            targets = [latest] if latest is not None else []
+        if not targets:
+            missing.append(company)
+            continue
+        for record in targets:
+            payload = triangulate_valuation(
+                company=company,
+                period=record.period or None,
+                records=record,
+                industry_multiples=_segment_multiples(record, multiples_index),
+                wacc=options.get("wacc"),
+                terminal_growth_rate=options.get("terminal_growth_rate"),
+                forecast_years=options.get("forecast_years", 5),
+            )
+            if not payload.get("success"):
+                failed += 1
+                continue
+            for method_payload in payload["methods"].values():
+                row = valuation_to_fields(method_payload)
+                if row is not None:
+                    rows.append(row)
+            rows.append(valuation_to_fields(payload))
+
+    return {"partition": partition_id, "companies": len(companies), "rows": rows, "missing": missing, "failed": failed}
+
+
+# -------------------------------
+# Sinks
+# -------------------------------
+
+class ParquetSink:
+    """One `part-<partition>.parquet` file per partition, written atomically."""
+
+    def __init__(self, directory: str):
+        # Fail before any partition is valued, not when the first one is written
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ImportError("The parquet sink requires pyarrow (pip install pyarrow); use --sink store instead.")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, partition_id: int, rows: List[Mapping[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("company", pa.string()),
+            ("company_key", pa.string()),
+            ("period", pa.string()),
+            ("method", pa.string()),
+            ("value", pa.float64()),
+            ("confidence", pa.float64()),
+            ("result", pa.string()),
+            ("inputs", pa.string()),
+            ("computed_at", pa.string()),
+        ])
+        table = pa.Table.from_pylist([{name: row.get(name) for name in ROW_COLUMNS} for row in rows], schema=schema)
+        path = os.path.join(self.directory, f"part-{partition_id:05d}.parquet")
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def describe(self) -> str:
+        return f"parquet:{self.directory}"
+
+
+class StoreSink:
+    """Upserts rows into `valuation_metrics` on the configured storage backend."""
+
+    def __init__(self, backend: Any = None, table_name: str = VALUATION_METRICS_TABLE, batch_size: Optional[int] = None):
+        self.backend = backend or get_backend()
+        self.table_name = table_name
+        # Airtable accepts 10 records per request; local stores take large batches
+        self.batch_size = batch_size or (MAX_BATCH_SIZE if self.backend.name == "airtable" else 1000)
+
+    def write(self, partition_id: int, rows: List[Mapping[str, Any]]) -> None:
+        for start in range(0, len(rows), self.batch_size):
+            self.backend.upsert_records(self.table_name, list(rows[start:start + self.batch_size]), list(KEY_FIELDS))
+
+    def describe(self) -> str:
+        return f"store:{self.backend.name}/{self.table_name}"
+
+
+# -------------------------------
+# Checkpoint
+# -------------------------------
+
+class Checkpoint:
+    """Finished partitions of a run, persisted atomically as JSON."""
+
+    def __init__(self, path: str, fingerprint: str, restart: bool = False):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed: Set[int] = set()
+        self.rows = 0
+        if not restart and os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                state = json.load(handle)
+            if state.get("finished"):
+                # The previous run completed; this is a new run, not a resume
+                return
+            if state.get("fingerprint") != fingerprint:
+                raise RuntimeError(
+                    f"Checkpoint {path} belongs to a different universe or options; use --restart to start over."
+                )
+            self.completed = set(state.get("completed", []))
+            self.rows = int(state.get("rows", 0))
+
+    def mark(self, partition_id: int, rows: int) -> None:
+        self.completed.add(partition_id)
+        self.rows += rows
+        self._save(finished=False)
+
+    def finish(self) -> None:
+        """Record that every partition was written, so the next run starts over."""
+        self._save(finished=True)
+
+    def _save(self, finished: bool) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        state = {
+            "fingerprint": self.fingerprint,
+            "completed": sorted(self.completed),
+            "rows": self.rows,
+            "finished": finished,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(self.path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        os.replace(self.path + ".tmp", self.path)
+
+
+# -------------------------------
+# Job
+# -------------------------------
+
+def run_revaluation(
+    sink: Any,
+    checkpoint_path: str,
+    workers: int = 1,
+    partition_size: int = DEFAULT_PARTITION_SIZE,
+    all_periods: bool = False,
+    wacc: Optional[float] = None,
+    terminal_growth_rate: Optional[float] = None,
+    forecast_years: int = 5,
+    restart: bool = False,
+    companies: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Revalue the universe (or `companies`) into `sink`; returns run statistics."""
+    started = time.perf_counter()
+    universe = list(companies) if companies is not None else load_universe()
+    options = {
+        "all_periods": all_periods,
+        "wacc": wacc,
+        "terminal_growth_rate": terminal_growth_rate,
+        "forecast_years": forecast_years,
+        "partition_size": partition_size,
+    }
+    checkpoint = Checkpoint(checkpoint_path, universe_fingerprint(universe, options), restart=restart)
+    partitions = partition(universe, partition_size)
+    pending = [(pid, part) for pid, part in enumerate(partitions) if pid not in checkpoint.completed]
+
+    statements: Dict[str, List[Mapping[str, Any]]] = {}
+    for record in get_financial_statements():
+        name = _company_name(record)
+        if name:
+            statements.setdefault(normalize_key(name), []).append(record)
+    try:
+        multiples_index: Optional[MultiplesIndex] = get_multiples_index()
+    except Exception:
+        logger.warning("Industry multiples unavailable; using default multiples", exc_info=True)
+        multiples_index = None
+
+    def task(pid: int, part: List[str]) -> Tuple[Any, ...]:
+        records = [rec for company in part for rec in statements.get(normalize_key(company), [])]
+        return (pid, part, records, multiples_index, options)
+
+    stats = {"rows": 0, "companies": 0, "missing": 0, "failed": 0, "partitions": 0}
+    compute_started = time.perf_counter()
+
+    def finish(result: Dict[str, Any]) -> None:
+        sink.write(result["partition"], result["rows"])
+        checkpoint.mark(result["partition"], len(result["rows"]))
+        stats["rows"] += len(result["rows"])
+        stats["companies"] += result["companies"]
+        stats["missing"] += len(result["missing"])
+        stats["failed"] += result["failed"]
+        stats["partitions"] += 1
+        elapsed = time.perf_counter() - compute_started
+        logger.info(
+            "partition %d done (%d/%d): %d rows, %.0f rows/s",
+            result["partition"], stats["partitions"], len(pending), len(result["rows"]),
+            stats["rows"] / elapsed if elapsed > 0 else 0.0,
+        )
+
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            queue = iter(pending)
+            in_flight: Set[Future] = set()
+            # Keep a bounded number of partitions in flight so memory stays flat
+            for pid, part in queue:
+                in_flight.add(pool.submit(revalue_partition, task(pid, part)))
+                if len(in_flight) >= workers * 2:
+                    break
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future.result())
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        in_flight.add(pool.submit(revalue_partition, task(*next_item)))
+    else:
+        saved = (calculator_cache.maxsize, ValuationWriter.PERSIST_VALUATIONS)
+        _init_worker()
+        try:
+            for pid, part in pending:
+                finish(revalue_partition(task(pid, part)))
+        finally:
+            calculator_cache.maxsize, ValuationWriter.PERSIST_VALUATIONS = saved
+
+    checkpoint.finish()
+    compute_seconds = time.perf_counter() - compute_started
+    return {
+        "sink": sink.describe(),
+        "universe": len(universe),
+        "partitions_total": len(partitions),
+        "partitions_skipped": len(partitions) - len(pending),
+        **stats,
+        "total_rows_written": checkpoint.rows,
+        "seconds": round(time.perf_counter() - started, 3),
+        "rows_per_sec": round(stats["rows"] / compute_seconds, 1) if compute_seconds > 0 else None,
+        "companies_per_sec": round(stats["companies"] / compute_seconds, 1) if compute_seconds > 0 else None,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Revalue every covered company with all valuation methods.")
+    parser.add_argument("--sink", choices=("parquet", "store"), default="parquet")
+    parser.add_argument("--output", help="Directory for Parquet part files (parquet sink)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>/_checkpoint.json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--partition-size", type=int, default=DEFAULT_PARTITION_SIZE)
+    parser.add_argument("--all-periods", action="store_true", help="Value every period, not only the latest")
+    parser.add_argument("--wacc", type=float)
+    parser.add_argument("--terminal-growth", type=float)
+    parser.add_argument("--forecast-years", type=int, default=5)
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.sink == "parquet":
+        if not args.output:
+            parser.error("--output is required for the parquet sink")
+        sink: Any = ParquetSink(args.output)
+        checkpoint_path = args.checkpoint or os.path.join(args.output, CHECKPOINT_NAME)
+    else:
+        sink = StoreSink()
+        checkpoint_path = args.checkpoint or CHECKPOINT_NAME
+
+    summary = run_revaluation(
+        sink,
+        checkpoint_path,
+        workers=args.workers,
+        partition_size=args.partition_size,
+        all_periods=args.all_periods,
+        wacc=args.wacc,
+        terminal_growth_rate=args.terminal_growth,
+        forecast_years=args.forecast_years,
+        restart=args.restart,
+    )
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
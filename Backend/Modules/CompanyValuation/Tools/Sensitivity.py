@@ -0,0 +1,166 @@
+"""
+DCF sensitivity analysis.
+
+`calculate_dcf_sensitivity` evaluates `calculate_dcf`'s formula over a full
+FCF growth × WACC × terminal growth grid in one vectorized pass, so the agent
+gets every scenario cell from a single tool call. Cells where WACC ≤ g are
+flagged and left empty. The result carries one compact WACC × g table per FCF
+growth rate plus a Markdown rendering of each.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .BatchValuation import dcf_values
+    from .Calculations import DEFAULT_FCF_GROWTH, DEFAULT_TERMINAL_GROWTH, DEFAULT_WACC, _lookup_record
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.BatchValuation import dcf_values  # type: ignore
+    from ..Tools.Calculations import DEFAULT_FCF_GROWTH, DEFAULT_TERMINAL_GROWTH, DEFAULT_WACC, _lookup_record  # type: ignore
+
+# Default grid: base value ± steps
+WACC_STEP = 0.01
+TERMINAL_GROWTH_STEP = 0.005
+FCF_GROWTH_STEP = 0.02
+GRID_STEPS = 2  # points on each side of the base value
+
+MAX_GRID_CELLS = 100_000
+
+
+def _grid(values: Optional[Sequence[float]], base: float, step: float) -> np.ndarray:
+    if values:
+        return np.asarray(sorted({float(v) for v in values}), dtype=float)
+    return np.round(base + step * np.arange(-GRID_STEPS, GRID_STEPS + 1), 6)
+
+
+def _markdown_table(wacc: np.ndarray, growth: np.ndarray, values: np.ndarray) -> str:
+    header = "| WACC \\ g | " + " | ".join(f"{g:.2%}" for g in growth) + " |"
+    divider = "|" + "---|" * (len(growth) + 1)
+    rows = [
+        f"| {w:.2%} | " + " | ".join("n/a" if not np.isfinite(v) else f"{v:,.0f}" for v in row) + " |"
+        for w, row in zip(wacc, values)
+    ]
+    return "\n".join([header, divider, *rows])
+
+
+def _cells(values: np.ndarray) -> List[List[Optional[float]]]:
+    return [[round(float(v), 2) if np.isfinite(v) else None for v in row] for row in values]
+
+
+def calculate_dcf_sensitivity(
+    company: Optional[str] = None,
+    period: Optional[str] = None,
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+    free_cash_flow: Optional[float] = None,
+    wacc: Optional[float] = None,
+    terminal_growth_rate: Optional[float] = None,
+    fcf_growth_rate: Optional[float] = None,
+    wacc_values: Optional[List[float]] = None,
+    terminal_growth_values: Optional[List[float]] = None,
+    fcf_growth_values: Optional[List[float]] = None,
+    forecast_years: int = 5,
+) -> Dict[str, Any]:
+    """DCF value for every FCF growth × WACC × terminal growth combination.
+
+    Uses the `calculate_dcf` formula with FCF_t = FCF_0 × (1+growth)^(t-1).
+    Grids default to the base value ± 2 steps (WACC 1%, g 0.5%, FCF growth 2%);
+    base FCF and WACC come from the statement record when not provided.
+    """
+    if free_cash_flow is None or wacc is None:
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
+            return {
+                "tool": "calculate_dcf_sensitivity",
+                "company": company,
+                "period": period,
+                "success": False,
+                "message": "No financial statement records available.",
+            }
+        if free_cash_flow is None:
+            free_cash_flow = record.free_cash_flow or 0.0
+            if free_cash_flow == 0:
+                free_cash_flow = (record.operating_cash_flow or 0.0) - (record.capital_expenditures or 0.0)
+        if wacc is None:
+            wacc = record.wacc if record.wacc is not None else DEFAULT_WACC
+
+    if not free_cash_flow:
+        return {
+            "tool": "calculate_dcf_sensitivity",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": "No free cash flow data available.",
+        }
+
+    terminal_growth_rate = DEFAULT_TERMINAL_GROWTH if terminal_growth_rate is None else terminal_growth_rate
+    fcf_growth_rate = DEFAULT_FCF_GROWTH if fcf_growth_rate is None else fcf_growth_rate
+    wacc_grid = _grid(wacc_values, float(wacc), WACC_STEP)
+    growth_grid = _grid(terminal_growth_values, float(terminal_growth_rate), TERMINAL_GROWTH_STEP)
+    fcf_growth_grid = _grid(fcf_growth_values, float(fcf_growth_rate), FCF_GROWTH_STEP)
+
+    n_cells = len(wacc_grid) * len(growth_grid) * len(fcf_growth_grid)
+    if n_cells > MAX_GRID_CELLS:
+        return {
+            "tool": "calculate_dcf_sensitivity",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": f"Grid has {n_cells} cells; the limit is {MAX_GRID_CELLS}.",
+        }
+
+    # Axes: (fcf growth, wacc, terminal growth[, year])
+    years = np.arange(forecast_years, dtype=float)
+    flows = float(free_cash_flow) * (1.0 + fcf_growth_grid)[:, None, None, None] ** years
+    cube = dcf_values(flows, wacc_grid[None, :, None], growth_grid[None, None, :])["dcf_value"]
+    invalid = np.broadcast_to(wacc_grid[:, None] <= growth_grid[None, :], cube.shape)
+    cube = np.where(invalid, np.nan, cube)
+
+    base_value = dcf_values(
+        float(free_cash_flow) * (1.0 + float(fcf_growth_rate)) ** years,
+        np.asarray(float(wacc)),
+        np.asarray(float(terminal_growth_rate)),
+    )["dcf_value"]
+    valid_values = cube[np.isfinite(cube)]
+
+    tables = [
+        {
+            "fcf_growth": float(fg),
+            "wacc": wacc_grid.tolist(),
+            "terminal_growth": growth_grid.tolist(),
+            "values": _cells(cube[i]),
+            "markdown": _markdown_table(wacc_grid, growth_grid, cube[i]),
+        }
+        for i, fg in enumerate(fcf_growth_grid)
+    ]
+
+    notes = ["Rows are WACC, columns are terminal growth; one table per FCF growth rate."]
+    invalid_cells = int(invalid.sum())
+    if invalid_cells:
+        notes.append(f"{invalid_cells} cell(s) with WACC ≤ g are not valued (n/a).")
+
+    return {
+        "tool": "calculate_dcf_sensitivity",
+        "company": company,
+        "period": period,
+        "success": bool(valid_values.size),
+        "inputs": {
+            "free_cash_flow": float(free_cash_flow),
+            "wacc": float(wacc),
+            "terminal_growth_rate": float(terminal_growth_rate),
+            "fcf_growth_rate": float(fcf_growth_rate),
+            "forecast_years": forecast_years,
+        },
+        "result": {
+            "base_value": float(base_value) if np.isfinite(base_value) else None,
+            "min_value": float(valid_values.min()) if valid_values.size else None,
+            "max_value": float(valid_values.max()) if valid_values.size else None,
+            "cells": n_cells,
+            "invalid_cells": invalid_cells,
+            "tables": tables,
+        },
+        "confidence": 0.8 if float(wacc) > float(terminal_growth_rate) else 0.4,
+        "notes": "; ".join(notes),
+    }
@@ -0,0 +1,286 @@
+"""
+Storage backends behind the `get_*` helpers of `CompanyValuationDB`.
+
+Every backend returns records in Airtable format (`id`, `createdTime`,
+`fields`), so the calculators work unchanged whichever one is configured:
+
+- `AirtableBackend`: live Airtable reads through the shared rate-limited client,
+  optionally served from the local SQLite replica.
+- `SQLiteBackend`: a standalone SQLite store (same schema as the replica),
+  e.g. populated with synthetic data for offline runs.
+- `ParquetFixtureBackend`: one `<table>.parquet` file per table in a directory,
+  read with DuckDB. Columns map to fields; optional `id` / `createdTime`
+  columns are used as record metadata.
+
+The backend is selected with `COMPANY_VALUATION_BACKEND` (see
+`CompanyValuationDB.get_backend`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .AirtableClient import get_api
+from .LocalReplica import AirtableReplica
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    """Source of valuation tables."""
+
+    name = "base"
+
+    @abstractmethod
+    def fetch_table(self, table_name: str) -> List[Dict[str, Any]]:
+        """Return every record of `table_name` in Airtable format."""
+
+    def table_version(self, table_name: str) -> Optional[Any]:
+        """Token that changes whenever `table_name` changes (None = unknown)."""
+        return None
+
+    async def afetch_table(self, table_name: str) -> List[Dict[str, Any]]:
+        """Async variant of `fetch_table`; runs in a worker thread by default."""
+        return await asyncio.to_thread(self.fetch_table, table_name)
+
+    def upsert_records(
+        self,
+        table_name: str,
+        rows: List[Mapping[str, Any]],
+        key_fields: List[str],
+    ) -> Dict[str, int]:
+        """Insert or update `rows` (field dicts) matched on `key_fields`."""
+        raise NotImplementedError(f"{self.name} backend is read-only.")
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+# -------------------------------
+# Airtable
+# -------------------------------
+
+class AirtableBackend(StorageBackend):
+    """Live Airtable base, optionally mirrored by a local replica."""
+
+    name = "airtable"
+
+    def __init__(
+        self,
+        token: Optional[str],
+        base_id: Optional[str],
+        endpoint_url: Optional[str] = None,
+        replica_path: Optional[str] = None,
+        replica_max_age: float = 0.0,
+    ):
+        self.token = token
+        self.base_id = base_id
+        self.endpoint_url = endpoint_url
+        self.replica_path = replica_path
+        self.replica_max_age = replica_max_age
+        self._tables: Dict[str, Any] = {}
+        self._replica: Optional[AirtableReplica] = None
+
+    def table(self, table_name: str) -> Any:
+        """pyairtable Table for `table_name`, connecting lazily."""
+        table = self._tables.get(table_name)
+        if table is None:
+            if not self.base_id:
+                raise RuntimeError("AIRTABLE_BASE_ID is not set; cannot reach Airtable.")
+            table = self._tables[table_name] = get_api(self.token, self.endpoint_url).table(self.base_id, table_name)
+        return table
+
+    @property
+    def replica(self) -> Optional[AirtableReplica]:
+        if self._replica is None and self.replica_path:
+            self._replica = AirtableReplica(self.replica_path)
+        return self._replica
+
+    def refresh_replica_table(self, table_name: str) -> None:
+        """Sync `table_name` into the replica if it was never synced or is too old."""
+        replica = self.replica
+        age = replica.table_age(table_name)
+        if age is None:
+            replica.sync_table(table_name, self.table(table_name))
+        elif self.replica_max_age and age.total_seconds() > self.replica_max_age:
+            try:
+                replica.sync_table(table_name, self.table(table_name))
+            except Exception:
+                # Serve the stale copy rather than failing the tool call
+                logger.warning("Replica refresh of %s failed; serving stale copy", table_name, exc_info=True)
+
+    def fetch_table(self, table_name: str) -> List[Dict[str, Any]]:
+        if self.replica is None:
+            return self.table(table_name).all()
+        self.refresh_replica_table(table_name)
+        return self.replica.read_table(table_name)
+
+    def table_version(self, table_name: str) -> Optional[Any]:
+        # Live reads cannot tell whether data changed; only the replica can.
+        if self.replica is None:
+            return None
+        self.refresh_replica_table(table_name)
+        return self.replica.sync_state(table_name)["generation"]
+
+    async def afetch_table(self, table_name: str) -> List[Dict[str, Any]]:
+        # Pages of one table are chained by Airtable's `offset`, so they are
+        # fetched in order; each page request runs in a worker thread on the
+        # shared session so the per-base token bucket still applies.
+        if self.replica is not None:
+            return await asyncio.to_thread(self.fetch_table, table_name)
+
+        pages = self.table(table_name).iterate()
+        records: List[Dict[str, Any]] = []
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return records
+            records.extend(page)
+
+    def upsert_records(
+        self,
+        table_name: str,
+        rows: List[Mapping[str, Any]],
+        key_fields: List[str],
+    ) -> Dict[str, int]:
+        # Callers batch rows to Airtable's 10-record limit; pyairtable would
+        # otherwise split larger lists into several requests.
+        result = self.table(table_name).batch_upsert(
+            [{"fields": dict(row)} for row in rows],
+            key_fields=list(key_fields),
+            typecast=True,
+        )
+        return {
+            "created": len(result.get("createdRecords", [])),
+            "updated": len(result.get("updatedRecords", [])),
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "base_id": self.base_id, "replica_path": self.replica_path}
+
+
+# -------------------------------
+# SQLite
+# -------------------------------
+
+class SQLiteBackend(StorageBackend):
+    """Standalone SQLite store using the replica schema."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        if not path:
+            raise ValueError("SQLite backend requires COMPANY_VALUATION_SQLITE_PATH.")
+        self.path = path
+        self.store = AirtableReplica(path)
+
+    def fetch_table(self, table_name: str) -> List[Dict[str, Any]]:
+        return self.store.read_table(table_name)
+
+    def table_version(self, table_name: str) -> Optional[Any]:
+        state = self.store.sync_state(table_name)
+        return state["generation"] if state else 0
+
+    def upsert_records(
+        self,
+        table_name: str,
+        rows: List[Mapping[str, Any]],
+        key_fields: List[str],
+    ) -> Dict[str, int]:
+        return self.store.upsert_fields(table_name, rows, key_fields)
+
+    def load_tables(self, tables: Mapping[str, List[Mapping[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Replace the given tables with the provided records."""
+        return {name: self.store.load_records(name, records) for name, records in tables.items()}
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "path": self.path}
+
+
+# -------------------------------
+# Parquet fixtures
+# -------------------------------
+
+class ParquetFixtureBackend(StorageBackend):
+    """Read-only tables from `<directory>/<table>.parquet` files."""
+
+    name = "parquet"
+
+    def __init__(self, directory: str):
+        if not directory:
+            raise ValueError("Parquet backend requires COMPANY_VALUATION_PARQUET_DIR.")
+        self.directory = Path(directory)
+        self._cache: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
+
+    def _path(self, table_name: str) -> Path:
+        return self.directory / f"{table_name}.parquet"
+
+    def table_version(self, table_name: str) -> Optional[Any]:
+        path = self._path(table_name)
+        return path.stat().st_mtime_ns if path.exists() else 0
+
+    def fetch_table(self, table_name: str) -> List[Dict[str, Any]]:
+        path = self._path(table_name)
+        if not path.exists():
+            return []
+        version = path.stat().st_mtime_ns
+        cached = self._cache.get(table_name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        import duckdb
+
+        with duckdb.connect() as conn:
+            cursor = conn.execute("SELECT * FROM read_parquet(?)", [str(path)])
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+        records = [_row_to_record(table_name, position, columns, row) for position, row in enumerate(rows)]
+        self._cache[table_name] = (version, records)
+        return records
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "directory": str(self.directory)}
+
+
+def _row_to_record(table_name: str, position: int, columns: List[str], row: Tuple[Any, ...]) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {}
+    record_id = None
+    created_time = None
+    for column, value in zip(columns, row):
+        if column == "id":
+            record_id = value
+        elif column == "createdTime":
+            created_time = value
+        elif value is not None:
+            fields[column] = value
+    return {
+        "id": record_id or f"{table_name}_{position}",
+        "createdTime": created_time,
+        "fields": fields,
+    }
+
+
+def write_parquet_fixtures(tables: Mapping[str, Iterable[Mapping[str, Any]]], directory: str) -> Dict[str, int]:
+    """Write `{table_name: records}` as Parquet fixtures readable by `ParquetFixtureBackend`."""
+    import duckdb
+    import pandas as pd
+
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    written: Dict[str, int] = {}
+    for table_name, records in tables.items():
+        rows = [
+            {"id": rec.get("id"), "createdTime": rec.get("createdTime"), **dict(rec.get("fields", {}))}
+            for rec in records
+        ]
+        frame = pd.DataFrame(rows)
+        with duckdb.connect() as conn:
+            conn.register("fixture", frame)
+            target = str(out / f"{table_name}.parquet").replace("'", "''")
+            conn.execute(f"COPY fixture TO '{target}' (FORMAT PARQUET)")
+        written[table_name] = len(rows)
+    return written
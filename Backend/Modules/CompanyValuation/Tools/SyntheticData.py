@@ -0,0 +1,154 @@
+"""
+Synthetic valuation dataset for offline benchmarking and large-scale runs.
+
+Generates Airtable-format records for the tables the calculators and V2
+analysts read, with internally consistent figures (assets > liabilities on
+average, EBITDA within a sector margin band, etc.). Output can be written as
+Parquet fixtures or loaded into a SQLite store:
+
+    python -m Modules.CompanyValuation.Tools.SyntheticData --companies 100000 --parquet tmp/fixtures
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from typing import Any, Dict, List, Optional
+
+SECTORS: Dict[str, Dict[str, float]] = {
+    # sector: EBITDA margin, EV/EBITDA, P/E, EV/Sales
+    "Technology": {"margin": 0.28, "ev_ebitda": 16.0, "pe": 25.0, "ev_sales": 4.5},
+    "Telecommunications": {"margin": 0.38, "ev_ebitda": 7.0, "pe": 14.0, "ev_sales": 2.4},
+    "Energy": {"margin": 0.30, "ev_ebitda": 6.5, "pe": 11.0, "ev_sales": 1.6},
+    "Consumer Goods": {"margin": 0.16, "ev_ebitda": 11.0, "pe": 19.0, "ev_sales": 1.7},
+    "Industrials": {"margin": 0.15, "ev_ebitda": 10.0, "pe": 17.0, "ev_sales": 1.4},
+    "Healthcare": {"margin": 0.22, "ev_ebitda": 13.0, "pe": 21.0, "ev_sales": 3.0},
+    "Financials": {"margin": 0.35, "ev_ebitda": 9.0, "pe": 12.0, "ev_sales": 2.8},
+    "Real Estate": {"margin": 0.45, "ev_ebitda": 15.0, "pe": 18.0, "ev_sales": 6.0},
+}
+REGIONS = ("Morocco", "Europe", "North America", "MENA", "Asia")
+DEFAULT_PERIODS = ("2022", "2023", "2024")
+
+
+def _record(table: str, index: int, fields: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": f"rec{table[:3]}{index:09d}", "createdTime": "2024-01-01T00:00:00.000Z", "fields": fields}
+
+
+def generate_synthetic_dataset(
+    n_companies: int = 1000,
+    periods: Optional[List[str]] = None,
+    seed: int = 42,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Return `{table_name: records}` for `n_companies` companies over `periods`."""
+    rng = random.Random(seed)
+    periods = list(periods or DEFAULT_PERIODS)
+    sector_names = list(SECTORS)
+
+    tables: Dict[str, List[Dict[str, Any]]] = {
+        "companies": [],
+        "companiesV2": [],
+        "financial_statements": [],
+        "income_statements": [],
+        "balance_sheets": [],
+        "valuation_metrics": [],
+        "industry_multiples": [],
+    }
+
+    for region in REGIONS:
+        for sector in sector_names:
+            preset = SECTORS[sector]
+            tables["industry_multiples"].append(_record("industry_multiples", len(tables["industry_multiples"]), {
+                "industry": sector,
+                "region": region,
+                "ev_ebitda": round(preset["ev_ebitda"] * rng.uniform(0.8, 1.2), 2),
+                "pe": round(preset["pe"] * rng.uniform(0.8, 1.2), 2),
+                "ev_sales": round(preset["ev_sales"] * rng.uniform(0.8, 1.2), 2),
+            }))
+
+    row = 0
+    for c in range(n_companies):
+        name = f"Company {c:06d}"
+        sector = rng.choice(sector_names)
+        region = rng.choice(REGIONS)
+        preset = SECTORS[sector]
+        revenue = 10 ** rng.uniform(6, 10)
+        growth = rng.gauss(0.06, 0.08)
+        shares = max(1e5, revenue / rng.uniform(5, 200))
+
+        tables["companies"].append(_record("companies", c, {"name": name, "industry": sector, "country": region}))
+        tables["companiesV2"].append(_record("companiesV2", c, {
+            "company_name": name, "sector": sector, "country": region, "ticker": f"SYN{c:06d}",
+        }))
+
+        for period in periods:
+            margin = max(0.01, rng.gauss(preset["margin"], 0.05))
+            ebitda = revenue * margin
+            net_income = ebitda * rng.uniform(0.35, 0.7)
+            total_assets = revenue * rng.uniform(0.8, 2.5)
+            total_liabilities = total_assets * rng.uniform(0.2, 0.9)
+            cash = total_assets * rng.uniform(0.03, 0.15)
+            receivables = total_assets * rng.uniform(0.05, 0.2)
+            inventory = total_assets * rng.uniform(0.0, 0.15)
+            ppe = total_assets * rng.uniform(0.2, 0.5)
+            ocf = ebitda * rng.uniform(0.6, 0.9)
+            capex = revenue * rng.uniform(0.02, 0.1)
+            share_price = max(0.5, (net_income * preset["pe"] / shares) * rng.uniform(0.7, 1.3))
+            current_assets = cash + receivables + inventory
+            current_liabilities = total_liabilities * rng.uniform(0.3, 0.6)
+            total_debt = total_liabilities * rng.uniform(0.3, 0.7)
+
+            tables["financial_statements"].append(_record("financial_statements", row, {
+                "company": name, "period": period, "industry": sector, "region": region,
+                "revenue": revenue, "ebitda": ebitda, "net_income": net_income,
+                "total_assets": total_assets, "total_liabilities": total_liabilities,
+                "cash": cash, "accounts_receivable": receivables, "inventory": inventory, "ppe": ppe,
+                "operating_cash_flow": ocf, "capital_expenditures": capex,
+                "share_price": share_price, "shares_outstanding": shares,
+                "wacc": round(rng.uniform(0.07, 0.13), 4),
+            }))
+            tables["income_statements"].append(_record("income_statements", row, {
+                "company": name, "period": period, "revenue": revenue,
+                "cogs": revenue * (1 - margin - rng.uniform(0.05, 0.2)),
+                "operating_income": ebitda * rng.uniform(0.7, 0.95), "ebitda": ebitda, "net_income": net_income,
+            }))
+            tables["balance_sheets"].append(_record("balance_sheets", row, {
+                "company": name, "period": period,
+                "total_assets": total_assets, "total_liabilities": total_liabilities,
+                "current_assets": current_assets, "current_liabilities": current_liabilities,
+                "inventory": inventory, "cash": cash, "total_debt": total_debt,
+                "shareholders_equity": total_assets - total_liabilities, "shares_outstanding": shares,
+            }))
+            market_cap = share_price * shares
+            tables["valuation_metrics"].append(_record("valuation_metrics", row, {
+                "company": name, "period": period, "market_cap": market_cap,
+                "enterprise_value": market_cap + total_debt - cash,
+            }))
+            row += 1
+            revenue *= 1 + growth
+
+    return tables
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic valuation dataset.")
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--periods", nargs="*", default=list(DEFAULT_PERIODS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--parquet", help="Directory for Parquet fixtures")
+    parser.add_argument("--sqlite", help="Path of a SQLite store to (re)load")
+    args = parser.parse_args()
+
+    tables = generate_synthetic_dataset(args.companies, args.periods, args.seed)
+    if args.parquet:
+        from .StorageBackends import write_parquet_fixtures
+
+        print(write_parquet_fixtures(tables, args.parquet))
+    if args.sqlite:
+        from .StorageBackends import SQLiteBackend
+
+        SQLiteBackend(args.sqlite).load_tables(tables)
+        print({name: len(records) for name, records in tables.items()})
+
+
+if __name__ == "__main__":
+    main()
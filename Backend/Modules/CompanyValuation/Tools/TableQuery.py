@@ -0,0 +1,296 @@
+"""
+Filtered, projected and paginated reads of the V2 tables.
+
+`get_income_statements()` and the other V2 getters take no parameters and
+return the whole table, which at scale overflows the model's context and
+the latency budget. The `query_*` tools take
+
+    company / companies    one or more company names
+    start_period/end_period  inclusive period range (`period_sort_key` order)
+    fields                 projection (company and period are always kept)
+    limit, cursor          page size and continuation token
+
+and return at most `limit` rows and at most `MAX_RESPONSE_CHARS` of JSON.
+When rows remain, the payload carries `next_cursor`; passing it back with
+the same filters returns the next page (cursors are offsets, so a page read
+after the table changed says so in its notes).
+
+Each table is indexed once per table version (for live Airtable, which has
+no version, once per COMPANY_VALUATION_CACHE_TTL seconds): records are
+normalized, sorted by (company, period) and grouped by company key, so a
+company filter is a dict lookup plus a slice. Cursors record the version, or
+the fetch time of an unversioned index.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    from .CompanyValuationDB import (
+        get_balance_sheets,
+        get_companiesV2,
+        get_income_statements,
+        get_valuation_metrics,
+        cache_is_current,
+        table_version,
+    )
+    from .RecordStore import normalize_fields, normalize_key, period_sort_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.CompanyValuationDB import (  # type: ignore
+        get_balance_sheets,
+        get_companiesV2,
+        get_income_statements,
+        get_valuation_metrics,
+        cache_is_current,
+        table_version,
+    )
+    from ..Tools.RecordStore import normalize_fields, normalize_key, period_sort_key  # type: ignore
+
+_LOADERS = {
+    "companiesV2": get_companiesV2,
+    "income_statements": get_income_statements,
+    "balance_sheets": get_balance_sheets,
+    "valuation_metrics": get_valuation_metrics,
+}
+QUERY_TABLES = tuple(_LOADERS)
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+MAX_RESPONSE_CHARS = 20000  # JSON size of the returned rows
+
+
+class TableIndex:
+    """Normalized rows of one table, sorted by (company, period) and grouped by company."""
+
+    def __init__(self, records: Sequence[Mapping[str, Any]]):
+        rows = []
+        for position, record in enumerate(records):
+            fields = normalize_fields(record)
+            company = normalize_key(fields.get("company") or fields.get("company_name") or fields.get("name"))
+            rows.append((company, period_sort_key(fields.get("period")) or (0, 0), position, fields))
+        rows.sort(key=lambda row: row[:3])
+        self.rows: List[Dict[str, Any]] = [row[3] for row in rows]
+        self.periods: List[Tuple[int, int]] = [row[1] for row in rows]
+        self.has_period: List[bool] = [row[3].get("period") is not None for row in rows]
+        self.by_company: Dict[str, Tuple[int, int]] = {}
+        for position, (company, _, _, _) in enumerate(rows):
+            start, _ = self.by_company.get(company, (position, position))
+            self.by_company[company] = (start, position + 1)
+        self.version: Any = None
+        self.fetched_at = time.monotonic()
+        self.fetched_at_wall = time.time()
+
+    @property
+    def snapshot(self) -> str:
+        """Token stored in cursors: the table version, or the fetch time when the version is unknown."""
+        return str(self.version) if self.version is not None else f"fetched@{self.fetched_at_wall:.6f}"
+
+    def select(
+        self,
+        companies: Optional[Sequence[str]] = None,
+        start_period: Optional[str] = None,
+        end_period: Optional[str] = None,
+    ) -> List[int]:
+        """Positions of the rows matching the filters, in (company, period) order."""
+        if companies:
+            keys = {normalize_key(c) for c in companies}
+            spans = sorted(self.by_company[key] for key in keys if key in self.by_company)
+            positions = [i for start, end in spans for i in range(start, end)]
+        else:
+            positions = list(range(len(self.rows)))
+        start = period_sort_key(start_period) if start_period else None
+        end = period_sort_key(end_period) if end_period else None
+        if start is None and end is None:
+            return positions
+        return [
+            i for i in positions
+            if self.has_period[i]
+            and (start is None or self.periods[i] >= start)
+            and (end is None or self.periods[i] <= end)
+        ]
+
+
+_indexes: Dict[str, TableIndex] = {}
+_lock = threading.Lock()
+
+
+def get_table_index(name: str) -> TableIndex:
+    """Index over table `name`, rebuilt when its version changes (or its TTL expires when unversioned)."""
+    version = table_version(name)
+    with _lock:
+        cached = _indexes.get(name)
+    if cached is not None and cache_is_current(cached.version, version, cached.fetched_at):
+        return cached
+    index = TableIndex(_LOADERS[name]())
+    index.version = version
+    with _lock:
+        _indexes[name] = index
+    return index
+
+
+# -------------------------------
+# Cursors
+# -------------------------------
+
+def _query_digest(table: str, filters: Mapping[str, Any]) -> str:
+    return hashlib.sha1(json.dumps([table, filters], sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def encode_cursor(offset: int, digest: str, snapshot: Any = None) -> str:
+    payload = {"o": offset, "q": digest, "v": None if snapshot is None else str(snapshot)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, digest: str) -> Tuple[int, Optional[str]]:
+    """(offset, table snapshot token) stored in `cursor`; ValueError when it is malformed or from another query."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        offset, stored = int(data["o"]), data["q"]
+    except Exception as exc:
+        raise ValueError("Invalid cursor.") from exc
+    if stored != digest:
+        raise ValueError("Cursor belongs to a different query; repeat the filters it was issued for.")
+    return offset, data.get("v")
+
+
+def query_table(
+    table: str,
+    companies: Optional[Sequence[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    max_chars: int = MAX_RESPONSE_CHARS,
+) -> Dict[str, Any]:
+    """One page of `table` matching the filters, as a tool payload."""
+    tool = f"query_{table}"
+    if table not in QUERY_TABLES:
+        return {"tool": tool, "success": False, "message": f"Unknown table '{table}'. Use one of {list(QUERY_TABLES)}."}
+    limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    projection = [normalize_key(name) for name in fields] if fields else None
+    filters = {
+        "companies": sorted(normalize_key(c) for c in companies) if companies else None,
+        "start_period": start_period,
+        "end_period": end_period,
+        "fields": projection,
+    }
+    digest = _query_digest(table, filters)
+    try:
+        offset, cursor_snapshot = decode_cursor(cursor, digest) if cursor else (0, None)
+    except ValueError as exc:
+        return {"tool": tool, "success": False, "message": str(exc)}
+
+    index = get_table_index(table)
+    positions = index.select(companies, start_period, end_period)
+    keep = None if projection is None else {"company", "company_name", "period", *projection}
+
+    rows: List[Dict[str, Any]] = []
+    size = 0
+    next_offset = offset
+    for position in positions[offset:offset + limit]:
+        row = index.rows[position]
+        if keep is not None:
+            row = {name: value for name, value in row.items() if name in keep}
+        row_size = len(json.dumps(row, default=str))
+        if rows and size + row_size > max_chars:
+            break
+        rows.append(row)
+        size += row_size
+        next_offset += 1
+
+    notes: List[str] = []
+    if cursor and cursor_snapshot != index.snapshot:
+        notes.append("The table may have changed since the first page; rows can be skipped or repeated.")
+    has_more = next_offset < len(positions)
+    if has_more:
+        reason = "size cap" if len(rows) < limit else "limit"
+        notes.append(
+            f"Returned rows {offset + 1}-{next_offset} of {len(positions)} ({reason}); pass next_cursor for more."
+        )
+    if companies and not positions:
+        notes.append(f"No rows for: {', '.join(companies)}.")
+    if projection:
+        unknown = [name for name in projection if not any(name in index.rows[i] for i in positions[:50])]
+        if unknown:
+            notes.append(f"Unknown fields: {', '.join(unknown)}.")
+
+    return {
+        "tool": tool,
+        "company": list(companies) if companies else None,
+        "success": True,
+        "inputs": {**filters, "limit": limit},
+        "result": {
+            "rows": rows,
+            "total_rows": len(positions),
+            "next_cursor": encode_cursor(next_offset, digest, index.snapshot) if has_more else None,
+        },
+        "notes": "; ".join(notes),
+    }
+
+
+# -------------------------------
+# Tools
+# -------------------------------
+
+def query_companies(
+    companies: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Get companies from companiesV2, optionally only `companies` (names) and `fields`.
+
+    Returns at most `limit` rows; when more remain, pass `next_cursor` back with the same filters.
+    """
+    return query_table("companiesV2", companies=companies, fields=fields, limit=limit, cursor=cursor)
+
+
+def query_income_statements(
+    companies: Optional[List[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Get income statement rows filtered by company names and period range, projected to `fields`.
+
+    Returns at most `limit` rows; when more remain, pass `next_cursor` back with the same filters.
+    """
+    return query_table("income_statements", companies, start_period, end_period, fields, limit, cursor)
+
+
+def query_balance_sheets(
+    companies: Optional[List[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Get balance sheet rows filtered by company names and period range, projected to `fields`.
+
+    Returns at most `limit` rows; when more remain, pass `next_cursor` back with the same filters.
+    """
+    return query_table("balance_sheets", companies, start_period, end_period, fields, limit, cursor)
+
+
+def query_valuation_metrics(
+    companies: Optional[List[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Get valuation metric rows filtered by company names and period range, projected to `fields`.
+
+    Returns at most `limit` rows; when more remain, pass `next_cursor` back with the same filters.
+    """
+    return query_table("valuation_metrics", companies, start_period, end_period, fields, limit, cursor)
@@ -0,0 +1,228 @@
+"""
+Multi-period valuation history.
+
+Trend questions ("how has the DCF value moved year over year?") used to take
+one calculator call per period. `history_panel` selects every period of the
+requested companies, runs the batch formulas of `BatchValuation.py` over the
+whole (company, period) panel at once and returns a tidy long-format table:
+
+    company | period | method | value | success | confidence | change | pct_change
+
+one row per (company, method, period), ordered by company, method and period.
+`change`/`pct_change` compare each value with the same company's previous
+period (YoY for annual data, QoQ for quarterly data). The columns are NumPy
+arrays, so `pandas.DataFrame(history_panel(...))` is ready for charting.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .BatchValuation import batch_valuate, index_columns
+    from .RecordStore import index_for, normalize_key, period_sort_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.BatchValuation import batch_valuate, index_columns  # type: ignore
+    from ..Tools.RecordStore import index_for, normalize_key, period_sort_key  # type: ignore
+
+# History method -> (batch method, headline value column)
+HISTORY_METHODS: Dict[str, Tuple[str, str]] = {
+    "book_value": ("book_value", "book_value"),
+    "liquidation_value": ("liquidation_value", "liquidation_value"),
+    "market_cap": ("market_cap", "market_cap"),
+    "comparable_multiples": ("comparable_multiples", "comparable_average"),
+    "earnings_multiple": ("earnings_multiple", "earnings_average"),
+    "dcf": ("dcf", "dcf_value"),
+}
+DEFAULT_HISTORY_METHODS = ("book_value", "comparable_multiples", "dcf")
+HISTORY_COLUMNS = ("company", "period", "method", "value", "success", "confidence", "change", "pct_change")
+MAX_HISTORY_ROWS = 500
+
+
+def _in_range(sort_key: Any, start: Any, end: Any) -> bool:
+    if start is None and end is None:
+        return True
+    if sort_key is None:
+        return False
+    return (start is None or sort_key >= start) and (end is None or sort_key <= end)
+
+
+def history_panel(
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+    companies: Optional[Sequence[str]] = None,
+    methods: Optional[Sequence[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+    industry_multiples: Optional[Mapping[str, Any]] = None,
+    wacc: Optional[Any] = None,
+    terminal_growth_rate: Optional[Any] = None,
+    forecast_years: int = 5,
+) -> Dict[str, np.ndarray]:
+    """Long-format valuation history of `companies` (all companies when None).
+
+    Periods are ordered chronologically (`period_sort_key`); `start_period`/
+    `end_period` bound them inclusively. `industry_multiples` feeds both
+    multiple methods (ev_ebitda/pe/ev_sales for comparables, ebitda/revenue
+    for earnings); without it each row uses its segment medians.
+    """
+    selected = list(methods or DEFAULT_HISTORY_METHODS)
+    unknown = set(selected) - set(HISTORY_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown history methods: {sorted(unknown)}. Available: {list(HISTORY_METHODS)}")
+
+    index = index_for(records)
+    wanted = {normalize_key(c) for c in companies} if companies else None
+    start = period_sort_key(start_period) if start_period else None
+    end = period_sort_key(end_period) if end_period else None
+
+    rows = []
+    for position, fields in enumerate(index.fields):
+        company = normalize_key(fields.get("company"))
+        if wanted is not None and company not in wanted:
+            continue
+        sort_key = period_sort_key(fields.get("period"))
+        if _in_range(sort_key, start, end):
+            rows.append((company, sort_key or (0, 0), position))
+    rows.sort()
+    n_rows, n_methods = len(rows), len(selected)
+    if not n_rows:
+        return {name: np.array([], dtype=object if name in ("company", "period", "method") else float)
+                for name in HISTORY_COLUMNS}
+
+    positions = np.fromiter((position for _, _, position in rows), dtype=np.intp, count=n_rows)
+    panel = {name: column[positions] for name, column in index_columns(index).items()}
+    results = batch_valuate(
+        panel,
+        methods=[HISTORY_METHODS[m][0] for m in selected],
+        comparable_multiples=industry_multiples,
+        earnings_multiples=industry_multiples,
+        wacc=wacc,
+        terminal_growth_rate=terminal_growth_rate,
+        forecast_years=forecast_years,
+    )
+
+    company_keys = np.array([company for company, _, _ in rows], dtype=object)
+    same_company = np.zeros(n_rows, dtype=bool)
+    same_company[1:] = company_keys[1:] == company_keys[:-1]
+
+    values, success, confidence, change, pct_change = [], [], [], [], []
+    for method in selected:
+        batch_method, column = HISTORY_METHODS[method]
+        value = np.where(results[f"{batch_method}_success"], results[column], np.nan)
+        previous = np.full(n_rows, np.nan)
+        previous[1:] = value[:-1]
+        previous = np.where(same_company, previous, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(previous != 0, (value - previous) / np.abs(previous), np.nan)
+        values.append(value)
+        success.append(results[f"{batch_method}_success"])
+        confidence.append(results[f"{batch_method}_confidence"])
+        change.append(value - previous)
+        pct_change.append(ratio)
+
+    names = np.array([str(index.fields[p].get("company")) for _, _, p in rows], dtype=object)
+    periods = np.array([str(index.fields[p].get("period")) for _, _, p in rows], dtype=object)
+    # Method-major blocks, reordered to company -> method -> period
+    group = np.cumsum(~same_company)
+    order = np.lexsort((
+        np.tile(np.arange(n_rows), n_methods),
+        np.repeat(np.arange(n_methods), n_rows),
+        np.tile(group, n_methods),
+    ))
+    return {
+        "company": np.tile(names, n_methods)[order],
+        "period": np.tile(periods, n_methods)[order],
+        "method": np.repeat(np.array(selected, dtype=object), n_rows)[order],
+        "value": np.concatenate(values)[order],
+        "success": np.concatenate(success).astype(bool)[order],
+        "confidence": np.concatenate(confidence)[order],
+        "change": np.concatenate(change)[order],
+        "pct_change": np.concatenate(pct_change)[order],
+    }
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+def valuation_history(
+    companies: Optional[List[str]] = None,
+    methods: Optional[List[str]] = None,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+    records: Optional[Iterable[Mapping[str, Any]]] = None,
+    industry_multiples: Optional[Dict[str, float]] = None,
+    wacc: Optional[float] = None,
+    terminal_growth_rate: Optional[float] = None,
+    forecast_years: int = 5,
+    max_rows: int = MAX_HISTORY_ROWS,
+) -> Dict[str, Any]:
+    """Value one or more companies in every period in one call (book value, multiples, DCF by default).
+
+    Returns a long-format table (company, period, method, value, success,
+    confidence, change, pct_change) where change/pct_change are versus the
+    company's previous period. `methods` may include book_value,
+    liquidation_value, market_cap, comparable_multiples, earnings_multiple
+    and dcf; `start_period`/`end_period` bound the periods.
+    """
+    try:
+        table = history_panel(
+            records=records,
+            companies=companies,
+            methods=methods,
+            start_period=start_period,
+            end_period=end_period,
+            industry_multiples=industry_multiples,
+            wacc=wacc,
+            terminal_growth_rate=terminal_growth_rate,
+            forecast_years=forecast_years,
+        )
+    except ValueError as exc:
+        return {"tool": "valuation_history", "company": companies, "success": False, "message": str(exc)}
+
+    n_rows = len(table["value"])
+    if not n_rows:
+        return {
+            "tool": "valuation_history",
+            "company": companies,
+            "success": False,
+            "message": "No financial statement records for the selected companies and periods.",
+        }
+
+    notes = []
+    shown = min(n_rows, max(1, int(max_rows)))
+    if shown < n_rows:
+        notes.append(f"Showing {shown} of {n_rows} rows; narrow companies, methods or periods.")
+    rows = [{name: _cell(table[name][i]) for name in HISTORY_COLUMNS} for i in range(shown)]
+    periods = sorted(set(table["period"]), key=lambda p: period_sort_key(p) or (0, 0))
+    notes.append("change/pct_change are versus the same company's previous period.")
+
+    return {
+        "tool": "valuation_history",
+        "company": companies,
+        "success": bool(table["success"].any()),
+        "inputs": {
+            "methods": list(methods or DEFAULT_HISTORY_METHODS),
+            "start_period": start_period,
+            "end_period": end_period,
+            "industry_multiples": industry_multiples,
+            "wacc": wacc,
+            "terminal_growth_rate": terminal_growth_rate,
+            "forecast_years": forecast_years,
+        },
+        "result": {
+            "columns": list(HISTORY_COLUMNS),
+            "rows": rows,
+            "row_count": n_rows,
+            "companies": len(set(table["company"])),
+            "periods": periods,
+        },
+        "confidence": round(float(np.nanmean(table["confidence"])), 4) if table["success"].any() else 0.0,
+        "notes": "; ".join(notes),
+    }
@@ -0,0 +1,407 @@
+"""
+Incremental re-valuation for what-if questions.
+
+A `ValuationSession` loads one company's statement record and industry
+multiples once, then keeps every input and intermediate of the six
+`Calculations.py` methods in a dependency graph (see `GRAPH`). `update()`
+changes inputs, recomputes only the nodes downstream of them (stopping where
+a value does not change) and returns the delta, so "what if WACC is 9%?"
+costs a handful of arithmetic operations instead of a data fetch and six
+tool calls.
+
+    session = ValuationSession.load(company="Acme", period="2024")
+    session.update(wacc=0.09)["delta"]["dcf_value"]   # {"old": ..., "new": ...}
+
+The formulas are the same as the calculator tools'; `what_if_valuation`
+exposes cached sessions to the agent.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    from .Calculations import (
+        DEFAULT_FCF_GROWTH,
+        DEFAULT_LIQUIDATION_DISCOUNTS,
+        DEFAULT_TERMINAL_GROWTH,
+        DEFAULT_WACC,
+        _comparable_industry_multiples,
+        _earnings_industry_multiples,
+        _infer_asset_breakdown,
+        _lookup_record,
+        _multiples_index,
+        _safe_lower_keys,
+    )
+    from .CompanyValuationDB import cache_is_current, table_version
+    from .MultiplesIndex import record_segment
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.Calculations import (  # type: ignore
+        DEFAULT_FCF_GROWTH,
+        DEFAULT_LIQUIDATION_DISCOUNTS,
+        DEFAULT_TERMINAL_GROWTH,
+        DEFAULT_WACC,
+        _comparable_industry_multiples,
+        _earnings_industry_multiples,
+        _infer_asset_breakdown,
+        _lookup_record,
+        _multiples_index,
+        _safe_lower_keys,
+    )
+    from ..Tools.CompanyValuationDB import cache_is_current, table_version  # type: ignore
+    from ..Tools.MultiplesIndex import record_segment  # type: ignore
+
+
+# -------------------------------
+# Node functions
+# -------------------------------
+
+def _average(*values: Optional[float]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return sum(present) / len(present) if present else None
+
+
+def _multiple_value(metric: float, multiple: Optional[float]) -> Optional[float]:
+    # Same rule as the multiples tools: positive metric and a non-zero multiple
+    if metric and metric > 0 and multiple:
+        return float(metric) * multiple
+    return None
+
+
+def _liquidation_breakdown(breakdown: Mapping[str, float], total_assets: float) -> Mapping[str, float]:
+    # Without asset categories the record's total assets stand in for the
+    # breakdown (see _infer_asset_breakdown), so that proxy follows total_assets
+    if set(breakdown) == {"total_assets"}:
+        return {"total_assets": float(total_assets)}
+    return breakdown
+
+
+def _discounted_assets(breakdown: Mapping[str, float], discounts: Mapping[str, float]) -> float:
+    return sum(float(value) * float(discounts.get(category, 0.50)) for category, value in breakdown.items())
+
+
+def _market_cap(share_price: float, shares_outstanding: float) -> Optional[float]:
+    if share_price <= 0 or shares_outstanding <= 0:
+        return None
+    return float(share_price) * float(shares_outstanding)
+
+
+def _free_cash_flows(base: float, growth: float, years: int) -> Tuple[float, ...]:
+    if base == 0:
+        return (0.0,) * years
+    return tuple(base * (1 + growth) ** i for i in range(years))
+
+
+def _pv_cash_flows(flows: Sequence[float], wacc: float) -> float:
+    return sum(float(fcf) / ((1 + wacc) ** (i + 1)) for i, fcf in enumerate(flows))
+
+
+def _terminal_value(flows: Sequence[float], wacc: float, growth: float) -> Optional[float]:
+    if not flows or wacc == growth:
+        return None
+    return (flows[-1] * (1 + growth)) / (wacc - growth)
+
+
+def _pv_terminal_value(terminal_value: Optional[float], wacc: float, years: int) -> Optional[float]:
+    return None if terminal_value is None else terminal_value / ((1 + wacc) ** years)
+
+
+def _dcf_value(pv_cash_flows: float, pv_terminal_value: Optional[float]) -> Optional[float]:
+    return None if pv_terminal_value is None else pv_cash_flows + pv_terminal_value
+
+
+# Inputs (no function) followed by derived nodes, in topological order
+GRAPH: Tuple[Tuple[str, Tuple[str, ...], Optional[Callable[..., Any]]], ...] = (
+    # Inputs
+    ("total_assets", (), None),
+    ("total_liabilities", (), None),
+    ("asset_breakdown", (), None),
+    ("discounts", (), None),
+    ("share_price", (), None),
+    ("shares_outstanding", (), None),
+    ("revenue", (), None),
+    ("ebitda", (), None),
+    ("net_income", (), None),
+    ("ev_ebitda_multiple", (), None),
+    ("pe_multiple", (), None),
+    ("ev_sales_multiple", (), None),
+    ("ebitda_multiple", (), None),
+    ("revenue_multiple", (), None),
+    ("base_free_cash_flow", (), None),
+    ("fcf_growth", (), None),
+    ("wacc", (), None),
+    ("terminal_growth_rate", (), None),
+    ("forecast_years", (), None),
+    # Asset-based
+    ("book_value", ("total_assets", "total_liabilities"), lambda a, l: float(a) - float(l)),
+    ("liquidation_breakdown", ("asset_breakdown", "total_assets"), _liquidation_breakdown),
+    ("discounted_asset_value", ("liquidation_breakdown", "discounts"), _discounted_assets),
+    ("liquidation_value", ("discounted_asset_value", "total_liabilities"), lambda d, l: d - float(l or 0.0)),
+    # Market-based
+    ("market_cap", ("share_price", "shares_outstanding"), _market_cap),
+    ("comparable_ev_ebitda", ("ebitda", "ev_ebitda_multiple"), _multiple_value),
+    ("comparable_pe", ("net_income", "pe_multiple"), _multiple_value),
+    ("comparable_ev_sales", ("revenue", "ev_sales_multiple"), _multiple_value),
+    ("comparable_average", ("comparable_ev_ebitda", "comparable_pe", "comparable_ev_sales"), _average),
+    # Earning-based
+    ("free_cash_flows", ("base_free_cash_flow", "fcf_growth", "forecast_years"), _free_cash_flows),
+    ("pv_cash_flows", ("free_cash_flows", "wacc"), _pv_cash_flows),
+    ("terminal_value", ("free_cash_flows", "wacc", "terminal_growth_rate"), _terminal_value),
+    ("pv_terminal_value", ("terminal_value", "wacc", "forecast_years"), _pv_terminal_value),
+    ("dcf_value", ("pv_cash_flows", "pv_terminal_value"), _dcf_value),
+    ("earnings_ebitda", ("ebitda", "ebitda_multiple"), _multiple_value),
+    ("earnings_revenue", ("revenue", "revenue_multiple"), _multiple_value),
+    ("earnings_average", ("earnings_ebitda", "earnings_revenue"), _average),
+    # Triangulation
+    ("asset_based", ("book_value", "liquidation_value"), _average),
+    ("market_based", ("market_cap", "comparable_average"), _average),
+    ("earning_based", ("dcf_value", "earnings_average"), _average),
+    ("triangulated_value", ("asset_based", "market_based", "earning_based"), _average),
+)
+
+INPUTS = tuple(name for name, _, func in GRAPH if func is None)
+OUTPUTS = (
+    "book_value", "liquidation_value", "market_cap", "comparable_average", "dcf_value",
+    "earnings_average", "asset_based", "market_based", "earning_based", "triangulated_value",
+)
+
+_DOWNSTREAM: Dict[str, List[str]] = {name: [] for name, _, _ in GRAPH}
+for _name, _deps, _ in GRAPH:
+    for _dep in _deps:
+        _DOWNSTREAM[_dep].append(_name)
+
+
+class ValuationSession:
+    """Inputs and intermediates of one company's valuation, kept up to date incrementally."""
+
+    def __init__(self, inputs: Mapping[str, Any], company: Optional[str] = None, period: Optional[str] = None):
+        missing = set(INPUTS) - set(inputs)
+        if missing:
+            raise ValueError(f"Missing session inputs: {sorted(missing)}")
+        self.company = company
+        self.period = period
+        self.base_inputs: Dict[str, Any] = {name: inputs[name] for name in INPUTS}
+        self.values: Dict[str, Any] = dict(self.base_inputs)
+        self._lock = threading.Lock()
+        for name, deps, func in GRAPH:
+            if func is not None:
+                self.values[name] = func(*(self.values[d] for d in deps))
+
+    @classmethod
+    def load(
+        cls,
+        company: Optional[str] = None,
+        period: Optional[str] = None,
+        records: Optional[Iterable[Mapping[str, Any]]] = None,
+        industry_multiples: Optional[Mapping[str, float]] = None,
+        discounts: Optional[Mapping[str, float]] = None,
+    ) -> Optional["ValuationSession"]:
+        """Build a session from the statement record (one fetch); None if no record."""
+        record = _lookup_record(records, company=company, period=period)
+        if record is None:
+            return None
+        if industry_multiples is None:
+            index = _multiples_index()
+            segment = record_segment(record)
+            comparable = _comparable_industry_multiples(segment, index)
+            earnings = _earnings_industry_multiples(segment, index)
+        else:
+            comparable = {k: industry_multiples.get(k) for k in ("ev_ebitda", "pe", "ev_sales")}
+            earnings = {k: industry_multiples.get(k) for k in ("ebitda", "revenue")}
+
+        discounts_map = _safe_lower_keys(discounts or DEFAULT_LIQUIDATION_DISCOUNTS)
+        breakdown = _infer_asset_breakdown(record.fields, discounts_map)
+        base_fcf = record.free_cash_flow or 0.0
+        if base_fcf == 0:
+            base_fcf = (record.operating_cash_flow or 0.0) - (record.capital_expenditures or 0.0)
+
+        inputs = {
+            "total_assets": record.total_assets or 0.0,
+            "total_liabilities": record.total_liabilities or 0.0,
+            "asset_breakdown": breakdown,
+            "discounts": discounts_map,
+            "share_price": record.share_price or 0.0,
+            "shares_outstanding": record.shares_outstanding or 0.0,
+            "revenue": record.revenue or 0.0,
+            "ebitda": record.ebitda or 0.0,
+            "net_income": record.net_income or 0.0,
+            "ev_ebitda_multiple": comparable.get("ev_ebitda"),
+            "pe_multiple": comparable.get("pe"),
+            "ev_sales_multiple": comparable.get("ev_sales"),
+            "ebitda_multiple": earnings.get("ebitda"),
+            "revenue_multiple": earnings.get("revenue"),
+            "base_free_cash_flow": base_fcf,
+            "fcf_growth": DEFAULT_FCF_GROWTH,
+            "wacc": record.wacc if record.wacc is not None else DEFAULT_WACC,
+            "terminal_growth_rate": DEFAULT_TERMINAL_GROWTH,
+            "forecast_years": 5,
+        }
+        return cls(inputs, company=company or record.company, period=period or record.period)
+
+    def update(self, **changes: Any) -> Dict[str, Any]:
+        """Set inputs and recompute only what depends on them.
+
+        Returns {"changed_inputs", "recomputed", "delta", "outputs", "elapsed_us"}
+        where `delta` maps every node whose value changed to {"old", "new"} and
+        `outputs` is taken in the same locked section, so both describe this
+        update even when other threads share the session.
+        """
+        unknown = set(changes) - set(INPUTS)
+        if unknown:
+            raise ValueError(f"Unknown inputs {sorted(unknown)}. Inputs: {list(INPUTS)}")
+        started = time.perf_counter()
+        with self._lock:
+            changed = {name for name, value in changes.items() if self.values[name] != value}
+            delta = {name: {"old": self.values[name], "new": changes[name]} for name in changed}
+            for name in changed:
+                self.values[name] = changes[name]
+
+            # Nodes are visited in topological order; a node is recomputed only
+            # if one of its dependencies actually changed.
+            recomputed: List[str] = []
+            dirty = {child for name in changed for child in _DOWNSTREAM[name]}
+            for name, deps, func in GRAPH:
+                if name not in dirty:
+                    continue
+                if not any(dep in changed for dep in deps):
+                    continue
+                recomputed.append(name)
+                new = func(*(self.values[d] for d in deps))
+                old = self.values[name]
+                if new != old:
+                    self.values[name] = new
+                    changed.add(name)
+                    delta[name] = {"old": old, "new": new}
+                    dirty.update(_DOWNSTREAM[name])
+            outputs = self.outputs()
+        return {
+            "changed_inputs": sorted(set(changes) & set(delta)),
+            "recomputed": recomputed,
+            "delta": delta,
+            "outputs": outputs,
+            "elapsed_us": round((time.perf_counter() - started) * 1e6, 1),
+        }
+
+    def reset(self, *names: str) -> Dict[str, Any]:
+        """Restore inputs (all by default) to the values loaded from the data."""
+        return self.update(**{name: self.base_inputs[name] for name in (names or INPUTS)})
+
+    def set_overrides(self, overrides: Mapping[str, Any]) -> Dict[str, Any]:
+        """Make `overrides` the only inputs that differ from the loaded data."""
+        target = dict(self.base_inputs)
+        target.update(overrides)
+        return self.update(**target)
+
+    def get(self, name: str) -> Any:
+        return self.values[name]
+
+    def outputs(self) -> Dict[str, Any]:
+        return {name: self.values[name] for name in OUTPUTS}
+
+    def inputs(self) -> Dict[str, Any]:
+        return {name: self.values[name] for name in INPUTS}
+
+    @staticmethod
+    def downstream(name: str) -> List[str]:
+        """All nodes that depend (directly or transitively) on `name`."""
+        seen: Dict[str, None] = {}
+        stack = list(_DOWNSTREAM[name])
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen[node] = None
+                stack.extend(_DOWNSTREAM[node])
+        order = [n for n, _, _ in GRAPH]
+        return sorted(seen, key=order.index)
+
+
+# -------------------------------
+# Cached sessions (agent tool)
+# -------------------------------
+
+MAX_SESSIONS = 128
+
+_sessions: "OrderedDict[Tuple[str, str], Tuple[Any, float, ValuationSession]]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def get_session(
+    company: Optional[str] = None,
+    period: Optional[str] = None,
+    reload: bool = False,
+) -> Optional[ValuationSession]:
+    """Cached session for (company, period), reloaded when the statements or multiples change.
+
+    Sessions over tables without a version (live Airtable) are reused for
+    COMPANY_VALUATION_CACHE_TTL seconds; `reload` refetches regardless.
+    """
+    key = (str(company or "").strip().lower(), str(period or "").strip().lower())
+    version = (table_version("financial_statements"), table_version("industry_multiples"))
+    with _sessions_lock:
+        cached = _sessions.get(key)
+        if not reload and cached is not None and cache_is_current(cached[0], version, cached[1]):
+            _sessions.move_to_end(key)
+            return cached[2]
+    fetched_at = time.monotonic()
+    session = ValuationSession.load(company=company, period=period)
+    if session is None:
+        return None
+    with _sessions_lock:
+        _sessions[key] = (version, fetched_at, session)
+        _sessions.move_to_end(key)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return session
+
+
+def what_if_valuation(
+    company: Optional[str] = None,
+    period: Optional[str] = None,
+    changes: Optional[Dict[str, Any]] = None,
+    reload: bool = False,
+) -> Dict[str, Any]:
+    """Revalue a company under changed assumptions without refetching its data.
+
+    `changes` maps session inputs (e.g. "wacc", "terminal_growth_rate",
+    "fcf_growth", "ev_ebitda_multiple", "share_price") to new values; inputs
+    not listed revert to the loaded data. Only the affected results are
+    recomputed; the payload lists what changed relative to the previous call.
+    Set `reload` to refetch the company's data first.
+    """
+    changes = dict(changes or {})
+    unknown = set(changes) - set(INPUTS)
+    if unknown:
+        return {
+            "tool": "what_if_valuation",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": f"Unknown inputs {sorted(unknown)}. Available: {list(INPUTS)}",
+        }
+    session = get_session(company, period, reload=reload)
+    if session is None:
+        return {
+            "tool": "what_if_valuation",
+            "company": company,
+            "period": period,
+            "success": False,
+            "message": "No financial statement records available.",
+        }
+    update = session.set_overrides(changes)
+    return {
+        "tool": "what_if_valuation",
+        "company": session.company,
+        "period": session.period,
+        "success": True,
+        "inputs": {"changes": changes},
+        "result": {
+            "outputs": update["outputs"],
+            "delta": {name: entry for name, entry in update["delta"].items() if name in OUTPUTS},
+            "recomputed": update["recomputed"],
+            "elapsed_us": update["elapsed_us"],
+        },
+        "notes": "Values use the same formulas as the calculator tools; None means the method has no valid result.",
+    }
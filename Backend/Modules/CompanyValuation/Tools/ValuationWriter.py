@@ -0,0 +1,315 @@
+"""
+Write-behind persistence of computed valuations to `valuation_metrics`.
+
+Writing one record per calculator call would exhaust Airtable's rate limit,
+so results are queued and flushed by a background thread:
+
+- Results are keyed by (company_key, period, method), where `company_key` is
+  the normalized company name ("Acme" and "acme " share a row); a newer
+  result for a key that is still queued replaces the older one (coalescing).
+- Batches are upserted in Airtable's maximum batch size (10 records).
+- Failed batches are retried with exponential backoff; rows that still fail
+  after `max_attempts` are moved to a dead-letter list (and appended to a
+  JSONL file when `VALUATION_DEAD_LETTER_PATH` is set).
+- Pending writes are flushed at interpreter shutdown.
+
+Persistence is enabled with `PERSIST_VALUATIONS=1`; the `calculate_*` tools
+are wrapped with `write_behind`. Rows carry the period of the record the
+calculator actually used, and what-if calls that override record inputs
+(e.g. `calculate_dcf(company=..., wacc=0.5)`) are not persisted.
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+try:
+    from .RecordStore import normalize_key
+except Exception:  # pragma: no cover - fallback to sibling Tools placement
+    from ..Tools.RecordStore import normalize_key  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+PERSIST_VALUATIONS = os.getenv("PERSIST_VALUATIONS", "").strip().lower() in ("1", "true", "yes")
+VALUATION_METRICS_TABLE = os.getenv("VALUATION_METRICS_TABLE", "valuation_metrics")
+VALUATION_DEAD_LETTER_PATH = os.getenv("VALUATION_DEAD_LETTER_PATH")
+
+MAX_BATCH_SIZE = 10  # Airtable's per-request record limit
+# Upsert/coalescing key; `company` keeps the display name as a plain field
+KEY_FIELDS = ("company_key", "period", "method")
+
+# Headline value reported by each calculator
+PRIMARY_RESULT = {
+    "calculate_book_value": "book_value",
+    "estimate_liquidation_value": "liquidation_value",
+    "calculate_market_cap": "market_cap",
+    "calculate_comparable_multiples": "average_valuation",
+    "calculate_dcf": "dcf_value",
+    "calculate_earnings_multiple": "average_valuation",
+    "triangulate_valuation": "triangulated_value",
+}
+
+
+def valuation_to_fields(payload: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """Map a calculator payload to a `valuation_metrics` row (None if not persistable)."""
+    if not payload.get("success") or not payload.get("company"):
+        return None
+    method = payload.get("tool")
+    result = payload.get("result") or {}
+    return {
+        "company": str(payload["company"]).strip(),
+        "company_key": normalize_key(payload["company"]),
+        "period": str(payload.get("period") or "").strip(),
+        "method": method,
+        "value": result.get(PRIMARY_RESULT.get(method, ""), None),
+        "confidence": payload.get("confidence"),
+        "result": json.dumps(result, sort_keys=True, default=str),
+        "inputs": json.dumps(payload.get("inputs") or {}, sort_keys=True, default=str),
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class WriteBehindQueue:
+    """Coalescing, batching background writer."""
+
+    def __init__(
+        self,
+        backend_getter: Callable[[], Any],
+        table_name: str = VALUATION_METRICS_TABLE,
+        key_fields: Tuple[str, ...] = KEY_FIELDS,
+        batch_size: int = MAX_BATCH_SIZE,
+        flush_interval: float = 2.0,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        dead_letter_path: Optional[str] = VALUATION_DEAD_LETTER_PATH,
+    ):
+        self._backend_getter = backend_getter
+        self.table_name = table_name
+        self.key_fields = tuple(key_fields)
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.dead_letter_path = dead_letter_path
+
+        self._pending: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._attempts: Dict[tuple, int] = {}
+        self._not_before = 0.0
+        self._first_pending_at = 0.0
+        self._flush_requested = False
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.dead_letters: List[Dict[str, Any]] = []
+        self.stats: Dict[str, int] = {
+            "enqueued": 0, "coalesced": 0, "written": 0, "batches": 0, "retries": 0, "dead_lettered": 0,
+        }
+        self._thread = threading.Thread(target=self._run, name="valuation-write-behind", daemon=True)
+        self._thread.start()
+
+    def _key(self, row: Mapping[str, Any]) -> tuple:
+        return tuple(row.get(k) for k in self.key_fields)
+
+    def enqueue(self, row: Mapping[str, Any]) -> None:
+        """Queue `row` for upsert; replaces any queued row with the same key."""
+        key = self._key(row)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed.")
+            if key in self._pending:
+                self.stats["coalesced"] += 1
+                self._pending.move_to_end(key)
+            elif not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending[key] = dict(row)
+            self._attempts.pop(key, None)
+            self.stats["enqueued"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _take_batch(self) -> List[Tuple[tuple, Dict[str, Any]]]:
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False))
+        self._in_flight += len(batch)
+        return batch
+
+    def _ready(self, now: float) -> bool:
+        if not self._pending or now < self._not_before:
+            return False
+        return (
+            self._closed
+            or self._flush_requested
+            or len(self._pending) >= self.batch_size
+            or now - self._first_pending_at >= self.flush_interval
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._ready(now):
+                        break
+                    if self._closed and not self._pending:
+                        return
+                    timeout = None
+                    if self._pending:
+                        target = max(self._not_before, self._first_pending_at + self.flush_interval)
+                        timeout = max(target - now, 0.005)
+                    self._cond.wait(timeout=timeout)
+                batch = self._take_batch()
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[tuple, Dict[str, Any]]]) -> None:
+        try:
+            self._backend_getter().upsert_records(self.table_name, [row for _, row in batch], list(self.key_fields))
+        except Exception as exc:
+            self._handle_failure(batch, exc)
+        else:
+            with self._cond:
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                for key, _ in batch:
+                    self._attempts.pop(key, None)
+        finally:
+            with self._cond:
+                self._in_flight -= len(batch)
+                self._cond.notify_all()
+
+    def _handle_failure(self, batch: List[Tuple[tuple, Dict[str, Any]]], exc: Exception) -> None:
+        logger.warning("Valuation write-behind batch failed: %s", exc)
+        dead: List[Dict[str, Any]] = []
+        with self._cond:
+            max_attempt = 0
+            for key, row in batch:
+                attempts = self._attempts.get(key, 0) + 1
+                if key in self._pending:
+                    # A newer result arrived meanwhile; it supersedes this one.
+                    continue
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(key, None)
+                    dead.append({"row": row, "error": str(exc), "attempts": attempts})
+                    continue
+                self._attempts[key] = attempts
+                if not self._pending:
+                    self._first_pending_at = time.monotonic()
+                self._pending[key] = row
+                self._pending.move_to_end(key, last=False)
+                max_attempt = max(max_attempt, attempts)
+                self.stats["retries"] += 1
+            if max_attempt:
+                self._not_before = time.monotonic() + self.backoff_base * (2 ** (max_attempt - 1))
+            self.dead_letters.extend(dead)
+            self.stats["dead_lettered"] += len(dead)
+        if dead and self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, "a", encoding="utf-8") as handle:
+                    for entry in dead:
+                        handle.write(json.dumps(entry, default=str) + "\n")
+            except OSError:
+                logger.exception("Could not write valuation dead letters to %s", self.dead_letter_path)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued row is written or dead-lettered; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            try:
+                while self._pending or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(timeout=remaining if remaining is not None else 0.5)
+                return True
+            finally:
+                self._flush_requested = False
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Flush pending rows and stop the background thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_before = 0.0
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+
+# -------------------------------
+# Process-wide queue
+# -------------------------------
+
+_queue: Optional[WriteBehindQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """Return the process-wide queue writing to the configured storage backend."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            try:
+                from .CompanyValuationDB import get_backend
+            except Exception:  # pragma: no cover - fallback to sibling Tools placement
+                from ..Tools.CompanyValuationDB import get_backend  # type: ignore
+            _queue = WriteBehindQueue(get_backend)
+            atexit.register(_queue.close)
+        return _queue
+
+
+def persist_valuation(payload: Mapping[str, Any]) -> bool:
+    """Queue a calculator payload for persistence; returns True if queued."""
+    row = valuation_to_fields(payload)
+    if row is None:
+        return False
+    get_write_behind_queue().enqueue(row)
+    return True
+
+
+def write_behind(
+    overrides: Tuple[str, ...] = (),
+) -> Callable[[Callable[..., Dict[str, Any]]], Callable[..., Dict[str, Any]]]:
+    """Decorator queueing successful calculator results when PERSIST_VALUATIONS is on.
+
+    `overrides` names the arguments that replace values otherwise read from
+    the statement record; a call passing any of them is a what-if and is not
+    persisted, so it cannot overwrite the store-derived row for its key.
+    """
+
+    def decorator(func: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            payload = func(*args, **kwargs)
+            if not PERSIST_VALUATIONS or not isinstance(payload, Mapping):
+                return payload
+            try:
+                arguments = signature.bind(*args, **kwargs).arguments
+                if any(arguments.get(name) is not None for name in overrides):
+                    return payload
+                persist_valuation(payload)
+            except Exception:
+                # Persistence must never fail the calculation itself
+                logger.exception("Could not queue %s result for persistence", payload.get("tool"))
+            return payload
+
+        return wrapper
+
+    return decorator
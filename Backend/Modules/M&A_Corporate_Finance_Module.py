@@ -11,6 +11,11 @@ from agno.tools.reasoning import ReasoningTools
 from agno.tools.opencv import OpenCVTools
 from agno.tools.calculator import CalculatorTools
 
+try:
+    from Modules.CompanyValuation.Tools.MonteCarlo import simulate_dcf_monte_carlo
+except ImportError:  # run as a script from Modules/
+    from CompanyValuation.Tools.MonteCarlo import simulate_dcf_monte_carlo
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -149,6 +154,9 @@ def create_Valuation_Scenario_agent():
             - Interest rate changes (rate cuts, hikes, volatility)
             - Currency fluctuations and exchange rate impacts
         3. Run Monte Carlo simulations:
+            - Use the `simulate_dcf_monte_carlo` tool (distributions for FCF growth, WACC,
+              terminal growth and FCF margin; pass a seed for reproducible runs) instead of
+              writing simulation code
             - Generate probabilistic valuation ranges
             - Model uncertainty in key assumptions
             - Create probability distributions for outcomes
@@ -168,6 +176,7 @@ def create_Valuation_Scenario_agent():
         markdown=True,
         
         tools=[
+            simulate_dcf_monte_carlo,    # Monte Carlo DCF ranges
             PythonTools(),               # Run scenario simulations
             PandasTools(),               # Data-driven modeling
             DuckDbTools(),               # Query financial datasets
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the tools as `Modules.CompanyValuation.Tools...` from Backend/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,151 @@
+"""
+Local replica sync against `FakeAirtableServer`: full sync, delta sync after
+the watermark (with its overlap window), unchanged re-reads keeping the
+generation, pruning on full sync, and the `get_*` helpers being served from
+the replica.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from Modules.CompanyValuation.Tools import CompanyValuationDB as db
+from Modules.CompanyValuation.Tools.AirtableClient import rate_limiter
+from Modules.CompanyValuation.Tools.Benchmarks import FakeAirtableServer
+from Modules.CompanyValuation.Tools.LocalReplica import WATERMARK_OVERLAP
+from Modules.CompanyValuation.Tools.StorageBackends import AirtableBackend
+
+BASE_ID = "appREPLICATEST00"
+TABLE = "financial_statements"
+
+
+def statement(number, total_assets=100.0):
+    return {
+        "id": f"rec{number:014d}",
+        "createdTime": "2024-01-01T00:00:00.000Z",
+        "fields": {"company": f"Company {number}", "period": "2024", "total_assets": total_assets},
+    }
+
+
+@pytest.fixture
+def server():
+    bucket = rate_limiter(BASE_ID)
+    saved_rate = (bucket.rate, bucket.capacity)
+    bucket.rate = bucket.capacity = 1e9
+    with FakeAirtableServer({TABLE: [statement(i) for i in range(250)]}) as fake:
+        # Untouched records were modified long before any sync
+        fake.created_at = datetime.now(timezone.utc) - timedelta(days=1)
+        yield fake
+    bucket.rate, bucket.capacity = saved_rate
+
+
+@pytest.fixture
+def backend(server, tmp_path):
+    saved_backend = db._backend
+    backend = db.set_backend(
+        AirtableBackend("patREPLICATEST", BASE_ID, endpoint_url=server.url, replica_path=str(tmp_path / "replica.db"))
+    )
+    yield backend
+    db._backend = saved_backend
+
+
+def sync(backend, full=False):
+    return backend.replica.sync_table(TABLE, backend.table(TABLE), full=full)
+
+
+def test_first_read_performs_full_sync(server, backend):
+    records = db.get_financial_statements()
+
+    assert len(records) == 250
+    assert records[0] == statement(0)
+    assert server.formulas == []
+    state = backend.replica.sync_state(TABLE)
+    assert state["record_count"] == 250
+    assert state["last_full_sync"] == state["last_sync"]
+
+
+def test_delta_sync_fetches_records_modified_after_watermark(server, backend):
+    sync(backend)
+    last_sync = datetime.fromisoformat(backend.replica.sync_state(TABLE)["last_sync"])
+    server.put_record(TABLE, statement(1, total_assets=111.0))  # changed after the sync
+    server.put_record(TABLE, statement(500))  # created after the sync
+    server.put_record(TABLE, statement(2, total_assets=222.0), modified=last_sync - timedelta(seconds=30))
+    server.put_record(TABLE, statement(3, total_assets=333.0), modified=last_sync - timedelta(seconds=120))
+
+    result = sync(backend)
+
+    assert result["mode"] == "delta"
+    assert result["fetched"] == 3
+    assert len(server.formulas) == 1
+    by_id = {rec["id"]: rec["fields"] for rec in backend.replica.read_table(TABLE)}
+    assert len(by_id) == 251
+    assert by_id[statement(1)["id"]]["total_assets"] == 111.0
+    assert statement(500)["id"] in by_id
+    # Inside the overlap window before the watermark: re-fetched
+    assert by_id[statement(2)["id"]]["total_assets"] == 222.0
+    # Older than the overlap: a delta sync cannot see it
+    assert by_id[statement(3)["id"]]["total_assets"] == 100.0
+
+
+def test_watermark_trails_sync_start_by_overlap(backend):
+    sync(backend)
+    state = backend.replica.sync_state(TABLE)
+    watermark = datetime.strptime(state["watermark"], "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+    expected = datetime.fromisoformat(state["last_sync"]) - WATERMARK_OVERLAP
+
+    assert WATERMARK_OVERLAP == timedelta(seconds=60)
+    assert abs(watermark - expected) < timedelta(seconds=1)
+
+
+def test_unchanged_records_do_not_bump_generation(server, backend):
+    first = sync(backend)
+    last_sync = datetime.fromisoformat(backend.replica.sync_state(TABLE)["last_sync"])
+    # Re-read by the overlap window with the same contents
+    server.put_record(TABLE, statement(2), modified=last_sync - timedelta(seconds=30))
+
+    delta = sync(backend)
+    assert delta["fetched"] == 1
+    assert delta["upserted"] == 0
+    assert delta["generation"] == first["generation"]
+
+    full = sync(backend, full=True)
+    assert full["upserted"] == 0
+    assert full["generation"] == first["generation"]
+
+    server.put_record(TABLE, statement(2, total_assets=222.0), modified=last_sync - timedelta(seconds=30))
+    changed = sync(backend)
+    assert changed["upserted"] == 1
+    assert changed["generation"] == first["generation"] + 1
+
+
+def test_full_sync_prunes_deleted_records(server, backend):
+    sync(backend)
+    server.delete_record(TABLE, statement(7)["id"])
+
+    delta = sync(backend)
+    assert delta["deleted"] == 0
+    assert len(backend.replica.read_table(TABLE)) == 250
+
+    full = sync(backend, full=True)
+    assert full["mode"] == "full"
+    assert full["deleted"] == 1
+    ids = {rec["id"] for rec in backend.replica.read_table(TABLE)}
+    assert len(ids) == 249
+    assert statement(7)["id"] not in ids
+
+
+def test_getters_are_served_from_replica(server, backend):
+    first = db.get_financial_statements()
+    version = db.table_version(TABLE)
+    requests = server.requests
+
+    assert db.get_financial_statements() == first
+    assert db.table_version(TABLE) == version
+    assert server.requests == requests
+
+    server.put_record(TABLE, statement(9, total_assets=999.0))
+    sync(backend)
+    assert server.requests > requests
+    assert db.table_version(TABLE) != version
+    by_id = {rec["id"]: rec["fields"] for rec in db.get_financial_statements()}
+    assert by_id[statement(9)["id"]]["total_assets"] == 999.0